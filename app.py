@@ -1,929 +1,2429 @@
-from flask import Flask, render_template, request, jsonify, abort
+from flask import Flask, render_template, request, jsonify, abort, g, has_request_context
 import json, os, secrets, time, re, hashlib
-from datetime import datetime, timedelta
+import math
+import atexit
+import bisect
+import gzip
+import itertools
+import mmap
+import struct
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
 import logging
+import logging.handlers
+import queue
+import random
+import sqlite3
+import tempfile
 from functools import wraps
-from collections import defaultdict
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import NamedTuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import urllib.parse
 
+try:
+    import brotli
+except ImportError:  # brotli اختياري - من غيره بنكتفي بـ gzip
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:  # fcntl مش موجود على Windows - الـ shared memory مش هتشتغل
+    fcntl = None
+
+try:
+    import redis
+except ImportError:  # redis اختياري - من غيره الـ rate limiting محلي في كل worker
+    redis = None
+
 # إعداد التطبيق
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 
-# إعداد الـ Logging للأمان
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# إعداد الـ Logging للأمان
+# =======================
+# الـ request thread بيحط الـ record في queue وبس - الكتابة (والتحويل لـ JSON) في thread الـ QueueListener.
+# كل سطر JSON فيه الحقول المنظمة (route, sku, reference_id, ip, latency_ms) لو موجودة.
+# سجلات النجاح الكتير (sample=True) بيتاخد منها عينة LOG_SAMPLE_RATE - التحذيرات والأخطاء بتتسجل كلها دايماً.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')               # json أو text
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.1'))
+LOG_QUEUE_SIZE = 10000
+LOG_FIELDS = ('route', 'method', 'status', 'sku', 'items', 'reference_id', 'price', 'currency', 'ip', 'latency_ms', 'error',
+              'version', 'previous_version', 'path', 'assets')
+
+
+class JsonLogFormatter(logging.Formatter):
+    """سطر JSON واحد لكل record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'msg': record.getMessage(),
+        }
+        for field in LOG_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SuccessSampler(logging.Filter):
+    """بيعدي عينة من السجلات المعلّمة sample=True - أي حاجة WARNING أو أعلى بتعدي دايماً"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self._random = random.Random()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not getattr(record, 'sample', False):
+            return True
+        return self._random.random() < self.rate
+
+
+class DropWhenFullQueueHandler(logging.handlers.QueueHandler):
+    """لو الـ queue اتملت (الكتابة متأخرة) بنرمي سجلات INFO/DEBUG بدل ما نوقف الطلب -
+    التحذيرات والأخطاء (429، Redis واقع، ...) مبتترميش: بتستنى مكان في الـ queue"""
+
+    def enqueue(self, record):
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging():
+    """QueueHandler على الـ root logger + QueueListener بيكتب على stderr"""
+    output = logging.StreamHandler()
+    if LOG_FORMAT == 'json':
+        output.setFormatter(JsonLogFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = DropWhenFullQueueHandler(log_queue)
+    queue_handler.addFilter(SuccessSampler(LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    # الـ thread بتاع الـ listener مبيعيش بعد fork (gunicorn --preload) - نشغل واحد جديد في الـ child
+    os.register_at_fork(after_in_child=listener.start)
+    return listener
+
+
+log_listener = setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def log_event(level, message, sample=False, **fields):
+    """سجل منظم: الرسالة ثابتة والتفاصيل في حقول - مفيش formatting لو المستوى مش هيتسجل"""
+    if not logger.isEnabledFor(level):
+        return
+    if has_request_context():
+        fields.setdefault('route', request.path)
+        fields.setdefault('method', request.method)
+        started = getattr(g, 'request_started', None)
+        if started is not None:
+            fields.setdefault('latency_ms', round((time.perf_counter() - started) * 1000, 2))
+    fields['sample'] = sample
+    logger.log(level, message, extra=fields)
+
+# 📊 المقاييس (Prometheus)
+# ========================
+# كل worker بيكتب عداداته في ملف mmap خاص بيه جوه METRICS_DIR (مصفوفة doubles بترتيب ثابت)،
+# و/metrics بيجمع كل الملفات وقت الـ scrape - فالأرقام مجمعة صح بين كل الـ workers.
+# التسجيل نفسه = lock + جمع رقم في المصفوفة (مايكروثواني). من غير METRICS_DIR العدادات في الـ worker ده بس.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRIC_ROUTES = ('/', '/whatsapp', '/whatsapp/batch', '/api/prices', '/api/offers', '/get_offers', '/events/offers',
+                 'other')
+METRIC_STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+METRIC_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+METRIC_REJECTION_CAUSES = ('rate_limit', 'anti_spam')
+# gauges بقيمة خاصة بكل worker (الجداول المحلية) - كل worker بينشرها في ملفه كل METRIC_GAUGE_INTERVAL
+# و/metrics بيجمعها من الـ workers اللي نشروا مؤخراً بس (worker مات = قيمته مبتتحسبش)
+METRIC_WORKER_GAUGES = (
+    ('anti_spam_tracked_keys', 'Tracked (IP, User-Agent) keys in the anti-spam tables of all workers.'),
+    ('rate_limit_tracked_keys', 'Tracked rate-limit counters in all workers.'),
+    ('rate_limit_blocked_ips', 'Currently blocked IPs, summed over all workers.'),
+    ('offer_streams_open', 'Open /events/offers streams in all workers.'),
+    ('inquiry_queue_depth', 'Inquiries waiting for the SQLite writer in all workers.'),
+)
+METRIC_INQUIRY_DROP_REASONS = ('queue_full', 'write_failed')
+METRIC_GAUGE_INTERVAL = 5
+METRIC_CACHES = ('index', 'page_view', 'api_prices', 'prices_delta', 'api_offers', 'popup_offers', 'offer_event',
+                 'whatsapp_templates', 'compression', 'other')
+
+
+def _metric_layout():
+    """مكان كل عداد في المصفوفة - نفس الترتيب في كل الـ workers"""
+    keys = []
+    for route in METRIC_ROUTES:
+        keys += [('requests', route, status) for status in METRIC_STATUS_CLASSES]
+        keys += [('latency_bucket', route, i) for i in range(len(METRIC_LATENCY_BUCKETS) + 1)]
+        keys.append(('latency_sum', route))
+    keys += [('rejected', cause) for cause in METRIC_REJECTION_CAUSES]
+    for cache in METRIC_CACHES:
+        keys += [('cache', cache, 'hit'), ('cache', cache, 'miss')]
+    keys.append(('catalog_reloads',))
+    keys += [('inquiries_dropped', reason) for reason in METRIC_INQUIRY_DROP_REASONS]
+    keys += [('gauge', name) for name, _ in METRIC_WORKER_GAUGES]
+    keys.append(('gauges_published_at',))
+    return {key: index for index, key in enumerate(keys)}
+
+
+class WorkerMetrics:
+    """عدادات الـ worker ده في ملف mmap - /metrics بيقرا ملفات كل الـ workers ويجمعها"""
+
+    HEADER = struct.Struct('<8sQ')
+    MAGIC = b'SNRMETR1'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.layout = _metric_layout()
+        # لو ترتيب العدادات اتغير (deploy جديد) الملفات القديمة مبتتجمعش معاه
+        self.signature = int.from_bytes(hashlib.blake2b(repr(sorted(self.layout.items())).encode(),
+                                                        digest_size=8).digest(), 'big')
+        self.size = self.HEADER.size + 8 * len(self.layout)
+        self.gauge_indices = frozenset(self.layout[('gauge', name)] for name, _ in METRIC_WORKER_GAUGES)
+        self._lock = threading.Lock()
+        self._collect_gauges = None
+        self._publisher_pid = None
+        self.open()
+
+    def open(self):
+        """ملف جديد للـ process ده (بيتنادى تاني بعد fork)"""
+        self._lock = threading.Lock()
+        header = self.HEADER.pack(self.MAGIC, self.signature)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self.path = os.path.join(self.directory, f"worker-{os.getpid()}.bin")
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size != self.size or os.pread(fd, self.HEADER.size, 0) != header:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, header, 0)
+                self._map = mmap.mmap(fd, self.size)
+            finally:
+                os.close(fd)
+        else:
+            self.path = None
+            self._map = mmap.mmap(-1, self.size)
+            self._map[:self.HEADER.size] = header
+        self._values = memoryview(self._map)[self.HEADER.size:].cast('d')
+
+    def inc(self, key, amount=1):
+        index = self.layout[key]
+        with self._lock:
+            self._values[index] += amount
+
+    def observe_request(self, route, status, seconds):
+        """طلب واحد: العداد حسب الـ status + الـ histogram بتاع الـ latency"""
+        if self._publisher_pid != os.getpid():
+            self._ensure_publisher()
+        if route not in METRIC_ROUTES:
+            route = 'other'
+        layout = self.layout
+        status_index = layout[('requests', route, METRIC_STATUS_CLASSES[min(max(status // 100, 1), 5) - 1])]
+        bucket_index = layout[('latency_bucket', route, bisect.bisect_left(METRIC_LATENCY_BUCKETS, seconds))]
+        sum_index = layout[('latency_sum', route)]
+        with self._lock:
+            values = self._values
+            values[status_index] += 1
+            values[bucket_index] += 1
+            values[sum_index] += seconds
+
+    def publish_gauges(self, values):
+        """قيم الـ gauges بتاعة الـ worker ده دلوقتي (name -> value)"""
+        layout = self.layout
+        with self._lock:
+            for name, value in values.items():
+                self._values[layout[('gauge', name)]] = value
+            self._values[layout[('gauges_published_at',)]] = time.time()
+
+    def publish_gauges_from(self, collect):
+        """collect() بترجع الـ gauges - بتتنشر كل METRIC_GAUGE_INTERVAL من thread في كل worker بيخدم طلبات"""
+        self._collect_gauges = collect
+
+    def _ensure_publisher(self):
+        # الـ thread مبيعديش الـ fork - أول طلب في كل worker بيشغل بتاعه
+        with self._lock:
+            if self._collect_gauges is None or self._publisher_pid == os.getpid():
+                return
+            self._publisher_pid = os.getpid()
+        threading.Thread(target=self._publish_forever, name='metrics-gauges', daemon=True).start()
+
+    def _publish_forever(self):
+        while True:
+            try:
+                self.publish_gauges(self._collect_gauges())
+            except Exception as e:
+                log_event(logging.ERROR, "❌ خطأ في نشر الـ gauges", error=str(e))
+            time.sleep(METRIC_GAUGE_INTERVAL)
+
+    def cache_lookup(self, name, hit):
+        cache = name[0] if isinstance(name, tuple) else name
+        self.inc(('cache', cache if cache in METRIC_CACHES else 'other', 'hit' if hit else 'miss'))
+
+    def totals(self):
+        """مجموع كل الـ workers (كل الملفات اللي في METRICS_DIR بنفس الترتيب)"""
+        if not self.directory:
+            return list(self._values)
+        totals = [0.0] * len(self.layout)
+        header = self.HEADER.pack(self.MAGIC, self.signature)
+        published_index = self.layout[('gauges_published_at',)]
+        stale_before = time.time() - 3 * METRIC_GAUGE_INTERVAL
+        for entry in os.scandir(self.directory):
+            if not (entry.name.startswith('worker-') and entry.name.endswith('.bin')):
+                continue
+            try:
+                with open(entry.path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue                    # worker لسه بيتشال
+            if len(data) != self.size or not data.startswith(header):
+                continue
+            values = memoryview(data)[self.HEADER.size:].cast('d')
+            fresh = values[published_index] >= stale_before      # الـ gauges من worker عايش بس
+            for index, value in enumerate(values):
+                if fresh or index not in self.gauge_indices:
+                    totals[index] += value
+        return totals
+
+
+metrics = WorkerMetrics(METRICS_DIR)
+os.register_at_fork(after_in_child=metrics.open)
+
+
+def _prometheus_labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def render_metrics(gauges, worker_gauges=()):
+    """نص Prometheus (text format 0.0.4) من العدادات المجمعة + الـ gauges اللي اتحسبت دلوقتي
+
+    worker_gauges = أسماء الـ gauges من METRIC_WORKER_GAUGES اللي بتتجمع من كل الـ workers
+    """
+    totals = metrics.totals()
+    layout = metrics.layout
+    lines = [
+        '# HELP senioraaa_http_requests_total Requests by route and status class.',
+        '# TYPE senioraaa_http_requests_total counter',
+    ]
+    for route in METRIC_ROUTES:
+        for status in METRIC_STATUS_CLASSES:
+            value = totals[layout[('requests', route, status)]]
+            if value:
+                lines.append(f"senioraaa_http_requests_total{_prometheus_labels(route=route, status=status)} {value:g}")
+
+    lines += [
+        '# HELP senioraaa_http_request_duration_seconds Request latency by route.',
+        '# TYPE senioraaa_http_request_duration_seconds histogram',
+    ]
+    for route in METRIC_ROUTES:
+        cumulative = 0.0
+        for i, bound in enumerate(METRIC_LATENCY_BUCKETS + (float('inf'),)):
+            cumulative += totals[layout[('latency_bucket', route, i)]]
+            le = '+Inf' if bound == float('inf') else f"{bound:g}"
+            lines.append(f"senioraaa_http_request_duration_seconds_bucket{_prometheus_labels(route=route, le=le)} {cumulative:g}")
+        lines.append(f"senioraaa_http_request_duration_seconds_sum{_prometheus_labels(route=route)} {totals[layout[('latency_sum', route)]]:.6f}")
+        lines.append(f"senioraaa_http_request_duration_seconds_count{_prometheus_labels(route=route)} {cumulative:g}")
+
+    lines += [
+        '# HELP senioraaa_rejected_requests_total 429 responses by cause.',
+        '# TYPE senioraaa_rejected_requests_total counter',
+    ]
+    for cause in METRIC_REJECTION_CAUSES:
+        lines.append(f"senioraaa_rejected_requests_total{_prometheus_labels(cause=cause)} {totals[layout[('rejected', cause)]]:g}")
+
+    lines += [
+        '# HELP senioraaa_cache_lookups_total Prepared-response cache lookups by cache and result.',
+        '# TYPE senioraaa_cache_lookups_total counter',
+    ]
+    for cache in METRIC_CACHES:
+        for result in ('hit', 'miss'):
+            lines.append(f"senioraaa_cache_lookups_total{_prometheus_labels(cache=cache, result=result)} {totals[layout[('cache', cache, result)]]:g}")
+
+    lines += [
+        '# HELP senioraaa_catalog_reloads_total Catalog reloads from catalog.json.',
+        '# TYPE senioraaa_catalog_reloads_total counter',
+        f"senioraaa_catalog_reloads_total {totals[layout[('catalog_reloads',)]]:g}",
+        '# HELP senioraaa_inquiries_dropped_total Inquiries that were never written to SQLite, by reason.',
+        '# TYPE senioraaa_inquiries_dropped_total counter',
+    ]
+    for reason in METRIC_INQUIRY_DROP_REASONS:
+        lines.append(f"senioraaa_inquiries_dropped_total{_prometheus_labels(reason=reason)} {totals[layout[('inquiries_dropped', reason)]]:g}")
+
+    for name, help_text in METRIC_WORKER_GAUGES:
+        if name in worker_gauges:
+            lines += [f"# HELP senioraaa_{name} {help_text}", f"# TYPE senioraaa_{name} gauge",
+                      f"senioraaa_{name} {totals[layout[('gauge', name)]]:g}"]
+    for name, help_text, value in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+    return '\n'.join(lines) + '\n'
+
+# متغيرات الحماية العامة
+# العدادات والحظر جوه rate_limit_store و anti_spam_tracker (تحت) - محدودة الحجم وآمنة مع الـ threads
+LOCK_STRIPES = 16                   # عدد شرائح الـ locks في جداول الحماية
+
+# إعدادات الواتساب
+WHATSAPP_NUMBER = "+201094591331"
+BUSINESS_NAME = "شهد السنيورة"
+
+# دالة تنسيق الأرقام بالفاصلة العشرية
+def format_number(number):
+    """تنسيق الأرقام بالفاصلة العشرية"""
+    return f"{int(number):,}"
+
+# Rate Limiting محسن بدون CSRF
+# ============================
+# الـ decorator بيسأل rate_limit_store - يا التخزين المحلي جوه الـ worker،
+# يا Redis لو RATE_LIMIT_REDIS_URL متحدد (عشان كل الـ gunicorn workers يشوفوا نفس العدادات).
+RATE_LIMIT_BLOCK_SECONDS = 300      # 5 دقائق حظر بعد تجاوز الحد
+ANTI_SPAM_BLOCK_SECONDS = 900       # 15 دقيقة حظر من الـ anti-spam
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL')
+RATE_LIMIT_REDIS_RETRY_SECONDS = 10     # بعد فشل Redis: العدادات المحلية المدة دي قبل ما نجرب Redis تاني
+RATE_LIMIT_MAX_TRACKED_IPS = int(os.environ.get('RATE_LIMIT_MAX_TRACKED_IPS', '100000'))
+RATE_LIMIT_SWEEP_INTERVAL = 30
+
+# نتيجة فحص الطلب
+HIT_ALLOWED = 'allowed'
+HIT_BLOCKED = 'blocked'             # الـ IP محظور من قبل كده (من الـ rate limit)
+HIT_EXCEEDED = 'exceeded'           # تجاوز الحد دلوقتي واتحظر
+HIT_SPAM_BLOCKED = 'spam_blocked'   # الـ IP محظور من الـ anti-spam - الحظر بيتحفظ معاه سببه
+# نفس الأرقام في Redis (نتيجة الـ script وقيمة مفتاح الحظر) وفي خانة الحظر في الـ shared memory
+_HIT_CODES = {HIT_ALLOWED: 0, HIT_BLOCKED: 1, HIT_EXCEEDED: 2, HIT_SPAM_BLOCKED: 3}
+
+
+def _lru_put(table, key, value, max_keys):
+    """إضافة/تحديث في OrderedDict محدود - الأقدم استخداماً بيتشال"""
+    table[key] = value
+    table.move_to_end(key)
+    if len(table) > max_keys:
+        table.popitem(last=False)
+
+
+class InProcessRateLimitStore:
+    """عدادات جوه الـ worker نفسه - الافتراضي لو مفيش Redis
+
+    - كل طلب O(1): sliding window counter (عداد النافذة الحالية + اللي قبلها) بدل list بالأوقات
+    - الذاكرة محدودة: أقصى max_keys عداد، والأقدم استخداماً بيتشال (LRU)
+    - الجداول مقسومة على LOCK_STRIPES شريحة حسب الـ IP ولكل شريحة lock،
+      فالـ threads (gthread / gevent) اللي على IPs مختلفة مش بتستنى بعض والعد مظبوط
+    - الحظر المنتهي بيتشال في الخلفية كل RATE_LIMIT_SWEEP_INTERVAL ثانية
+    """
+
+    def __init__(self, max_keys=None, stripes=LOCK_STRIPES):
+        self.max_keys = max_keys or RATE_LIMIT_MAX_TRACKED_IPS
+        self._max_per_stripe = max(1, self.max_keys // stripes)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._counts = [OrderedDict() for _ in range(stripes)]     # (ip, window) -> [slot, current, previous]
+        self._blocked = [OrderedDict() for _ in range(stripes)]    # ip -> (وقت انتهاء الحظر, نتيجة الحظر)
+        self._sweeper_lock = threading.Lock()
+        self._sweeper_pid = None
+
+    def hit(self, ip, max_requests, window, block_seconds):
+        self._ensure_sweeper()
+        current_time = time.time()
+        stripe = hash(ip) % len(self._locks)
+        counts = self._counts[stripe]
+        blocked = self._blocked[stripe]
+
+        with self._locks[stripe]:
+            # فحص IP محظور
+            block = blocked.get(ip)
+            if block is not None:
+                if current_time < block[0]:
+                    return block[1]
+                del blocked[ip]
+
+            # النافذة الحالية + وزن النافذة اللي قبلها حسب الوقت اللي فات
+            slot, offset = divmod(current_time, window)
+            key = (ip, window)
+            entry = counts.get(key)
+            if entry is None:
+                entry = [slot, 0, 0]
+                _lru_put(counts, key, entry, self._max_per_stripe)
+            else:
+                counts.move_to_end(key)
+                if entry[0] != slot:
+                    entry[2] = entry[1] if slot - entry[0] == 1 else 0
+                    entry[1] = 0
+                    entry[0] = slot
+
+            # فحص عدد الطلبات (block_seconds = 0: رفض الطلب ده بس من غير حظر)
+            if entry[2] * (1 - offset / window) + entry[1] >= max_requests:
+                if block_seconds > 0:
+                    _lru_put(blocked, ip, (current_time + block_seconds, HIT_BLOCKED), self._max_per_stripe)
+                return HIT_EXCEEDED
+
+            # إضافة الطلب الحالي
+            entry[1] += 1
+            return HIT_ALLOWED
+
+    def block(self, ip, seconds, cause=HIT_BLOCKED):
+        """حظر من برة (الـ anti-spam) - cause هي اللي hit بيرجعها طول مدة الحظر"""
+        stripe = hash(ip) % len(self._locks)
+        with self._locks[stripe]:
+            _lru_put(self._blocked[stripe], ip, (time.time() + seconds, cause), self._max_per_stripe)
+
+    def count(self, ip, window):
+        """عدد الطلبات المسموحة في النافذة الحالية للـ IP ده"""
+        stripe = hash(ip) % len(self._locks)
+        with self._locks[stripe]:
+            entry = self._counts[stripe].get((ip, window))
+            return entry[1] if entry and entry[0] == time.time() // window else 0
+
+    def sizes(self):
+        """(عدد العدادات, عدد الـ IPs المحظورة)"""
+        return sum(map(len, self._counts)), sum(map(len, self._blocked))
+
+    def sweep(self):
+        """شيل الحظر المنتهي والعدادات اللي نافذتها خلصت"""
+        current_time = time.time()
+        expired_total = stale_total = 0
+        for lock, counts, blocked in zip(self._locks, self._counts, self._blocked):
+            with lock:
+                expired = [ip for ip, (until, _) in blocked.items() if until <= current_time]
+                for ip in expired:
+                    del blocked[ip]
+                stale = [key for key, entry in counts.items() if current_time // key[1] - entry[0] > 1]
+                for key in stale:
+                    del counts[key]
+            expired_total += len(expired)
+            stale_total += len(stale)
+        return expired_total, stale_total
+
+    def _ensure_sweeper(self):
+        # الـ thread مبيعديش الـ fork - كل worker يشغل بتاعه (الفحص جوه الـ lock: أول طلبين مع بعض = sweeper واحد)
+        if self._sweeper_pid == os.getpid():
+            return
+        with self._sweeper_lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+        threading.Thread(target=self._sweep_forever, name='rate-limit-sweeper', daemon=True).start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(RATE_LIMIT_SWEEP_INTERVAL)
+            try:
+                self.sweep()
+            except Exception as e:
+                log_event(logging.ERROR, "❌ خطأ في تنظيف عدادات الـ rate limiting", error=str(e))
+
+
+# فحص الحظر + تنظيف النافذة + العد + الحظر - كله في رحلة واحدة لـ Redis وبشكل atomic
+# KEYS[1] = مفتاح الحظر (قيمته = رقم نتيجة الحظر من _HIT_CODES) | KEYS[2] = مفتاح الطلبات (sorted set بالوقت)
+# ARGV = now_ms, window_ms, max_requests, block_ms, member
+_REDIS_RATE_LIMIT_LUA = """
+local blocked = redis.call('GET', KEYS[1])
+if blocked then
+    return tonumber(blocked)
+end
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - window)
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    if tonumber(ARGV[4]) > 0 then
+        redis.call('SET', KEYS[1], '1', 'PX', ARGV[4])
+    end
+    return 2
+end
+redis.call('ZADD', KEYS[2], now, ARGV[5])
+redis.call('PEXPIRE', KEYS[2], window)
+return 0
+"""
+
+_REDIS_HIT_RESULTS = {code: result for result, code in _HIT_CODES.items()}
+
+
+class RedisRateLimitStore:
+    """عدادات مشتركة بين كل الـ workers في Redis (sliding window log)
+
+    لو Redis وقع: أول طلب بيفشل (بعد الـ socket timeout) وبعده العدادات المحلية (fallback) على طول
+    لمدة retry_seconds - مفيش طلب بيستنى Redis طول فترة الوقوع. بعد المدة طلب واحد بس بيجرب Redis تاني،
+    والتحذير بيتسجل مرة واحدة لكل محاولة فاشلة مش مع كل طلب.
+    """
+
+    def __init__(self, client, fallback, prefix='senioraaa:rl:', retry_seconds=None):
+        self.client = client
+        self.fallback = fallback
+        self.prefix = prefix
+        self.retry_seconds = RATE_LIMIT_REDIS_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._script = client.register_script(_REDIS_RATE_LIMIT_LUA)
+        # member فريد في الـ sorted set حتى لو طلبين في نفس الـ millisecond
+        self._member_prefix = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._down_until = 0.0          # 0 = Redis شغال
+
+    def _use_redis(self):
+        """True لو الطلب ده يروح لـ Redis - وقت الوقوع thread واحد بس بيجرب بعد retry_seconds"""
+        if not self._down_until:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now < self._down_until:
+                return False
+            if self._down_until:
+                self._down_until = now + self.retry_seconds     # الباقيين يكملوا محلي لحد ما المحاولة دي تخلص
+            return True
+
+    def _redis_failed(self, error, action):
+        with self._lock:
+            self._down_until = time.monotonic() + self.retry_seconds
+        log_event(logging.WARNING, "⚠️ Redis مش متاح - العدادات محلية لحد المحاولة الجاية",
+                  error=f"{action}: {error}")
+
+    def _redis_ok(self):
+        if not self._down_until:
+            return
+        with self._lock:
+            recovered = bool(self._down_until)
+            self._down_until = 0.0
+        if recovered:
+            log_event(logging.INFO, "✅ Redis رجع - الـ rate limiting مشترك تاني")
+
+    def hit(self, ip, max_requests, window, block_seconds):
+        if not self._use_redis():
+            return self.fallback.hit(ip, max_requests, window, block_seconds)
+        now_ms = int(time.time() * 1000)
+        member = f"{now_ms}:{self._member_prefix}:{next(self._sequence)}"
+        try:
+            result = self._script(
+                keys=[f"{self.prefix}block:{ip}", f"{self.prefix}hits:{ip}"],
+                args=[now_ms, int(window * 1000), max_requests, int(block_seconds * 1000), member]
+            )
+        except redis.RedisError as e:
+            self._redis_failed(e, 'hit')
+            return self.fallback.hit(ip, max_requests, window, block_seconds)
+        self._redis_ok()
+        return _REDIS_HIT_RESULTS[int(result)]
+
+    def block(self, ip, seconds, cause=HIT_BLOCKED):
+        if self._use_redis():
+            try:
+                self.client.set(f"{self.prefix}block:{ip}", _HIT_CODES[cause], px=int(seconds * 1000))
+                self._redis_ok()
+                return
+            except redis.RedisError as e:
+                self._redis_failed(e, 'block')
+        self.fallback.block(ip, seconds, cause)
+
+
+# 🧠 جداول في shared memory (من غير Redis)
+# ========================================
+# لو RATE_LIMIT_SHM_PATH متحدد (مثلاً /dev/shm/senioraaa) كل الـ workers على نفس الجهاز
+# بيشتغلوا على نفس الجدول في ملف mmap - نفس الأرقام عند الكل من غير رحلة على الشبكة.
+# الجدول حجمه ثابت: buckets × 16 خانة، كل مفتاح ليه bucket واحد بيدور فيه بس (open addressing محدود)،
+# ولما الـ bucket يتملي بنستبدل الخانة اللي هتنتهي الأول. كل bucket ليه lock بين الـ processes (fcntl)
+# وlock بين الـ threads، فالتعديل atomic.
+RATE_LIMIT_SHM_PATH = os.environ.get('RATE_LIMIT_SHM_PATH')
+RATE_LIMIT_SHM_BUCKETS = int(os.environ.get('RATE_LIMIT_SHM_BUCKETS', '4096'))
+
+# أنواع الخانات
+SLOT_COUNTER = 1        # a = رقم النافذة, b = العداد الحالي, c = عداد النافذة اللي فاتت
+SLOT_BLOCK = 2          # a = وقت انتهاء الحظر, b = رقم نتيجة الحظر (_HIT_CODES)
+SLOT_ATTEMPTS = 3       # a, b, c = آخر 3 أوقات محاولات
+
+
+def hash64(text):
+    """hash ثابت 8 bytes (مش صفر) - نفس القيمة في كل الـ processes"""
+    value = int.from_bytes(hashlib.blake2b(text.encode('utf-8', 'replace'), digest_size=8).digest(), 'big')
+    return value or 1
+
+
+class SharedSlotTable:
+    """جدول hash ثابت الحجم في ملف mmap مشترك بين الـ processes"""
+
+    HEADER = struct.Struct('<8sIII')
+    HEADER_BYTES = 64
+    RECORD = struct.Struct('<QIIdddd')     # key, kind, (padding), expires, a, b, c
+    MAGIC = b'SNRSLOT1'
+
+    def __init__(self, path, buckets, slots_per_bucket=16, thread_locks=64):
+        if fcntl is None:
+            raise RuntimeError("الـ shared memory محتاجة fcntl (Linux/Unix)")
+        self.path = path
+        self.buckets = buckets
+        self.slots_per_bucket = slots_per_bucket
+        self.bucket_bytes = self.RECORD.size * slots_per_bucket
+        size = self.HEADER_BYTES + buckets * self.bucket_bytes
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.HEADER_BYTES, 0)
+        try:
+            header = self.HEADER.pack(self.MAGIC, 1, buckets, slots_per_bucket)
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, header, 0)
+            elif os.pread(self._fd, self.HEADER.size, 0) != header:
+                raise ValueError(f"ملف الـ shared memory {path} متعمل بإعدادات مختلفة - امسحه أو غير المسار")
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.HEADER_BYTES, 0)
+        self._map = mmap.mmap(self._fd, size)
+        self._thread_locks = [threading.Lock() for _ in range(thread_locks)]
+
+    def bucket_for(self, bucket_key):
+        return bucket_key % self.buckets
+
+    @contextmanager
+    def locked(self, bucket):
+        """lock للـ bucket ده - بين الـ threads وبين الـ processes"""
+        offset = self.HEADER_BYTES + bucket * self.bucket_bytes
+        with self._thread_locks[bucket % len(self._thread_locks)]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.bucket_bytes, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.bucket_bytes, offset)
+
+    def _offset(self, bucket, index):
+        return self.HEADER_BYTES + bucket * self.bucket_bytes + index * self.RECORD.size
+
+    def find(self, bucket, key):
+        """(index, [expires, a, b, c]) - لازم يتنادى جوه locked(bucket)"""
+        for index in range(self.slots_per_bucket):
+            slot_key, _, _, expires, a, b, c = self.RECORD.unpack_from(self._map, self._offset(bucket, index))
+            if slot_key == key:
+                return index, [expires, a, b, c]
+            if slot_key == 0:
+                break                       # الخانات بتتملي بالترتيب ومبتفضاش - مفيش بعد كده
+        return None, None
+
+    def claim(self, bucket, key, kind, now):
+        """خانة جديدة للمفتاح: فاضية، أو منتهية، أو اللي هتنتهي الأول"""
+        victim, victim_expires = 0, float('inf')
+        for index in range(self.slots_per_bucket):
+            slot_key, _, _, expires, _, _, _ = self.RECORD.unpack_from(self._map, self._offset(bucket, index))
+            if slot_key == 0 or expires <= now:
+                victim = index
+                break
+            if expires < victim_expires:
+                victim, victim_expires = index, expires
+        self.write(bucket, victim, key, kind, [now, 0.0, 0.0, 0.0])
+        return victim
+
+    def write(self, bucket, index, key, kind, values):
+        self.RECORD.pack_into(self._map, self._offset(bucket, index), key, kind, 0, *values)
+
+    def count(self, kind, now=None):
+        """عدد الخانات الشغالة من النوع ده (للمتابعة بس - بيلف على الجدول كله)"""
+        now = now or time.time()
+        total = 0
+        for offset in range(self.HEADER_BYTES, len(self._map), self.RECORD.size):
+            slot_key, slot_kind, _, expires, _, _, _ = self.RECORD.unpack_from(self._map, offset)
+            if slot_key and slot_kind == kind and expires > now:
+                total += 1
+        return total
+
+
+class SharedMemoryRateLimitStore:
+    """نفس الـ sliding window counter بتاع InProcessRateLimitStore بس في جدول مشترك بين الـ workers"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def _keys(self, ip, window):
+        ip_hash = hash64(ip)
+        return self.table.bucket_for(ip_hash), hash64(f"block:{ip}"), hash64(f"hits:{ip}:{window}")
+
+    def hit(self, ip, max_requests, window, block_seconds):
+        current_time = time.time()
+        bucket, block_key, counter_key = self._keys(ip, window)
+
+        with self.table.locked(bucket):
+            # فحص IP محظور
+            index, block = self.table.find(bucket, block_key)
+            if index is not None and current_time < block[0]:
+                return HIT_SPAM_BLOCKED if block[2] == _HIT_CODES[HIT_SPAM_BLOCKED] else HIT_BLOCKED
+
+            # النافذة الحالية + وزن النافذة اللي قبلها
+            slot, offset = divmod(current_time, window)
+            index, entry = self.table.find(bucket, counter_key)
+            if index is None:
+                index = self.table.claim(bucket, counter_key, SLOT_COUNTER, current_time)
+                entry = [0.0, slot, 0, 0]
+            elif entry[1] != slot:
+                entry[3] = entry[2] if slot - entry[1] == 1 else 0
+                entry[2] = 0
+                entry[1] = slot
+            _, slot, current, previous = entry
+            expires = (slot + 2) * window
+
+            # فحص عدد الطلبات
+            if previous * (1 - offset / window) + current >= max_requests:
+                self.table.write(bucket, index, counter_key, SLOT_COUNTER, [expires, slot, current, previous])
+                if block_seconds > 0:
+                    self._block(bucket, block_key, current_time, current_time + block_seconds, HIT_BLOCKED)
+                return HIT_EXCEEDED
+
+            # إضافة الطلب الحالي
+            self.table.write(bucket, index, counter_key, SLOT_COUNTER, [expires, slot, current + 1, previous])
+            return HIT_ALLOWED
+
+    def block(self, ip, seconds, cause=HIT_BLOCKED):
+        current_time = time.time()
+        bucket, block_key, _ = self._keys(ip, 0)
+        with self.table.locked(bucket):
+            self._block(bucket, block_key, current_time, current_time + seconds, cause)
+
+    def _block(self, bucket, block_key, now, until, cause):
+        index, _ = self.table.find(bucket, block_key)
+        if index is None:
+            index = self.table.claim(bucket, block_key, SLOT_BLOCK, now)
+        self.table.write(bucket, index, block_key, SLOT_BLOCK, [until, until, _HIT_CODES[cause], 0.0])
+
+    def count(self, ip, window):
+        """عدد الطلبات المسموحة في النافذة الحالية للـ IP ده"""
+        bucket, _, counter_key = self._keys(ip, window)
+        with self.table.locked(bucket):
+            index, entry = self.table.find(bucket, counter_key)
+        return int(entry[2]) if index is not None and entry[1] == time.time() // window else 0
+
+    def sizes(self):
+        """(عدد العدادات, عدد الـ IPs المحظورة)"""
+        return self.table.count(SLOT_COUNTER), self.table.count(SLOT_BLOCK)
+
+
+def shared_table_path(name):
+    return f"{RATE_LIMIT_SHM_PATH}-{name}.bin"
+
+
+def create_rate_limit_store(redis_url=RATE_LIMIT_REDIS_URL):
+    """Redis لو متاح - وإلا shared memory لو متحددة - غير كده التخزين المحلي"""
+    local_store = InProcessRateLimitStore()
+    if not redis_url:
+        if RATE_LIMIT_SHM_PATH:
+            try:
+                table = SharedSlotTable(shared_table_path('ratelimit'), RATE_LIMIT_SHM_BUCKETS)
+            except (OSError, ValueError, RuntimeError) as e:
+                log_event(logging.WARNING, "⚠️ مش قادر أفتح جدول الـ shared memory - العدادات محلية", error=str(e))
+                return local_store
+            log_event(logging.INFO, "✅ الـ rate limiting مشترك بين الـ workers عن طريق shared memory", path=table.path)
+            return SharedMemoryRateLimitStore(table)
+        return local_store
+    if redis is None:
+        log_event(logging.WARNING, "⚠️ RATE_LIMIT_REDIS_URL متحدد بس مكتبة redis مش متسطبة - العدادات محلية")
+        return local_store
+    client = redis.Redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+    try:
+        client.ping()
+    except redis.RedisError as e:
+        log_event(logging.WARNING, "⚠️ مش قادر أوصل لـ Redis - العدادات محلية", error=str(e))
+        return local_store
+    log_event(logging.INFO, "✅ الـ rate limiting مشترك بين الـ workers عن طريق Redis")
+    return RedisRateLimitStore(client, local_store)
+
+
+rate_limit_store = create_rate_limit_store()
+
+
+def rate_limit(max_requests=10, window=60):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+            result = rate_limit_store.hit(client_ip, max_requests, window, RATE_LIMIT_BLOCK_SECONDS)
+
+            if result == HIT_SPAM_BLOCKED:
+                # الحظر جاي من anti_spam_check - بيتعد تحت سببه الحقيقي طول الـ 15 دقيقة
+                metrics.inc(('rejected', 'anti_spam'))
+                log_event(logging.WARNING, "🚨 IP محظور (anti-spam)", ip=client_ip, status=429)
+                abort(429)
+            if result == HIT_BLOCKED:
+                metrics.inc(('rejected', 'rate_limit'))
+                log_event(logging.WARNING, "🚨 IP محظور", ip=client_ip, status=429)
+                abort(429)
+            if result == HIT_EXCEEDED:
+                metrics.inc(('rejected', 'rate_limit'))
+                log_event(logging.WARNING, "🚨 Rate limit exceeded - IP blocked", ip=client_ip, status=429)
+                abort(429)
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+# حماية إضافية من Spam
+# ====================
+# لكل (IP, User-Agent) بنحفظ آخر 3 أوقات بس تحت hash من 8 bytes بدل النص الكامل،
+# والجدول محدود بـ ANTI_SPAM_MAX_TRACKED_KEYS والأقدم استخداماً بيتشال (LRU).
+# نفس القاعدة: 3 محاولات في الدقيقة = حظر 15 دقيقة.
+ANTI_SPAM_MAX_ATTEMPTS = 3
+ANTI_SPAM_WINDOW = 60               # آخر دقيقة
+ANTI_SPAM_MAX_TRACKED_KEYS = int(os.environ.get('ANTI_SPAM_MAX_TRACKED_KEYS', '100000'))
+SUSPICIOUS_AGENTS = ('bot', 'crawler', 'spider', 'scraper')
+
+
+def spam_key(ip_address, user_agent):
+    """hash صغير ثابت الحجم لـ (IP, User-Agent)"""
+    return hash64(f"{ip_address}\0{user_agent}")
+
+
+class AntiSpamTracker:
+    """آخر المحاولات لكل (IP, User-Agent) في جدول حجمه ثابت - مقسوم شرائح بـ locks زي الـ rate limiter"""
+
+    def __init__(self, max_keys=None, stripes=LOCK_STRIPES):
+        self.max_keys = max_keys or ANTI_SPAM_MAX_TRACKED_KEYS
+        self._max_per_stripe = max(1, self.max_keys // stripes)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._attempts = [OrderedDict() for _ in range(stripes)]  # hash -> tuple بآخر الأوقات
+
+    def record(self, ip_address, user_agent):
+        """True لو المحاولة مسموحة - False لو تجاوز الحد"""
+        current_time = time.time()
+        key = spam_key(ip_address, user_agent)
+        stripe = key % len(self._locks)
+        attempts = self._attempts[stripe]
+
+        with self._locks[stripe]:
+            # تنظيف المحاولات القديمة (أقصى 3 عناصر)
+            recent = tuple(t for t in attempts.get(key, ()) if current_time - t < ANTI_SPAM_WINDOW)
+
+            # إذا أكتر من 3 محاولات في دقيقة واحدة
+            if len(recent) >= ANTI_SPAM_MAX_ATTEMPTS:
+                _lru_put(attempts, key, recent, self._max_per_stripe)
+                return False
+
+            _lru_put(attempts, key, recent + (current_time,), self._max_per_stripe)
+            return True
+
+    def __len__(self):
+        return sum(map(len, self._attempts))
+
+
+class SharedMemoryAntiSpamTracker:
+    """نفس AntiSpamTracker بس في جدول مشترك بين الـ workers (آخر 3 أوقات في الخانة)"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def record(self, ip_address, user_agent):
+        current_time = time.time()
+        key = spam_key(ip_address, user_agent)
+        bucket = self.table.bucket_for(key)
+
+        with self.table.locked(bucket):
+            index, entry = self.table.find(bucket, key)
+            if index is None:
+                index = self.table.claim(bucket, key, SLOT_ATTEMPTS, current_time)
+                entry = [0.0, 0.0, 0.0, 0.0]
+            recent = [t for t in entry[1:] if t and current_time - t < ANTI_SPAM_WINDOW]
+
+            if len(recent) >= ANTI_SPAM_MAX_ATTEMPTS:
+                allowed = False
+            else:
+                recent.append(current_time)
+                allowed = True
+            recent = recent[-ANTI_SPAM_MAX_ATTEMPTS:]
+            values = recent + [0.0] * (ANTI_SPAM_MAX_ATTEMPTS - len(recent))
+            self.table.write(bucket, index, key, SLOT_ATTEMPTS, [max(recent) + ANTI_SPAM_WINDOW] + values)
+            return allowed
+
+    def __len__(self):
+        return self.table.count(SLOT_ATTEMPTS)
+
+
+def create_anti_spam_tracker():
+    """جدول مشترك لو RATE_LIMIT_SHM_PATH متحدد - غير كده جوه الـ worker"""
+    if RATE_LIMIT_SHM_PATH:
+        try:
+            return SharedMemoryAntiSpamTracker(SharedSlotTable(shared_table_path('antispam'), RATE_LIMIT_SHM_BUCKETS))
+        except (OSError, ValueError, RuntimeError) as e:
+            log_event(logging.WARNING, "⚠️ مش قادر أفتح جدول الـ anti-spam في الـ shared memory - هيبقى محلي", error=str(e))
+    return AntiSpamTracker()
+
+
+anti_spam_tracker = create_anti_spam_tracker()
+
+
+def anti_spam_check(ip_address, user_agent):
+    """فحص إضافي ضد الـ spam والـ bots"""
+    # فحص User Agent
+    agent = user_agent.lower()
+    if any(suspicious in agent for suspicious in SUSPICIOUS_AGENTS):
+        metrics.inc(('rejected', 'anti_spam'))
+        log_event(logging.WARNING, "🚨 Suspicious user agent", ip=ip_address)
+        return False
+    
+    # فحص التكرار السريع
+    if not anti_spam_tracker.record(ip_address, user_agent):
+        rate_limit_store.block(ip_address, ANTI_SPAM_BLOCK_SECONDS, HIT_SPAM_BLOCKED)  # حظر 15 دقيقة
+        metrics.inc(('rejected', 'anti_spam'))
+        log_event(logging.WARNING, "🚨 Anti-spam triggered - IP blocked", ip=ip_address)
+        return False
+    
+    return True
+
+# 🔥 جدول العروض - مع الأسعار الوهمية
+# =====================================
+# الجدول موجود في ملف الكتالوج (catalog.json) تحت "offers":
+# 📝 كل سطر = عرض واحد على (اللعبة, المنصة, نوع الحساب):
+# - active     = "yas" العرض شغال | "no" مقفول
+# - fake_price = السعر الوهمي (اللي هيتشطب)
+# - real_price = السعر الحقيقي (اللي العميل هيدفعه)
+# - الخصم هيتحسب تلقائي = ((FAKE - REAL) / FAKE) * 100
+# - starts_at / ends_at (اختياري) = بداية ونهاية العرض، مثلاً "2026-11-27T00:00:00+02:00"
+#   (من غير منطقة زمنية = توقيت OFFERS_TIMEZONE). العرض بيبدأ ويقف لوحده في الميعاد من غير restart.
+#
+# 🎮 "offers_settings" فيه التحكم العام:
+# - all_offers_active = "yas" كل العروض شغالة | "no" كل العروض مقفولة
+# - show_popup        = "yas" يظهر البوب اب | "no" مايظهرش
+# - popup_title / popup_description = نصوص العرض المنبثق
+#
+# 💡 لإضافة إصدار جديد: ضيف سطر واحد في الجدول - مفيش أي كود يتغير
+
+OFFERS_TIMEZONE_NAME = os.environ.get('OFFERS_TIMEZONE', 'Africa/Cairo')
+try:
+    OFFERS_TIMEZONE = ZoneInfo(OFFERS_TIMEZONE_NAME)
+except (ZoneInfoNotFoundError, ValueError):  # مفيش tzdata على الجهاز
+    OFFERS_TIMEZONE = timezone(timedelta(hours=2))
+
+
+def parse_offer_time(value):
+    """نص ISO 8601 -> datetime بمنطقة زمنية (None لو مش متحدد) - بيرفع ValueError لو الصيغة غلط"""
+    if value is None:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=OFFERS_TIMEZONE)
+    return moment
+
+
+class OfferSchedule(NamedTuple):
+    """فهرس الفترات: كل أوقات البداية والنهاية مترتبة، وبين كل حدين مجموعة العروض الشغالة ثابتة"""
+    boundaries: tuple       # أوقات التغيير (epoch) مترتبة من غير تكرار
+    segments: tuple         # segments[i] = أرقام سطور العروض الشغالة قبل boundaries[i] (وبعد boundaries[i-1])
+
+    def phase(self, now):
+        """(رقم الفترة, وقت التغيير الجاي أو None) - binary search"""
+        position = bisect.bisect_right(self.boundaries, now)
+        return position, (self.boundaries[position] if position < len(self.boundaries) else None)
+
+
+def build_offer_schedule(source):
+    """بناء فهرس الفترات لجدول العروض (مرة واحدة لكل نسخة من ملف الكتالوج)"""
+    windows = []
+    for position, row in enumerate(source["offers"]):
+        if row["active"] != "yas":
+            continue
+        starts_at, ends_at = parse_offer_time(row.get("starts_at")), parse_offer_time(row.get("ends_at"))
+        windows.append((position,
+                        starts_at.timestamp() if starts_at else float('-inf'),
+                        ends_at.timestamp() if ends_at else float('inf')))
+
+    boundaries = sorted({edge for _, start, end in windows for edge in (start, end) if edge not in (float('-inf'), float('inf'))})
+    # الفترة i بتبدأ عند boundaries[i-1] (والأولى من الأزل)
+    segments = tuple(
+        frozenset(position for position, start, end in windows if start <= segment_start < end)
+        for segment_start in [float('-inf')] + boundaries
+    )
+    return OfferSchedule(tuple(boundaries), segments)
+
+
+def calculate_discount(fake_price, real_price):
+    """حساب نسبة الخصم تلقائياً"""
+    if fake_price <= 0 or real_price < 0 or real_price >= fake_price:
+        return 0
+    return round(((fake_price - real_price) / fake_price) * 100)
+
+
+class OfferIndex(NamedTuple):
+    by_sku: dict            # (game, platform, account) -> العرض
+    eligible_games: frozenset
+    offers_list: list       # بنفس ترتيب الجدول
+
+
+def compile_offers(source=None, now=None, schedule=None):
+    """تحويل جدول العروض الشغالة في الوقت now لفهرس: قاموس بالـ SKU + مجموعة الألعاب المؤهلة"""
+    source = source or get_catalog().source
+    by_sku = {}
+    eligible_games = set()
+    offers_list = []
+
+    if source["offers_settings"]["all_offers_active"] != "yas":
+        return OfferIndex({}, frozenset(), [])
+
+    if schedule is None:
+        # نفس مصدر اللقطة الحالية = نفس فهرس الفترات - من غير ما نقرا تواريخ كل الصفوف تاني
+        current = _catalog_snapshot
+        schedule = current.schedule if current is not None and source is current.source else build_offer_schedule(source)
+    live = schedule.segments[schedule.phase(time.time() if now is None else now)[0]]
+    for position, row in enumerate(source["offers"]):
+        if position not in live:
+            continue
+        discount = calculate_discount(row["fake_price"], row["real_price"])
+        if discount <= 0:
+            continue
+        offer = {
+            "game": row["game"], "platform": row["platform"], "account": row["account"],
+            "fake_price": row["fake_price"], "real_price": row["real_price"], "discount": discount
+        }
+        if row.get("ends_at"):
+            offer["ends_at"] = parse_offer_time(row["ends_at"]).astimezone(OFFERS_TIMEZONE).isoformat()
+        by_sku[(row["game"], row["platform"], row["account"])] = offer
+        eligible_games.add(row["game"])
+        offers_list.append(offer)
+
+    return OfferIndex(by_sku, frozenset(eligible_games), offers_list)
+
+
+def get_offers(offer_index=None, source=None):
+    """العروض النشطة بالصيغة اللي بتستخدمها الصفحة والـ API"""
+    source = source or get_catalog().source
+    if offer_index is None:
+        offer_index = compile_offers(source)
+    settings = source["offers_settings"]
+    active_offers = offer_index.offers_list
+
+    # ترتيب الألعاب المؤهلة بنفس ترتيب ظهورها في الجدول
+    offer_cards = list(dict.fromkeys(offer["game"] for offer in active_offers))
+
+    return {
+        "active_offer": {
+            "id": f"smart_pricing_2025",
+            "title": settings["popup_title"],
+            "description": settings["popup_description"],
+            "offers_list": active_offers,
+            "show_popup": (settings["show_popup"] == "yas" and settings["all_offers_active"] == "yas"
+                           and len(active_offers) > 0),
+            "popup_frequency": "once_per_session"
+        } if active_offers else None,
+        "offer_cards": offer_cards
+    }
+
+
+# 🔥 دالة تطبيق الأسعار الذكية
+def apply_offer_discount(prices, offers):
+    """تطبيق الأسعار الذكية مع الخصومات الوهمية - lookup واحد لكل SKU"""
+    if not offers.get("active_offer") or not offers["active_offer"].get("offers_list"):
+        return prices
+
+    by_sku = {
+        (offer["game"], offer["platform"], offer["account"]): offer
+        for offer in offers["active_offer"]["offers_list"]
+    }
+
+    for game_id, game in prices["games"].items():
+        for platform_id, platform_data in game["platforms"].items():
+            for account_id, account in platform_data["accounts"].items():
+                offer = by_sku.get((game_id, platform_id, account_id))
+                if offer is None:
+                    continue
+                # تطبيق الأسعار الذكية
+                account["original_price"] = offer["fake_price"]          # السعر الوهمي (اللي هيتشطب)
+                account["price"] = offer["real_price"]                   # السعر الحقيقي (اللي العميل هيدفعه)
+                account["discount_percentage"] = offer["discount"]       # نسبة الخصم المحسوبة
+
+    return prices
+
+
+# الأسعار - من ملف الكتالوج (catalog.json) تحت "prices"
+def get_prices(source=None):
+    """نسخة جديدة قابلة للتعديل من الأسعار الأساسية (قبل الخصومات)"""
+    source = source or get_catalog().source
+    return _thaw(source["prices"])
+
+
+# 📄 ملف الكتالوج الخارجي
+# =======================
+# تغيير الأسعار أو العروض = تعديل catalog.json بس - من غير ما نعمل restart.
+# كل worker بيعمل stat رخيص للملف كل CATALOG_CHECK_INTERVAL ثانية،
+# ولو اتغير بيقراه ويتحقق منه ويبني لقطة جديدة ويبدلها مرة واحدة.
+# لو الملف الجديد فيه غلط بنسجل الخطأ ونكمل باللقطة القديمة.
+# 💡 الأفضل الكتابة عن طريق ملف مؤقت + rename (save_catalog_source بتعمل كده).
+
+CATALOG_FILE = os.environ.get('CATALOG_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog.json'))
+CATALOG_CHECK_INTERVAL = float(os.environ.get('CATALOG_CHECK_INTERVAL', '2'))
+
+
+def _is_price(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _require(condition, message):
+    if not condition:
+        raise ValueError(f"ملف الكتالوج غير صحيح: {message}")
+
+
+def validate_catalog_source(source):
+    """التحقق من هيكل ملف الكتالوج قبل ما يتطبق - بيرفع ValueError لو فيه مشكلة"""
+    _require(isinstance(source, dict), "المحتوى لازم يكون object")
+    for key in ("offers_settings", "offers", "prices"):
+        _require(key in source, f"المفتاح '{key}' ناقص")
+
+    settings = source["offers_settings"]
+    _require(isinstance(settings, dict), "offers_settings لازم يكون object")
+    for key in ("all_offers_active", "show_popup"):
+        _require(settings.get(key) in ("yas", "no"), f"offers_settings.{key} لازم يكون yas أو no")
+    for key in ("popup_title", "popup_description"):
+        _require(isinstance(settings.get(key), str), f"offers_settings.{key} لازم يكون نص")
+
+    prices = source["prices"]
+    _require(isinstance(prices, dict) and isinstance(prices.get("games"), dict) and prices["games"],
+             "prices.games لازم يكون object غير فاضي")
+    _require(isinstance(prices.get("settings"), dict), "prices.settings لازم يكون object")
+    for key in ("currency", "whatsapp_number"):
+        _require(isinstance(prices["settings"].get(key), str), f"prices.settings.{key} لازم يكون نص")
+
+    for game_id, game in prices["games"].items():
+        _require(isinstance(game, dict) and isinstance(game.get("name"), str), f"{game_id}: الاسم ناقص")
+        _require(isinstance(game.get("platforms"), dict) and game["platforms"], f"{game_id}: مفيش منصات")
+        for platform_id, platform in game["platforms"].items():
+            where = f"{game_id}/{platform_id}"
+            _require(isinstance(platform, dict) and isinstance(platform.get("name"), str), f"{where}: الاسم ناقص")
+            _require(isinstance(platform.get("icon"), str), f"{where}: الأيقونة ناقصة")
+            _require(isinstance(platform.get("accounts"), dict) and platform["accounts"], f"{where}: مفيش حسابات")
+            for account_id, account in platform["accounts"].items():
+                _require(isinstance(account, dict) and isinstance(account.get("name"), str),
+                         f"{where}/{account_id}: الاسم ناقص")
+                _require(_is_price(account.get("price")), f"{where}/{account_id}: السعر لازم يكون رقم صحيح موجب")
+
+    _require(isinstance(source["offers"], list), "offers لازم يكون list")
+    seen = set()
+    for position, row in enumerate(source["offers"], 1):
+        _require(isinstance(row, dict), f"العرض رقم {position} لازم يكون object")
+        sku = (row.get("game"), row.get("platform"), row.get("account"))
+        _require(sku not in seen, f"العرض رقم {position} متكرر: {sku}")
+        seen.add(sku)
+        game = prices["games"].get(sku[0])
+        _require(game is not None and sku[1] in game["platforms"]
+                 and sku[2] in game["platforms"][sku[1]]["accounts"],
+                 f"العرض رقم {position} على منتج مش موجود: {sku}")
+        _require(row.get("active") in ("yas", "no"), f"العرض رقم {position}: active لازم يكون yas أو no")
+        _require(_is_price(row.get("fake_price")) and _is_price(row.get("real_price")),
+                 f"العرض رقم {position}: الأسعار لازم تكون أرقام صحيحة موجبة")
+        window = []
+        for key in ("starts_at", "ends_at"):
+            value = row.get(key)
+            _require(value is None or isinstance(value, str), f"العرض رقم {position}: {key} لازم يكون نص ISO 8601")
+            try:
+                window.append(parse_offer_time(value))
+            except ValueError:
+                _require(False, f"العرض رقم {position}: {key} مش تاريخ صحيح: {value}")
+        _require(None in window or window[0] < window[1], f"العرض رقم {position}: starts_at لازم يكون قبل ends_at")
+
+    return source
+
+
+def load_catalog_source(path=None):
+    """قراءة ملف الكتالوج والتحقق منه"""
+    with open(path or CATALOG_FILE, encoding='utf-8') as catalog_file:
+        return validate_catalog_source(json.load(catalog_file))
+
+
+def save_catalog_source(source, path=None):
+    """كتابة ملف الكتالوج بأمان: تحقق ثم ملف مؤقت ثم rename (الـ workers مش هتشوف ملف نص مكتوب)"""
+    path = path or CATALOG_FILE
+    validate_catalog_source(source)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as catalog_file:
+        json.dump(source, catalog_file, ensure_ascii=False, indent=2)
+        catalog_file.write("\n")
+        catalog_file.flush()
+        os.fsync(catalog_file.fileno())
+    os.replace(temp_path, path)
+
+
+# 📦 لقطة الكتالوج - الأسعار + العروض مدمجين ومتجمدين
+# =====================================================
+# بدل ما كل طلب يبني get_prices() و get_offers() ويطبق الخصومات من الأول،
+# بنبني اللقطة مرة واحدة لكل نسخة من ملف الكتالوج ونسلمها للقراءة فقط لكل الـ routes.
+# الـ version عبارة عن hash للمحتوى - أي طبقة كاش تقدر تستخدمه كمفتاح.
+# العروض المجدولة: اللقطة ليها expires_at = ميعاد أول بداية/نهاية عرض جاية، وget_catalog() بيبني
+# لقطة الفترة الجديدة في نفس اللحظة دي - فكل الكاش (JSON, الصفحة) بيتجدد بالظبط عند الحد، من غير TTL.
+# ⚠️ كل route تاخد get_catalog() مرة واحدة وتكمل بيها - عشان الطلب ميشوفش نسختين.
+
+class _FrozenDict(dict):
+    """قاموس للقراءة فقط - أي محاولة تعديل بترفع TypeError"""
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("الكتالوج للقراءة فقط - عدل المصدر وأعد بناء اللقطة")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def _freeze(value):
+    """تجميد الهيكل بالكامل: القواميس للقراءة فقط والقوائم tuples"""
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """عكس _freeze - نسخة عادية قابلة للتعديل"""
+    if isinstance(value, dict):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(item) for item in value]
+    return value
+
+
+class Sku(NamedTuple):
+    game_type: str
+    platform: str
+    account_type: str
+
+
+class CatalogSnapshot(NamedTuple):
+    version: str
+    prices: dict
+    offers: dict
+    offer_index: OfferIndex
+    source: dict            # محتوى ملف الكتالوج اللي اللقطة اتبنت منه
+    valid_skus: frozenset   # كل (game, platform, account) الموجودين - للتحقق بـ lookup واحد
+    built_at: float
+    schedule: OfferSchedule
+    expires_at: float       # ميعاد التغيير الجاي في العروض (epoch) - None لو مفيش
+
+
+def catalog_version(prices, offers):
+    """hash ثابت للمحتوى - نفس البيانات = نفس الإصدار"""
+    payload = json.dumps({"prices": prices, "offers": offers}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def build_catalog_snapshot(source, now=None, schedule=None):
+    """بناء الأسعار والعروض (الشغالة في الوقت now) وتطبيق الخصومات مرة واحدة"""
+    now = time.time() if now is None else now
+    schedule = schedule or build_offer_schedule(source)
+    offer_index = compile_offers(source, now, schedule)
+    offers = get_offers(offer_index, source)
+    prices = apply_offer_discount(get_prices(source), offers)
+    frozen_offers = _freeze(offers)
+    return CatalogSnapshot(
+        version=catalog_version(prices, offers),
+        prices=_freeze(prices),
+        offers=frozen_offers,
+        offer_index=OfferIndex(
+            by_sku=_freeze(offer_index.by_sku),
+            eligible_games=offer_index.eligible_games,
+            offers_list=frozen_offers["active_offer"]["offers_list"] if frozen_offers["active_offer"] else ()
+        ),
+        source=_freeze(source),
+        valid_skus=frozenset(
+            Sku(game_id, platform_id, account_id)
+            for game_id, game in prices["games"].items()
+            for platform_id, platform in game["platforms"].items()
+            for account_id in platform["accounts"]
+        ),
+        built_at=time.time(),
+        schedule=schedule,
+        expires_at=schedule.phase(now)[1]
+    )
+
+
+_catalog_snapshot = None
+_catalog_file_signature = None
+_next_catalog_check = 0.0
+_catalog_reload_lock = threading.Lock()
+_catalog_changed = threading.Condition()     # بيصحي اتصالات /events/offers مع كل لقطة جديدة
+
+
+def get_catalog():
+    """اللقطة الحالية - للقراءة فقط (مع فحص رخيص لتغيير ملف الكتالوج ولحدود العروض)"""
+    if time.monotonic() >= _next_catalog_check:
+        reload_catalog_if_changed()
+    snapshot = _catalog_snapshot
+    if snapshot.expires_at is not None and time.time() >= snapshot.expires_at:
+        snapshot = advance_catalog_schedule()
+    return snapshot
+
+
+def advance_catalog_schedule():
+    """عرض بدأ أو خلص: لقطة الفترة الجديدة من نفس المصدر - الطلبات بتستنى البناء عشان محدش يشوف عرض منتهي"""
+    # نفس lock إعادة التحميل - عشان لقطة من ملف جديد متتغطاش بفترة من المصدر القديم
+    with _catalog_reload_lock:
+        snapshot = _catalog_snapshot
+        now = time.time()
+        if snapshot.expires_at is None or now < snapshot.expires_at:
+            return snapshot             # thread تاني لحق بناها
+        previous_version = snapshot.version
+        snapshot = _install_catalog(build_catalog_snapshot(snapshot.source, now, snapshot.schedule))
+        log_event(logging.INFO, "⏰ تغيير في العروض المجدولة", previous_version=previous_version, version=snapshot.version)
+        return snapshot
+
+
+def _catalog_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+# آخر CATALOG_HISTORY_SIZE إصدار (في الـ worker ده) مع أسعار كل SKU - عشان /api/prices?since= يرجع الفرق بس
+CATALOG_HISTORY_SIZE = 32
+_catalog_history = OrderedDict()        # version -> {Sku: (price, original_price, discount_percentage)}
+_catalog_history_lock = threading.Lock()
+
+
+def price_points(prices):
+    """الأسعار بشكل مسطح: Sku -> (السعر, السعر الأصلي أو None, نسبة الخصم أو None)"""
+    return {
+        Sku(game_id, platform_id, account_id): (account["price"], account.get("original_price"),
+                                                account.get("discount_percentage"))
+        for game_id, game in prices["games"].items()
+        for platform_id, platform in game["platforms"].items()
+        for account_id, account in platform["accounts"].items()
+    }
+
+
+def catalog_history(version):
+    """أسعار إصدار قديم (None لو خرج من التاريخ أو عمره ما كان في الـ worker ده)"""
+    with _catalog_history_lock:
+        return _catalog_history.get(version)
+
+
+def _install_catalog(snapshot):
+    """استبدال اللقطة الحالية - تعيين مرجع واحد، فالطلبات يا تشوف القديمة يا الجديدة كاملة"""
+    global _catalog_snapshot
+    points = price_points(snapshot.prices)
+    with _catalog_history_lock:
+        _lru_put(_catalog_history, snapshot.version, points, CATALOG_HISTORY_SIZE)
+    _catalog_snapshot = snapshot
+    with _catalog_changed:
+        _catalog_changed.notify_all()
+    log_event(logging.INFO, "📦 تم بناء الكتالوج", version=snapshot.version)
+    return snapshot
+
+
+def refresh_catalog(source=None):
+    """إعادة بناء اللقطة من المصدر (أو من ملف الكتالوج) واستبدالها"""
+    global _catalog_file_signature
+    if source is None:
+        signature = _catalog_signature(CATALOG_FILE)
+        source = load_catalog_source()
+        _catalog_file_signature = signature
+    return _install_catalog(build_catalog_snapshot(source))
+
+
+def reload_catalog_if_changed():
+    """لو ملف الكتالوج اتغير: تحميل + تحقق + استبدال. غير كده مفيش أي شغل"""
+    global _next_catalog_check, _catalog_file_signature
+    # thread واحد بس يعمل الفحص - الباقي يكمل باللقطة الحالية من غير انتظار
+    if not _catalog_reload_lock.acquire(blocking=False):
+        return False
+    try:
+        _next_catalog_check = time.monotonic() + CATALOG_CHECK_INTERVAL
+        try:
+            signature = _catalog_signature(CATALOG_FILE)
+        except OSError as e:
+            log_event(logging.WARNING, "⚠️ ملف الكتالوج مش متاح - هنكمل بالنسخة الحالية", path=CATALOG_FILE, error=str(e))
+            return False
+        if signature == _catalog_file_signature:
+            return False
+
+        previous_version = _catalog_snapshot.version if _catalog_snapshot else None
+        try:
+            source = load_catalog_source()
+        except (OSError, ValueError) as e:
+            # مش هنحاول تاني لحد ما الملف يتغير
+            _catalog_file_signature = signature
+            log_event(logging.ERROR, "❌ فشل تحميل ملف الكتالوج - هنكمل بالنسخة الحالية", path=CATALOG_FILE, error=str(e))
+            return False
+
+        _catalog_file_signature = signature
+        snapshot = build_catalog_snapshot(source)
+        # نفس الإصدار مش معناه نفس الملف: عرض مجدول جديد مبيغيرش الأسعار الحالية بس لازم جدوله يتطبق
+        if snapshot.version == previous_version and snapshot.source == _catalog_snapshot.source:
+            return False
+        _install_catalog(snapshot)
+        metrics.inc(('catalog_reloads',))
+        log_event(logging.INFO, "🔄 تم تحديث الكتالوج من الملف", previous_version=previous_version, version=snapshot.version)
+        return True
+    finally:
+        _catalog_reload_lock.release()
+
+
+refresh_catalog()
+
+# ⚡ ردود جاهزة مسبقاً لكل إصدار من الكتالوج
+# ==========================================
+# الـ JSON بيتعمله serialize مرة واحدة لكل إصدار ويتحفظ bytes مع نسخ gzip و brotli.
+# كل نسخة ليها ETag قوي، وطلب If-None-Match المطابق بياخد 304 من غير body.
+
+class PreparedBody(NamedTuple):
+    etag: str
+    mimetype: str
+    variants: dict          # encoding -> bytes ('identity' / 'gzip' / 'br')
+
+
+def prepare_body(body, mimetype):
+    """تجهيز الـ body مع النسخ المضغوطة والـ ETag"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body)
+    return PreparedBody(hashlib.sha256(body).hexdigest()[:32], mimetype, variants)
+
+
+def prepare_json(data):
+    """نفس ناتج jsonify بالظبط - بس bytes جاهزة"""
+    return prepare_body(app.json.dumps(data, separators=(",", ":")) + "\n", app.json.mimetype)
+
+
+_prepared_responses = {}
+_prepared_building = {}         # مفتاح -> lock: thread واحد بس يبني نفس الرد والباقي يستنى النتيجة
+_prepared_lock = threading.Lock()
+
+
+def get_prepared(catalog, name, build):
+    """الرد الجاهز (أو أي حاجة محسوبة) لإصدار الكتالوج ده - بيتبني أول مرة بس"""
+    key = (catalog.version, name)
+    prepared = _prepared_responses.get(key)
+    if prepared is not None:
+        metrics.cache_lookup(name, True)
+        return prepared
+    metrics.cache_lookup(name, False)
+
+    with _prepared_lock:
+        build_lock = _prepared_building.setdefault(key, threading.Lock())
+    with build_lock:
+        prepared = _prepared_responses.get(key)
+        if prepared is None:
+            prepared = build(catalog)
+            with _prepared_lock:
+                # أي رد من إصدار قديم مبقاش له لازمة
+                for stale in [k for k in _prepared_responses if k[0] != catalog.version]:
+                    del _prepared_responses[stale]
+                for stale in [k for k in _prepared_building if k[0] != catalog.version]:
+                    del _prepared_building[stale]
+                _prepared_responses[key] = prepared
+    return prepared
+
+
+def _variant_etag(prepared, encoding):
+    return prepared.etag if encoding == 'identity' else f"{prepared.etag}-{encoding}"
+
+
+def send_prepared(prepared, cache_control='no-cache'):
+    """اختيار الضغط حسب Accept-Encoding + الرد بـ 304 لو الـ ETag متطابق"""
+    encoding = 'identity'
+    for candidate in ('br', 'gzip'):
+        if candidate in prepared.variants and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+
+    if any(request.if_none_match.contains_weak(_variant_etag(prepared, known)) for known in prepared.variants):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(prepared.variants[encoding], mimetype=prepared.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(_variant_etag(prepared, encoding))
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+                       
+# بداية الطلب - للـ latency في السجلات
+@app.before_request
+def mark_request_start():
+    g.request_started = time.perf_counter()
+
+# تسجيل الطلب في المقاييس
+@app.after_request
+def record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None and request.url_rule is not None:
+        metrics.observe_request(request.url_rule.rule, response.status_code, time.perf_counter() - started)
+    return response
+
+# Headers أمنية قوية
+@app.after_request
+def security_headers(response):
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['X-Frame-Options'] = 'DENY'
+    response.headers['X-XSS-Protection'] = '1; mode=block'
+    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+    response.headers['Content-Security-Policy'] = "default-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://wa.me"
+    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+    response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
+    return response
+
+# تنظيف المدخلات
+_UNSAFE_CHARS = re.compile(r'[<>"\';\\&]')
+_UNSAFE_WORDS = re.compile(r'(script|javascript|vbscript|onload|onerror)', re.IGNORECASE)
+
+
+def sanitize_input(text, max_length=100):
+    if not text:
+        return None
+    
+    text = str(text).strip()
+    
+    if len(text) > max_length:
+        return None
+    
+    text = _UNSAFE_CHARS.sub('', text)
+    text = _UNSAFE_WORDS.sub('', text)
+    
+    return text
+
+
+# التحقق من المنتج المطلوب
+# =======================
+# بدل تنظيف النصوص بـ regex وبعدين البحث في الأسعار: القيم لازم تكون SKU موجود
+# فعلاً في الكتالوج - lookup واحد في frozenset، وأي قيمة تانية بترفض على طول.
+MISSING_SKU = 'missing'
+INVALID_SKU = 'invalid'
+
+
+def parse_sku(catalog, game_type, platform, account_type):
+    """(Sku, None) لو المنتج موجود - غير كده (None, MISSING_SKU أو INVALID_SKU)"""
+    if not (game_type and platform and account_type):
+        return None, MISSING_SKU
+    # طلبات JSON (السلة) ممكن تبعت أرقام أو قوايم مكان النص
+    if not all(isinstance(value, str) for value in (game_type, platform, account_type)):
+        return None, INVALID_SKU
+    sku = Sku(game_type.strip(), platform.strip(), account_type.strip())
+    if sku not in catalog.valid_skus:
+        return None, INVALID_SKU
+    return sku, None
+
+# 🗜️ ضغط باقي الردود (اللي مش من الردود الجاهزة)
+# ==============================================
+# أي رد نصي أكبر من COMPRESS_MIN_SIZE بيتضغط حسب Accept-Encoding (br ثم gzip).
+# النسخة المضغوطة بتتحفظ بـ hash المحتوى، فنفس الـ body (زي رسائل الأخطاء أو /metrics وقت الهدوء)
+# بيتضغط مرة واحدة بس. الردود الجاهزة (send_prepared) جاية مضغوطة فبتعدي زي ما هي.
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_CACHE_MAX_ENTRIES = 256
+COMPRESS_CACHE_MAX_BODY = 512 * 1024          # أي body أكبر من كده بيتضغط من غير ما يتحفظ
+COMPRESSIBLE_MIMETYPES = frozenset({'text/html', 'text/plain', 'text/css', 'text/javascript',
+                                    'application/json', 'application/javascript', 'image/svg+xml'})
+
+_compressed_bodies = OrderedDict()          # (hash المحتوى, encoding) -> bytes
+_compressed_lock = threading.Lock()
+
+
+def compress_body(body, encoding):
+    """ضغط سريع (الردود دي بتتعمل وقت الطلب) - الـ br بـ quality 5 والـ gzip بـ level 6"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def cached_compress(body, encoding):
+    if len(body) > COMPRESS_CACHE_MAX_BODY:
+        return compress_body(body, encoding)
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+    with _compressed_lock:
+        compressed = _compressed_bodies.get(key)
+        if compressed is not None:
+            _compressed_bodies.move_to_end(key)
+    metrics.cache_lookup('compression', compressed is not None)
+    if compressed is None:
+        compressed = compress_body(body, encoding)
+        with _compressed_lock:
+            _lru_put(_compressed_bodies, key, compressed, COMPRESS_CACHE_MAX_ENTRIES)
+    return compressed
+
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    # الرد بيختلف حسب Accept-Encoding - الـ proxy لازم يخزن كل نسخة لوحدها
+    response.vary.add('Accept-Encoding')
+    encoding = None
+    for candidate in ('br', 'gzip'):
+        if (candidate != 'br' or brotli is not None) and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+    if encoding is None:
+        return response
+
+    response.set_data(cached_compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+# 🎨 ملفات CSS/JS الثابتة - مصغرة وبـ fingerprint
+# ===============================================
+# المصادر في assets/ بتتصغر وتتضغط مرة واحدة عند التشغيل، واسمها بيبقى فيه hash المحتوى
+# (site.css -> site.3f2a9c1b7e4d.css) فالمتصفح والـ CDN يخزنوها سنة كاملة (immutable):
+# أي تعديل = اسم جديد في الصفحة. الملفات من نفس الـ origin فالـ CSP ('self') مسمحلها.
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+ASSET_MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/|\s+', re.DOTALL)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(source):
+    """شيل التعليقات والمسافات الزيادة (النصوص بين علامات التنصيص زي ما هي)"""
+    parts = []
+    pending = []                                # الكود اللي بين النصوص - بيتضغط مرة واحدة قبل أي نص
+    position = 0
+
+    def flush():
+        parts.append(_CSS_PUNCTUATION.sub(r'\1', ''.join(pending)).replace(';}', '}'))
+        pending.clear()
+
+    for match in _CSS_TOKENS.finditer(source):
+        pending.append(source[position:match.start()])
+        token = match.group(0)
+        if match.group(1):
+            flush()
+            parts.append(token)                 # نص بين علامات تنصيص
+        elif not token.startswith('/*'):
+            pending.append(' ')                 # مسافات -> مسافة واحدة
+        position = match.end()
+    pending.append(source[position:])
+    flush()
+    return ''.join(parts).strip()
+
+
+def minify_js(source):
+    """تصغير آمن: شيل المسافات في أول السطر والسطور الفاضية وسطور التعليقات //
+    (السطور نفسها زي ما هي عشان الـ ASI والـ template strings مايتأثروش)"""
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+ASSET_MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+class Asset(NamedTuple):
+    url: str
+    prepared: PreparedBody
+
+
+def build_assets(directory=ASSETS_DIR):
+    """اسم الملف -> Asset (الرابط بالـ fingerprint + النسخ الجاهزة)"""
+    assets = {}
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        if extension not in ASSET_MINIFIERS:
+            continue
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            body = ASSET_MINIFIERS[extension](f.read())
+        prepared = prepare_body(body, ASSET_MIMETYPES[extension])
+        assets[name] = Asset(f"/assets/{stem}.{prepared.etag[:12]}{extension}", prepared)
+    log_event(logging.INFO, "🎨 تم تجهيز الملفات الثابتة", assets=[asset.url for asset in assets.values()])
+    return assets
+
+
+_assets = build_assets()
+_assets_by_url = {asset.url: asset for asset in _assets.values()}
+
+
+@app.template_global()
+def asset_url(name):
+    """الرابط بالـ fingerprint للملف ده (للاستخدام في الـ templates)"""
+    return _assets[name].url
+
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    asset = _assets_by_url.get(f"/assets/{filename}")
+    if asset is None:
+        abort(404)
+    return send_prepared(asset.prepared, cache_control=ASSET_CACHE_CONTROL)
+
+# 🧩 الـ view-model بتاع الصفحة
+# ============================
+# تصنيف كل لعبة (نوعها، شارة العرض، اسمها في الـ popup) ووصف كل نوع حساب في مكان واحد هنا،
+# والكروت بتتبني مرة واحدة لكل إصدار كتالوج - الـ template مجرد loop،
+# والـ popup (/get_offers) والصفحة بيستخدموا نفس التصنيف فمش ممكن يختلفوا.
+
+class GameEdition(NamedTuple):
+    marker: str             # جزء من game_id (زي 'AR_Standard')
+    badge_class: str
+    badge_icon: str
+    badge_label: str        # الشارة في عروض الصفحة
+    display_name: str       # العنوان في الـ popup
+
+
+GAME_EDITIONS = (
+    GameEdition('AR_Standard', 'ar-standard-badge', 'fas fa-star', 'Standard Edition (Arabic) 🇸🇦', '🇸🇦 Standard Edition (Arabic)'),
+    GameEdition('AR_Ultimate', 'ar-ultimate-badge', 'fas fa-crown', 'Ultimate Edition (Arabic) 🇸🇦', '🇸🇦 Ultimate Edition (Arabic)'),
+    GameEdition('EN_Standard', 'en-standard-badge', 'fas fa-star', 'Standard Edition (English) 🇺🇸', '🇺🇸 Standard Edition (English)'),
+    GameEdition('EN_Ultimate', 'en-ultimate-badge', 'fas fa-crown', 'Ultimate Edition (English) 🇺🇸', '🇺🇸 Ultimate Edition (English)'),
+    GameEdition('XBOX_Standard', 'xbox-standard-badge', 'fab fa-xbox', 'Xbox Standard 🎮', '🎮 Xbox Standard Edition'),
+    GameEdition('XBOX_Ultimate', 'xbox-ultimate-badge', 'fab fa-xbox', 'Xbox Ultimate 🎮', '🎮 Xbox Ultimate Edition'),
+    GameEdition('PC_Standard', 'pc-standard-badge', 'fas fa-desktop', 'PC Standard 🖥️', '🖥️ PC Standard (شهر)'),
+    GameEdition('PC_Ultimate', 'pc-ultimate-badge', 'fas fa-desktop', 'PC Ultimate 🖥️', '🖥️ PC Ultimate (سنة)'),
+    GameEdition('STEAM_Standard', 'steam-standard-badge', 'fab fa-steam-symbol', 'Steam Standard 🖥️', '🖥️ Steam Standard'),
+    GameEdition('STEAM_Ultimate', 'steam-ultimate-badge', 'fab fa-steam-symbol', 'Steam Ultimate 🖥️', '🖥️ Steam Ultimate'),
+)
+
+# نوع اللعبة لفلتر الكروت (data-game-type) - الترتيب مهم: أول علامة موجودة في game_id
+GAME_TYPE_MARKERS = (('EN', 'english'), ('AR', 'arabic'), ('XBOX', 'xbox'), ('PC', 'pc'), ('STEAM', 'steam'))
+
+ACCOUNT_DISPLAY_NAMES = {
+    "Full": "حساب كامل",
+    "Primary": "تفعيل أساسي",
+    "Secondary": "تسجيل دخول مؤقت",
+}
+
+ACCOUNT_DESCRIPTIONS = {
+    "Full": "حساب كامل - اللعبة ملكك تماماً",
+    "Primary": "فعله كأساسي والعب من حسابك",
+    "Secondary": "تسجيل دخول مؤقت - ممنوع تفعيل",
+}
+
+SHOWCASE_MAX_OFFERS = 6
+
+
+def game_edition(game_id):
+    """الإصدار (للشارة واسم الـ popup) - None لو اللعبة مش معروفة"""
+    for edition in GAME_EDITIONS:
+        if edition.marker in game_id:
+            return edition
+    return None
+
+
+def game_type(game_id):
+    for marker, kind in GAME_TYPE_MARKERS:
+        if marker in game_id:
+            return kind
+    return None
+
+
+class AccountOption(NamedTuple):
+    account_id: str
+    name: str
+    description: str
+    price: int
+    price_text: str
+    original_price_text: str        # فاضي لو مفيش خصم
+    discount_percentage: int
+
+
+class ProductCard(NamedTuple):
+    game_id: str
+    platform_id: str
+    game_type: str                  # None لو مش معروف
+    is_offer: bool
+    title: str
+    platform_name: str
+    platform_icon: str              # HTML من الكتالوج
+    accounts: tuple
+
+
+class ShowcaseOffer(NamedTuple):
+    game: str
+    platform: str
+    account: str
+    edition: GameEdition            # None لو اللعبة مش معروفة
+    fake_price_text: str
+    real_price_text: str
+    discount: int
+
+
+class PageView(NamedTuple):
+    cards: tuple
+    showcase: tuple                 # أول SHOWCASE_MAX_OFFERS عروض
+    more_offers: int                # عدد العروض الباقية
+    currency: str
+    currency_short: str
+
+
+def build_page_view(catalog):
+    """كل الكروت والعروض جاهزة للعرض - مرة واحدة لكل إصدار كتالوج"""
+    prices = catalog.prices
+    offers = catalog.offers
+    currency = prices["settings"]["currency"]
+    offer_cards = frozenset(offers.get("offer_cards") or ())
+
+    cards = []
+    for game_id, game in prices["games"].items():
+        for platform_id, platform in game["platforms"].items():
+            accounts = tuple(
+                AccountOption(
+                    account_id=account_id,
+                    name=account["name"],
+                    description=ACCOUNT_DESCRIPTIONS.get(account_id, ""),
+                    price=account["price"],
+                    price_text=format_number(account["price"]),
+                    original_price_text=format_number(account["original_price"]) if account.get("original_price") else "",
+                    discount_percentage=account.get("discount_percentage", 0),
+                )
+                for account_id, account in platform["accounts"].items()
+            )
+            cards.append(ProductCard(game_id, platform_id, game_type(game_id), game_id in offer_cards,
+                                     game["name"], platform["name"], platform["icon"], accounts))
+
+    offers_list = catalog.offer_index.offers_list
+    showcase = tuple(
+        ShowcaseOffer(offer["game"], offer["platform"], offer["account"], game_edition(offer["game"]),
+                      format_number(offer["fake_price"]), format_number(offer["real_price"]), offer["discount"])
+        for offer in offers_list[:SHOWCASE_MAX_OFFERS]
+    )
+    return PageView(tuple(cards), showcase, max(0, len(offers_list) - SHOWCASE_MAX_OFFERS), currency, currency[:4])
+
+# 🔥 الصفحة الرئيسية - من كاش الصفحات
+# ===================================
+# الصفحة واحدة لكل الزوار، فبنعملها render مرة واحدة لكل (إصدار كتالوج, لغة)
+# ونحفظها مع نسخ gzip و brotli. الكاش بيتمسح لوحده لما الكتالوج يتغير.
+PAGE_LANGUAGES = ('ar',)
+
+
+def build_page_bootstrap(catalog):
+    """البيانات اللي site.js محتاجها - بتتكتب JSON جوه الصفحة بدل طلبات /get_offers بعد التحميل"""
+    active_offer = catalog.offers["active_offer"]
+    return {
+        "version": catalog.version,     # /events/offers?since= مش بيبعت حاجة لحد ما الإصدار يتغير
+        "active_offer": {"id": active_offer["id"], "show_popup": active_offer["show_popup"]} if active_offer else None,
+        "popup": build_popup_offers(catalog)
+    }
+
+
+def render_index_page(catalog, lang):
+    """render لـ index.html - بيحصل بس لما الصفحة مش في الكاش"""
+    view = get_prepared(catalog, 'page_view', build_page_view)
+    html = render_template('index.html', prices=catalog.prices, offers=catalog.offers, view=view, lang=lang,
+                           bootstrap=build_page_bootstrap(catalog))
+    return prepare_body(html, 'text/html')
+
+
+@app.route('/')
+@rate_limit(max_requests=25, window=60)
+def index():
+    try:
+        catalog = get_catalog()
+        lang = request.accept_languages.best_match(PAGE_LANGUAGES) or PAGE_LANGUAGES[0]
+        page = get_prepared(catalog, ('index', lang), lambda catalog: render_index_page(catalog, lang))
+        
+        log_event(logging.INFO, "✅ تم تحميل الصفحة الرئيسية بنجاح مع العروض", sample=True, status=200)
+        return send_prepared(page)
+    except Exception as e:
+        log_event(logging.ERROR, "❌ خطأ في الصفحة الرئيسية", error=str(e), status=500)
+        abort(500)
+
+# 🆔 أرقام مرجعية فريدة (على طريقة Snowflake)
+# ==========================================
+# 41 bit وقت بالـ ms من REFERENCE_EPOCH | 10 bit رقم الـ worker | 12 bit تسلسل جوه نفس الـ ms
+# الرقم متزايد دايماً جوه الـ worker ومستحيل يتكرر بين workers بأرقام مختلفة،
+# وبيتكتب Crockford base32 (أرقام وحروف كبيرة بس) فمش محتاج URL encoding.
+# رقم الـ worker = خانة في REFERENCE_WORKER_SLOTS_FILE: كل process بيقفل byte رقم الخانة (fcntl) طول ما هو عايش،
+# والقفل بيتفك لوحده لما الـ process يموت - فالخانة دايماً لـ process عايش، واتنين شغالين مستحيل ياخدوا
+# نفس الرقم مهما الـ workers اتعملهم restart. لو الـ 1024 خانة مستخدمين الرقم المرجعي بيفشل (RuntimeError) بدل التكرار.
+# REFERENCE_WORKER_ID بيتجاوز الجدول (مثلاً كذا سيرفر) - ساعتها لازم يبقى مختلف لكل process.
+REFERENCE_EPOCH_MS = 1735689600000          # 2025-01-01 UTC
+REFERENCE_WORKER_BITS = 10
+REFERENCE_SEQUENCE_BITS = 12
+REFERENCE_ID_LENGTH = 13
+# الـ 13 حرف بيشيلوا 65 bit بس الأرقام الحقيقية أقل من 2^63 (وده حد SQLite كمان)
+REFERENCE_VALUE_LIMIT = 1 << 63
+REFERENCE_MAX_TIMESTAMP = (REFERENCE_EPOCH_MS
+                           + (REFERENCE_VALUE_LIMIT >> (REFERENCE_WORKER_BITS + REFERENCE_SEQUENCE_BITS)) - 1) / 1000
+_CROCKFORD_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+REFERENCE_WORKER_SLOTS_FILE = os.environ.get('REFERENCE_WORKER_SLOTS_FILE',
+                                             os.path.join(tempfile.gettempdir(), 'senioraaa-reference-workers.lock'))
+
+
+class WorkerSlots:
+    """أرقام workers فريدة بين الـ processes الشغالة: خانة = byte في ملف عليه قفل fcntl من الـ process اللي ماسكه"""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._claimed = set()
+
+    def claim(self):
+        """أول خانة فاضية - بتفضل للـ process ده لحد ما يموت (RuntimeError لو مفيش)"""
+        if fcntl is None:
+            raise RuntimeError("أرقام الـ workers محتاجة fcntl (Linux/Unix) - حدد REFERENCE_WORKER_ID لكل process")
+        with self._lock:
+            if self._pid != os.getpid():
+                # بعد fork الأقفال مبتتورثش: fd جديد (الـ fd القديم مبيتقفلش - قفله بيفك أقفال الـ process كلها)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                self._claimed = set()
+                self._pid = os.getpid()
+            for slot in range(self.size):
+                if slot in self._claimed:
+                    continue                # القفل بتاعنا مش بيمنعنا إحنا - لازم نفتكره
+                try:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                except OSError:
+                    continue                # process تاني عايش ماسكها
+                self._claimed.add(slot)
+                return slot
+        raise RuntimeError(f"كل الـ {self.size} رقم worker في {self.path} مستخدمين من processes شغالة - مفيش رقم فريد")
+
+
+reference_worker_slots = WorkerSlots(REFERENCE_WORKER_SLOTS_FILE, 1 << REFERENCE_WORKER_BITS)
+
+
+class ReferenceIdGenerator:
+    """مولد IDs مرجعية فريدة ومتزايدة - آمن مع الـ threads"""
+
+    def __init__(self, worker_id=None):
+        self._configured_worker_id = worker_id
+        self._lock = threading.Lock()
+        self._pid = None
+        self._last_ms = 0
+        self._sequence = 0
+        self.worker_id = 0
+
+    def _reset_after_fork(self):
+        worker_id = self._configured_worker_id
+        if worker_id is None and os.environ.get('REFERENCE_WORKER_ID'):
+            worker_id = int(os.environ['REFERENCE_WORKER_ID'])
+        if worker_id is None:
+            worker_id = reference_worker_slots.claim()
+        if not 0 <= worker_id < 1 << REFERENCE_WORKER_BITS:
+            raise ValueError(f"رقم الـ worker لازم يبقى من 0 لـ {(1 << REFERENCE_WORKER_BITS) - 1}: {worker_id}")
+        self.worker_id = worker_id
+        self._pid = os.getpid()
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_value(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset_after_fork()
+            now_ms = int(time.time() * 1000) - REFERENCE_EPOCH_MS
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                # نفس الـ ms أو الساعة رجعت لورا: نكمل من آخر وقت عشان الترتيب ميبوظش
+                self._sequence += 1
+                if self._sequence >> REFERENCE_SEQUENCE_BITS:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return ((self._last_ms << (REFERENCE_WORKER_BITS + REFERENCE_SEQUENCE_BITS))
+                    | (self.worker_id << REFERENCE_SEQUENCE_BITS)
+                    | self._sequence)
+
+    def next_id(self):
+        return encode_reference_id(self.next_value())
+
+
+def encode_reference_id(value):
+    chars = []
+    for _ in range(REFERENCE_ID_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(_CROCKFORD_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class ReferenceIdInfo(NamedTuple):
+    created_at: datetime
+    worker_id: int
+    sequence: int
+
+
+def reference_id_value(reference_id):
+    """الرقم المرجعي (نص) -> القيمة الرقمية - ValueError لو الرقم غلط"""
+    reference_id = reference_id.strip().upper()
+    if len(reference_id) != REFERENCE_ID_LENGTH:
+        raise ValueError("طول الرقم المرجعي غير صحيح")
+    value = 0
+    for char in reference_id:
+        digit = _CROCKFORD_ALPHABET.find(char)
+        if digit < 0:
+            raise ValueError("الرقم المرجعي فيه حروف غير صحيحة")
+        value = value * 32 + digit
+    if value >= REFERENCE_VALUE_LIMIT:
+        raise ValueError("الرقم المرجعي خارج النطاق")
+    return value
+
+
+def reference_value_at(timestamp):
+    """أصغر قيمة رقم مرجعي ممكنة في الوقت ده (epoch) - للبحث بالفترة"""
+    return max(0, int(timestamp * 1000) - REFERENCE_EPOCH_MS) << (REFERENCE_WORKER_BITS + REFERENCE_SEQUENCE_BITS)
+
+
+def decode_reference_id(reference_id):
+    """فك الرقم المرجعي لوقت الإنشاء + رقم الـ worker + التسلسل - ValueError لو الرقم غلط"""
+    value = reference_id_value(reference_id)
+    sequence = value & ((1 << REFERENCE_SEQUENCE_BITS) - 1)
+    worker_id = (value >> REFERENCE_SEQUENCE_BITS) & ((1 << REFERENCE_WORKER_BITS) - 1)
+    timestamp_ms = (value >> (REFERENCE_WORKER_BITS + REFERENCE_SEQUENCE_BITS)) + REFERENCE_EPOCH_MS
+    return ReferenceIdInfo(datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc), worker_id, sequence)
+
+
+reference_ids = ReferenceIdGenerator()
+
+
+# 💬 رسايل الواتساب الجاهزة لكل منتج
+# =================================
+# الرسالة ثابتة لكل SKU ما عدا الرقم المرجعي، فبنجهزها مرة لكل إصدار كتالوج
+# (مترجمة URL encoding) ونحط الرقم المرجعي في النص بس وقت الطلب.
+REFERENCE_PLACEHOLDER = "\x00REF\x00"
+
+
+def whatsapp_message(reference_id, game_name, platform_name, account_name, price, currency):
+    """رسالة الواتساب - بدون وقت الاستفسار"""
+    return f"""🎮 *استفسار من {BUSINESS_NAME}*
+
+🆔 *المرجع:* {reference_id}
+
+🎯 *المطلوب:*
+• اللعبة: {game_name}
+
+• المنصة: {platform_name}
+
+• نوع الحساب: {account_name}
+
+• السعر: {format_number(price)} {currency}
+
+👋 *السلام عليكم، أريد الاستفسار عن هذا المنتج*
+
+شكراً 🌟"""
+
+
+def whatsapp_base_url(prices):
+    """https://wa.me/<الرقم>?text= من إعدادات الكتالوج"""
+    whatsapp_number = prices.get('settings', {}).get('whatsapp_number', WHATSAPP_NUMBER)
+    clean_number = whatsapp_number.replace('+', '').replace('-', '').replace(' ', '')
+    return f"https://wa.me/{clean_number}?text="
+
+
+def whatsapp_batch_item(game_name, platform_name, account_name, price, currency):
+    """سطر منتج واحد في رسالة السلة"""
+    return f"""• اللعبة: {game_name}
+  المنصة: {platform_name}
+  نوع الحساب: {account_name}
+  السعر: {format_number(price)} {currency}
+
+"""
+
+
+def whatsapp_batch_message(reference_id, items_text, total, currency):
+    """رسالة سلة فيها أكتر من منتج - items_text جاهز من whatsapp_batch_item"""
+    return f"""🎮 *استفسار من {BUSINESS_NAME}*
+
+🆔 *المرجع:* {reference_id}
+
+🎯 *المطلوب:*
+{items_text}💰 *الإجمالي:* {format_number(total)} {currency}
+
+👋 *السلام عليكم، أريد الاستفسار عن هذه المنتجات*
+
+شكراً 🌟"""
+
+
+class WhatsAppTemplate(NamedTuple):
+    url_prefix: str         # الرابط + الرسالة المترجمة لحد الرقم المرجعي
+    url_suffix: str         # باقي الرسالة المترجمة بعد الرقم المرجعي
+    encoded_item: str       # سطر المنتج مترجم - لرسالة السلة
+    price: int
+    currency: str
+
+
+def build_whatsapp_templates(catalog):
+    """رسالة جاهزة لكل SKU في الكتالوج"""
+    prices = catalog.prices
+    currency = prices.get('settings', {}).get('currency', 'جنيه')
+    base_url = whatsapp_base_url(prices)
+    templates = {}
+    for sku in catalog.valid_skus:
+        game = prices['games'][sku.game_type]
+        platform = game['platforms'][sku.platform]
+        account = platform['accounts'][sku.account_type]
+        message = whatsapp_message(REFERENCE_PLACEHOLDER, game['name'], platform['name'],
+                                   account['name'], account['price'], currency)
+        head, tail = message.split(REFERENCE_PLACEHOLDER)
+        templates[sku] = WhatsAppTemplate(
+            url_prefix=base_url + urllib.parse.quote(head),
+            url_suffix=urllib.parse.quote(tail),
+            encoded_item=urllib.parse.quote(whatsapp_batch_item(
+                game['name'], platform['name'], account['name'], account['price'], currency)),
+            price=account['price'],
+            currency=currency
+        )
+    return templates
+
+
+def green_worker():
+    """True لو الـ worker ده شغال بـ gevent (الـ threading متبدل بـ greenlets)"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def run_blocking(func, *args):
+    """شغل ديسك تقيل: تحت gevent بيتعمل في thread حقيقي (threadpool) عشان الـ event loop ميقفش"""
+    if green_worker():
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+
+# 🗂️ سجل الاستفسارات (SQLite)
+# ==========================
+# كل ضغطة واتساب بتتسجل (الرقم المرجعي، المنتجات، السعر وقتها، الوقت، hash الـ IP) عشان لما العميل
+# يبعتلنا الرقم المرجعي نلاقي استفساره. الطلب بيحط السطر في queue وبس، وthread في الخلفية بيكتب
+# دفعات في SQLite بـ WAL - فالـ request عمره ما بيستنى الديسك (وتحت gevent الكتابة نفسها في thread حقيقي).
+# المفتاح الأساسي = قيمة الرقم المرجعي نفسها (Snowflake)، فالترتيب بالوقت والبحث بالفترة
+# والصفحات (keyset) كلهم على الـ rowid من غير index زيادة.
+INQUIRY_DB_PATH = os.environ.get('INQUIRY_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'inquiries.db'))
+INQUIRY_QUEUE_SIZE = 10000
+INQUIRY_BATCH_SIZE = 500
+INQUIRY_FLUSH_INTERVAL = 0.5        # أقصى تأخير قبل ما الدفعة تتكتب (ثواني)
+INQUIRY_PAGE_MAX = 5000
+# مفتاح hash الـ IP لازم يبقى ثابت بين الـ workers والـ restarts (وإلا نفس الـ IP يطلع بـ hash مختلف).
+# من غير INQUIRY_IP_HASH_KEY بيتعمل مفتاح عشوائي مرة واحدة ويتحفظ في نفس قاعدة البيانات.
+INQUIRY_IP_HASH_KEY = os.environ.get('INQUIRY_IP_HASH_KEY')
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+_INQUIRY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inquiries (
+    id INTEGER PRIMARY KEY,         -- قيمة الرقم المرجعي (Snowflake)
+    reference_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    skus TEXT NOT NULL,             -- JSON: [[game_type, platform, account_type], ...]
+    price INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    ip_hash TEXT NOT NULL
+)
+"""
+_INQUIRY_SETTINGS_SCHEMA = "CREATE TABLE IF NOT EXISTS inquiry_settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+
+
+def hash_ip(ip_address, key):
+    """hash بمفتاح - نقدر نربط استفسارات نفس الـ IP من غير ما نحفظ الـ IP نفسه"""
+    return hashlib.blake2b(ip_address.encode('utf-8', 'replace'), key=key[:64], digest_size=12).hexdigest()
+
+
+def inquiry_ip_hash_key(connection):
+    """INQUIRY_IP_HASH_KEY أو المفتاح المحفوظ في قاعدة البيانات (أول worker بيعمله والباقي بيقراه)"""
+    if INQUIRY_IP_HASH_KEY:
+        return INQUIRY_IP_HASH_KEY.encode('utf-8')
+    with connection:
+        connection.execute('INSERT OR IGNORE INTO inquiry_settings VALUES (?, ?)', ('ip_hash_key', secrets.token_hex(32)))
+    return connection.execute("SELECT value FROM inquiry_settings WHERE name = 'ip_hash_key'").fetchone()[0].encode('utf-8')
+
+
+def open_inquiry_db(path=INQUIRY_DB_PATH):
+    connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute(_INQUIRY_SCHEMA)
+    connection.execute(_INQUIRY_SETTINGS_SCHEMA)
+    connection.commit()
+    return connection
+
+
+class InquiryLog:
+    """queue + thread كاتب في الخلفية (واحد لكل process)"""
 
-# متغيرات الحماية العامة
-blocked_ips = {}
-request_counts = defaultdict(list)
-failed_attempts = {}
+    def __init__(self, path=INQUIRY_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._local = threading.local()
+        self._ip_hash_key = None
+        self.dropped = 0
 
-# إعدادات الواتساب
-WHATSAPP_NUMBER = "+201094591331"
-BUSINESS_NAME = "شهد السنيورة"
+    def _ensure_writer(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # بعد fork: queue جديدة وthread جديد (الـ thread القديم مش موجود في الـ process ده)
+                self._queue = queue.Queue(INQUIRY_QUEUE_SIZE)
+                threading.Thread(target=self._writer, args=(self._queue,), daemon=True, name='inquiry-writer').start()
+                self._pid = os.getpid()
 
-# دالة تنسيق الأرقام بالفاصلة العشرية
-def format_number(number):
-    """تنسيق الأرقام بالفاصلة العشرية"""
-    return f"{int(number):,}"
+    def record(self, reference_id, skus, price, currency, ip_address):
+        """تسجيل استفسار - مبيستناش أي I/O (لو الـ queue مليانة السطر بيتشال ويتعد)"""
+        self._ensure_writer()
+        # الـ hash بيتحسب في الـ thread الكاتب - المفتاح ممكن يحتاج قاعدة البيانات
+        row = (reference_id_value(reference_id), reference_id, time.time(),
+               json.dumps([list(sku) for sku in skus], ensure_ascii=False), price, currency, ip_address)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc(('inquiries_dropped', 'queue_full'))
 
-# Rate Limiting محسن بدون CSRF
-def rate_limit(max_requests=10, window=60):
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-            current_time = time.time()
-            
-            # فحص IP محظور
-            if client_ip in blocked_ips:
-                block_time, duration = blocked_ips[client_ip]
-                if current_time - block_time < duration:
-                    logger.warning(f"🚨 IP محظور: {client_ip}")
-                    abort(429)
-                else:
-                    del blocked_ips[client_ip]
-            
-            # تنظيف الطلبات القديمة
-            request_counts[client_ip] = [
-                req_time for req_time in request_counts[client_ip]
-                if current_time - req_time < window
-            ]
-            
-            # فحص عدد الطلبات
-            if len(request_counts[client_ip]) >= max_requests:
-                # حظر مؤقت
-                blocked_ips[client_ip] = (current_time, 300)  # 5 دقائق
-                logger.warning(f"🚨 Rate limit exceeded - IP blocked: {client_ip}")
-                abort(429)
-            
-            # إضافة الطلب الحالي
-            request_counts[client_ip].append(current_time)
-            
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
+    def depth(self):
+        """عدد الاستفسارات اللي مستنية الكتابة في الـ process ده"""
+        return self._queue.qsize() if self._pid == os.getpid() else 0
 
-# حماية إضافية من Spam
-def anti_spam_check(ip_address, user_agent):
-    """فحص إضافي ضد الـ spam والـ bots"""
-    current_time = time.time()
-    
-    # فحص User Agent
-    suspicious_agents = ['bot', 'crawler', 'spider', 'scraper']
-    if any(agent in user_agent.lower() for agent in suspicious_agents):
-        logger.warning(f"🚨 Suspicious user agent from IP: {ip_address}")
-        return False
-    
-    # فحص التكرار السريع
-    key = f"{ip_address}_{user_agent}"
-    if key not in failed_attempts:
-        failed_attempts[key] = []
-    
-    # تنظيف المحاولات القديمة
-    failed_attempts[key] = [
-        t for t in failed_attempts[key] 
-        if current_time - t < 60  # آخر دقيقة
-    ]
-    
-    # إذا أكتر من 3 محاولات في دقيقة واحدة
-    if len(failed_attempts[key]) >= 3:
-        blocked_ips[ip_address] = (current_time, 900)  # حظر 15 دقيقة
-        logger.warning(f"🚨 Anti-spam triggered - IP blocked: {ip_address}")
-        return False
-    
-    failed_attempts[key].append(current_time)
-    return True
+    def flush(self, timeout=None):
+        """استنى لحد ما كل اللي في الـ queue يتكتب (أو timeout ثواني)"""
+        if self._pid != os.getpid():
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._queue.all_tasks_done.wait(remaining)
 
-# 🔥 دالة جديدة لإدارة العروض - مع الأسعار الوهمية
-def get_offers():
-    """
-    🔥 مركز التحكم الذكي - أسعار وهمية + أسعار حقيقية!
-    =========================================================
-    
-    📝 النظام الجديد:
-    - FAKE_PRICE = السعر الوهمي (اللي هيتشطب)
-    - REAL_PRICE = السعر الحقيقي (اللي العميل هيدفعه)
-    - الخصم هيتحسب تلقائي = ((FAKE - REAL) / FAKE) * 100
-    
-    🎯 مثال:
-    FAKE_PRICE = 5000  (السعر الوهمي)
-    REAL_PRICE = 3200  (السعر الحقيقي) 
-    النتيجة = خصم 36% تلقائي!
-    
-    💡 استراتيجية التسعير:
-    1. حط السعر الحقيقي اللي عايزه
-    2. حط السعر الوهمي أعلى منه
-    3. الخصم هيظهر تلقائي وجذاب!
-    """
-    
-    # 🎮 تحكم عام في العروض
-    # ======================
-    ALL_OFFERS_ACTIVE = "yas"  # yas = كل العروض شغالة | no = كل العروض مقفولة
-    
-    # 🇸🇦 ================ ARABIC STANDARD EDITION ================
-    
-    # Arabic Standard - PS5 - Full
-    AR_STD_PS5_FULL_ACTIVE = "no"      # yas = العرض شغال | no = مقفول
-    AR_STD_PS5_FULL_FAKE_PRICE = 5000  # السعر الوهمي (اللي هيتشطب)
-    AR_STD_PS5_FULL_REAL_PRICE = 3200  # السعر الحقيقي (اللي العميل هيدفعه)
-    
-    # Arabic Standard - PS5 - Primary  
-    AR_STD_PS5_PRIMARY_ACTIVE = "no"     # yas = العرض شغال | no = مقفول
-    AR_STD_PS5_PRIMARY_FAKE_PRICE = 2500 # السعر الوهمي
-    AR_STD_PS5_PRIMARY_REAL_PRICE = 1600 # السعر الحقيقي
-    
-    # Arabic Standard - PS5 - Secondary
-    AR_STD_PS5_SECONDARY_ACTIVE = "no"  # yas = العرض شغال | no = مقفول
-    AR_STD_PS5_SECONDARY_FAKE_PRICE = 1800 # السعر الوهمي
-    AR_STD_PS5_SECONDARY_REAL_PRICE = 900  # السعر الحقيقي
-    
-    # Arabic Standard - PS4 - Full
-    AR_STD_PS4_FULL_ACTIVE = "no"       # yas = العرض شغال | no = مقفول
-    AR_STD_PS4_FULL_FAKE_PRICE = 4800   # السعر الوهمي
-    AR_STD_PS4_FULL_REAL_PRICE = 3200   # السعر الحقيقي
-    
-    # Arabic Standard - PS4 - Primary
-    AR_STD_PS4_PRIMARY_ACTIVE = "no"     # yas = العرض شغال | no = مقفول
-    AR_STD_PS4_PRIMARY_FAKE_PRICE = 1800 # السعر الوهمي
-    AR_STD_PS4_PRIMARY_REAL_PRICE = 800  # السعر الحقيقي
-    
-    # Arabic Standard - PS4 - Secondary
-    AR_STD_PS4_SECONDARY_ACTIVE = "no"  # yas = العرض شغال | no = مقفول
-    AR_STD_PS4_SECONDARY_FAKE_PRICE = 1500 # السعر الوهمي
-    AR_STD_PS4_SECONDARY_REAL_PRICE = 1000 # السعر الحقيقي
-    
-    # 🇸🇦 ================ ARABIC ULTIMATE EDITION ================
-    
-    # Arabic Ultimate - PS5 - Full
-    AR_ULT_PS5_FULL_ACTIVE = "no"        # yas = العرض شغال | no = مقفول
-    AR_ULT_PS5_FULL_FAKE_PRICE = 7000    # السعر الوهمي
-    AR_ULT_PS5_FULL_REAL_PRICE = 4500    # السعر الحقيقي
-    
-    # Arabic Ultimate - PS5 - Primary
-    AR_ULT_PS5_PRIMARY_ACTIVE = "no"    # yas = العرض شغال | no = مقفول
-    AR_ULT_PS5_PRIMARY_FAKE_PRICE = 3200 # السعر الوهمي
-    AR_ULT_PS5_PRIMARY_REAL_PRICE = 2000 # السعر الحقيقي
-    
-    # Arabic Ultimate - PS5 - Secondary
-    AR_ULT_PS5_SECONDARY_ACTIVE = "no"   # yas = العرض شغال | no = مقفول
-    AR_ULT_PS5_SECONDARY_FAKE_PRICE = 3500 # السعر الوهمي
-    AR_ULT_PS5_SECONDARY_REAL_PRICE = 1800 # السعر الحقيقي
-    
-    # Arabic Ultimate - PS4 - Full
-    AR_ULT_PS4_FULL_ACTIVE = "no"       # yas = العرض شغال | no = مقفول
-    AR_ULT_PS4_FULL_FAKE_PRICE = 6800    # السعر الوهمي
-    AR_ULT_PS4_FULL_REAL_PRICE = 4300    # السعر الحقيقي
-    
-    # Arabic Ultimate - PS4 - Primary
-    AR_ULT_PS4_PRIMARY_ACTIVE = "no"     # yas = العرض شغال | no = مقفول
-    AR_ULT_PS4_PRIMARY_FAKE_PRICE = 2500 # السعر الوهمي
-    AR_ULT_PS4_PRIMARY_REAL_PRICE = 1200 # السعر الحقيقي
-    
-    # Arabic Ultimate - PS4 - Secondary
-    AR_ULT_PS4_SECONDARY_ACTIVE = "no"  # yas = العرض شغال | no = مقفول
-    AR_ULT_PS4_SECONDARY_FAKE_PRICE = 2800 # السعر الوهمي
-    AR_ULT_PS4_SECONDARY_REAL_PRICE = 1900 # السعر الحقيقي
-    
-    # 🇺🇸 ================ ENGLISH STANDARD EDITION ================
-    
-    # English Standard - PS5 - Full
-    EN_STD_PS5_FULL_ACTIVE = "no"        # yas = العرض شغال | no = مقفول
-    EN_STD_PS5_FULL_FAKE_PRICE = 0000    # السعر الوهمي
-    EN_STD_PS5_FULL_REAL_PRICE = 0000    # السعر الحقيقي
-    
-    # English Standard - PS5 - Primary
-    EN_STD_PS5_PRIMARY_ACTIVE = "yas"    # yas = العرض شغال | no = مقفول
-    EN_STD_PS5_PRIMARY_FAKE_PRICE = 2100 # السعر الوهمي
-    EN_STD_PS5_PRIMARY_REAL_PRICE = 1700 # السعر الحقيقي
-    
-    # English Standard - PS5 - Secondary
-    EN_STD_PS5_SECONDARY_ACTIVE = "yas"   # yas = العرض شغال | no = مقفول
-    EN_STD_PS5_SECONDARY_FAKE_PRICE = 1000 # السعر الوهمي
-    EN_STD_PS5_SECONDARY_REAL_PRICE = 850  # السعر الحقيقي
-    
-    # English Standard - PS4 - Full
-    EN_STD_PS4_FULL_ACTIVE = "no"       # yas = العرض شغال | no = مقفول
-    EN_STD_PS4_FULL_FAKE_PRICE = 0000    # السعر الوهمي
-    EN_STD_PS4_FULL_REAL_PRICE = 0000    # السعر الحقيقي
-    
-    # English Standard - PS4 - Primary
-    EN_STD_PS4_PRIMARY_ACTIVE = "yas"     # yas = العرض شغال | no = مقفول
-    EN_STD_PS4_PRIMARY_FAKE_PRICE = 1100 # السعر الوهمي
-    EN_STD_PS4_PRIMARY_REAL_PRICE = 900  # السعر الحقيقي
-    
-    # English Standard - PS4 - Secondary
-    EN_STD_PS4_SECONDARY_ACTIVE = "yas"  # yas = العرض شغال | no = مقفول
-    EN_STD_PS4_SECONDARY_FAKE_PRICE = 1000 # السعر الوهمي
-    EN_STD_PS4_SECONDARY_REAL_PRICE = 850 # السعر الحقيقي
-    
-    # 🇺🇸 ================ ENGLISH ULTIMATE EDITION ================
-    
-    # English Ultimate - PS5 - Full
-    EN_ULT_PS5_FULL_ACTIVE = "no"        # yas = العرض شغال | no = مقفول
-    EN_ULT_PS5_FULL_FAKE_PRICE = 0000    # السعر الوهمي
-    EN_ULT_PS5_FULL_REAL_PRICE = 0000    # السعر الحقيقي
-    
-    # English Ultimate - PS5 - Primary
-    EN_ULT_PS5_PRIMARY_ACTIVE = "no"    # yas = العرض شغال | no = مقفول
-    EN_ULT_PS5_PRIMARY_FAKE_PRICE = 2300 # السعر الوهمي
-    EN_ULT_PS5_PRIMARY_REAL_PRICE = 0000 # السعر الحقيقي
-    
-    # English Ultimate - PS5 - Secondary
-    EN_ULT_PS5_SECONDARY_ACTIVE = "yas"   # yas = العرض شغال | no = مقفول
-    EN_ULT_PS5_SECONDARY_FAKE_PRICE = 2450 # السعر الوهمي
-    EN_ULT_PS5_SECONDARY_REAL_PRICE = 2000 # السعر الحقيقي
-    
-    # English Ultimate - PS4 - Full
-    EN_ULT_PS4_FULL_ACTIVE = "no"       # yas = العرض شغال | no = مقفول
-    EN_ULT_PS4_FULL_FAKE_PRICE = 0000    # السعر الوهمي
-    EN_ULT_PS4_FULL_REAL_PRICE = 0000    # السعر الحقيقي
-    
-    # English Ultimate - PS4 - Primary
-    EN_ULT_PS4_PRIMARY_ACTIVE = "no"     # yas = العرض شغال | no = مقفول
-    EN_ULT_PS4_PRIMARY_FAKE_PRICE = 1400 # السعر الوهمي
-    EN_ULT_PS4_PRIMARY_REAL_PRICE = 1150 # السعر الحقيقي
-    
-    # English Ultimate - PS4 - Secondary
-    EN_ULT_PS4_SECONDARY_ACTIVE = "yas"  # yas = العرض شغال | no = مقفول
-    EN_ULT_PS4_SECONDARY_FAKE_PRICE = 2450 # السعر الوهمي
-    EN_ULT_PS4_SECONDARY_REAL_PRICE = 2000 # السعر الحقيقي
-    
-    # 🎮 ================ XBOX EDITIONS ================
-    
-    # Xbox Standard - Full
-    XBOX_STD_FULL_ACTIVE = "no"          # yas = العرض شغال | no = مقفول
-    XBOX_STD_FULL_FAKE_PRICE = 0000      # السعر الوهمي
-    XBOX_STD_FULL_REAL_PRICE = 0000      # السعر الحقيقي
-    
-    # Xbox Ultimate - Full  
-    XBOX_ULT_FULL_ACTIVE = "no"         # yas = العرض شغال | no = مقفول
-    XBOX_ULT_FULL_FAKE_PRICE = 6200      # السعر الوهمي
-    XBOX_ULT_FULL_REAL_PRICE = 3800      # السعر الحقيقي
-    
-    # 🖥️ ================ PC EDITIONS ================
-    
-    # PC Standard (شهر) - Full
-    PC_STD_FULL_ACTIVE = "no"           # yas = العرض شغال | no = مقفول
-    PC_STD_FULL_FAKE_PRICE = 0000         # السعر الوهمي
-    PC_STD_FULL_REAL_PRICE = 0000           # السعر الحقيقي (مجاني)
-    
-    # PC Ultimate (سنة) - Full
-    PC_ULT_FULL_ACTIVE = "no"            # yas = العرض شغال | no = مقفول
-    PC_ULT_FULL_FAKE_PRICE = 0000        # السعر الوهمي
-    PC_ULT_FULL_REAL_PRICE = 0000        # السعر الحقيقي
-    
-    # 🖥️ ================ STEAM EDITIONS ================
-    
-    # Steam Standard - Full
-    STEAM_STD_FULL_ACTIVE = "no"         # yas = العرض شغال | no = مقفول
-    STEAM_STD_FULL_FAKE_PRICE = 2500     # السعر الوهمي
-    STEAM_STD_FULL_REAL_PRICE = 1400     # السعر الحقيقي
-    
-    # Steam Ultimate - Full
-    STEAM_ULT_FULL_ACTIVE = "no"        # yas = العرض شغال | no = مقفول
-    STEAM_ULT_FULL_FAKE_PRICE = 4200     # السعر الوهمي
-    STEAM_ULT_FULL_REAL_PRICE = 2600     # السعر الحقيقي
-    
-    # 📅 إعدادات العرض المنبثق
-    # ========================
-    SHOW_POPUP = "yas"                    # yas = يظهر البوب اب | no = مايظهرش
-    POPUP_TITLE = "🔥 عروض حصرية - وفر حتى 50%!"
-    POPUP_DESCRIPTION = "خصومات حقيقية لفترة محدودة - أسعار لن تتكرر!"
-    
-    # ⚠️ لا تغير الكود اللي تحت ده - ده بيطبق الإعدادات اللي فوق
-    # ===============================================================
-    
-    def calculate_discount(fake_price, real_price):
-        """حساب نسبة الخصم تلقائياً"""
-        if fake_price <= 0 or real_price < 0 or real_price >= fake_price:
-            return 0
-        return round(((fake_price - real_price) / fake_price) * 100)
-    
-    # تجميع كل العروض النشطة
-    active_offers = []
-    eligible_games = []
-    
-    if ALL_OFFERS_ACTIVE == "yas":
-        
-        # Arabic Standard offers
-        if AR_STD_PS5_FULL_ACTIVE == "yas":
-            discount = calculate_discount(AR_STD_PS5_FULL_FAKE_PRICE, AR_STD_PS5_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Standard", "platform": "PS5", "account": "Full", 
-                    "fake_price": AR_STD_PS5_FULL_FAKE_PRICE, "real_price": AR_STD_PS5_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Standard" not in eligible_games:
-                    eligible_games.append("FC26_AR_Standard")
-        
-        if AR_STD_PS5_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_STD_PS5_PRIMARY_FAKE_PRICE, AR_STD_PS5_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Standard", "platform": "PS5", "account": "Primary",
-                    "fake_price": AR_STD_PS5_PRIMARY_FAKE_PRICE, "real_price": AR_STD_PS5_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Standard" not in eligible_games:
-                    eligible_games.append("FC26_AR_Standard")
-        
-        if AR_STD_PS5_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_STD_PS5_SECONDARY_FAKE_PRICE, AR_STD_PS5_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Standard", "platform": "PS5", "account": "Secondary",
-                    "fake_price": AR_STD_PS5_SECONDARY_FAKE_PRICE, "real_price": AR_STD_PS5_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Standard" not in eligible_games:
-                    eligible_games.append("FC26_AR_Standard")
-        
-        if AR_STD_PS4_FULL_ACTIVE == "yas":
-            discount = calculate_discount(AR_STD_PS4_FULL_FAKE_PRICE, AR_STD_PS4_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Standard", "platform": "PS4", "account": "Full",
-                    "fake_price": AR_STD_PS4_FULL_FAKE_PRICE, "real_price": AR_STD_PS4_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Standard" not in eligible_games:
-                    eligible_games.append("FC26_AR_Standard")
-        
-        if AR_STD_PS4_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_STD_PS4_PRIMARY_FAKE_PRICE, AR_STD_PS4_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Standard", "platform": "PS4", "account": "Primary",
-                    "fake_price": AR_STD_PS4_PRIMARY_FAKE_PRICE, "real_price": AR_STD_PS4_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Standard" not in eligible_games:
-                    eligible_games.append("FC26_AR_Standard")
-        
-        if AR_STD_PS4_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_STD_PS4_SECONDARY_FAKE_PRICE, AR_STD_PS4_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Standard", "platform": "PS4", "account": "Secondary",
-                    "fake_price": AR_STD_PS4_SECONDARY_FAKE_PRICE, "real_price": AR_STD_PS4_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Standard" not in eligible_games:
-                    eligible_games.append("FC26_AR_Standard")
-        
-        # Arabic Ultimate offers
-        if AR_ULT_PS5_FULL_ACTIVE == "yas":
-            discount = calculate_discount(AR_ULT_PS5_FULL_FAKE_PRICE, AR_ULT_PS5_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Ultimate", "platform": "PS5", "account": "Full",
-                    "fake_price": AR_ULT_PS5_FULL_FAKE_PRICE, "real_price": AR_ULT_PS5_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_AR_Ultimate")
-        
-        if AR_ULT_PS5_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_ULT_PS5_PRIMARY_FAKE_PRICE, AR_ULT_PS5_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Ultimate", "platform": "PS5", "account": "Primary",
-                    "fake_price": AR_ULT_PS5_PRIMARY_FAKE_PRICE, "real_price": AR_ULT_PS5_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_AR_Ultimate")
-        
-        if AR_ULT_PS5_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_ULT_PS5_SECONDARY_FAKE_PRICE, AR_ULT_PS5_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Ultimate", "platform": "PS5", "account": "Secondary",
-                    "fake_price": AR_ULT_PS5_SECONDARY_FAKE_PRICE, "real_price": AR_ULT_PS5_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_AR_Ultimate")
-        
-        if AR_ULT_PS4_FULL_ACTIVE == "yas":
-            discount = calculate_discount(AR_ULT_PS4_FULL_FAKE_PRICE, AR_ULT_PS4_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Ultimate", "platform": "PS4", "account": "Full",
-                    "fake_price": AR_ULT_PS4_FULL_FAKE_PRICE, "real_price": AR_ULT_PS4_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_AR_Ultimate")
-        
-        if AR_ULT_PS4_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_ULT_PS4_PRIMARY_FAKE_PRICE, AR_ULT_PS4_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Ultimate", "platform": "PS4", "account": "Primary",
-                    "fake_price": AR_ULT_PS4_PRIMARY_FAKE_PRICE, "real_price": AR_ULT_PS4_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_AR_Ultimate")
-        
-        if AR_ULT_PS4_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(AR_ULT_PS4_SECONDARY_FAKE_PRICE, AR_ULT_PS4_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_AR_Ultimate", "platform": "PS4", "account": "Secondary",
-                    "fake_price": AR_ULT_PS4_SECONDARY_FAKE_PRICE, "real_price": AR_ULT_PS4_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_AR_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_AR_Ultimate")
-        
-        # English Standard offers
-        if EN_STD_PS5_FULL_ACTIVE == "yas":
-            discount = calculate_discount(EN_STD_PS5_FULL_FAKE_PRICE, EN_STD_PS5_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Standard", "platform": "PS5", "account": "Full",
-                    "fake_price": EN_STD_PS5_FULL_FAKE_PRICE, "real_price": EN_STD_PS5_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Standard" not in eligible_games:
-                    eligible_games.append("FC26_EN_Standard")
-        
-        if EN_STD_PS5_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_STD_PS5_PRIMARY_FAKE_PRICE, EN_STD_PS5_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Standard", "platform": "PS5", "account": "Primary",
-                    "fake_price": EN_STD_PS5_PRIMARY_FAKE_PRICE, "real_price": EN_STD_PS5_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Standard" not in eligible_games:
-                    eligible_games.append("FC26_EN_Standard")
-        
-        if EN_STD_PS5_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_STD_PS5_SECONDARY_FAKE_PRICE, EN_STD_PS5_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Standard", "platform": "PS5", "account": "Secondary",
-                    "fake_price": EN_STD_PS5_SECONDARY_FAKE_PRICE, "real_price": EN_STD_PS5_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Standard" not in eligible_games:
-                    eligible_games.append("FC26_EN_Standard")
-        
-        if EN_STD_PS4_FULL_ACTIVE == "yas":
-            discount = calculate_discount(EN_STD_PS4_FULL_FAKE_PRICE, EN_STD_PS4_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Standard", "platform": "PS4", "account": "Full",
-                    "fake_price": EN_STD_PS4_FULL_FAKE_PRICE, "real_price": EN_STD_PS4_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Standard" not in eligible_games:
-                    eligible_games.append("FC26_EN_Standard")
-        
-        if EN_STD_PS4_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_STD_PS4_PRIMARY_FAKE_PRICE, EN_STD_PS4_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Standard", "platform": "PS4", "account": "Primary",
-                    "fake_price": EN_STD_PS4_PRIMARY_FAKE_PRICE, "real_price": EN_STD_PS4_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Standard" not in eligible_games:
-                    eligible_games.append("FC26_EN_Standard")
-        
-        if EN_STD_PS4_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_STD_PS4_SECONDARY_FAKE_PRICE, EN_STD_PS4_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Standard", "platform": "PS4", "account": "Secondary",
-                    "fake_price": EN_STD_PS4_SECONDARY_FAKE_PRICE, "real_price": EN_STD_PS4_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Standard" not in eligible_games:
-                    eligible_games.append("FC26_EN_Standard")
-        
-        # English Ultimate offers
-        if EN_ULT_PS5_FULL_ACTIVE == "yas":
-            discount = calculate_discount(EN_ULT_PS5_FULL_FAKE_PRICE, EN_ULT_PS5_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Ultimate", "platform": "PS5", "account": "Full",
-                    "fake_price": EN_ULT_PS5_FULL_FAKE_PRICE, "real_price": EN_ULT_PS5_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_EN_Ultimate")
-        
-        if EN_ULT_PS5_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_ULT_PS5_PRIMARY_FAKE_PRICE, EN_ULT_PS5_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Ultimate", "platform": "PS5", "account": "Primary",
-                    "fake_price": EN_ULT_PS5_PRIMARY_FAKE_PRICE, "real_price": EN_ULT_PS5_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_EN_Ultimate")
-        
-        if EN_ULT_PS5_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_ULT_PS5_SECONDARY_FAKE_PRICE, EN_ULT_PS5_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Ultimate", "platform": "PS5", "account": "Secondary",
-                    "fake_price": EN_ULT_PS5_SECONDARY_FAKE_PRICE, "real_price": EN_ULT_PS5_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_EN_Ultimate")
-        
-        if EN_ULT_PS4_FULL_ACTIVE == "yas":
-            discount = calculate_discount(EN_ULT_PS4_FULL_FAKE_PRICE, EN_ULT_PS4_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Ultimate", "platform": "PS4", "account": "Full",
-                    "fake_price": EN_ULT_PS4_FULL_FAKE_PRICE, "real_price": EN_ULT_PS4_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_EN_Ultimate")
-        
-        if EN_ULT_PS4_PRIMARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_ULT_PS4_PRIMARY_FAKE_PRICE, EN_ULT_PS4_PRIMARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Ultimate", "platform": "PS4", "account": "Primary",
-                    "fake_price": EN_ULT_PS4_PRIMARY_FAKE_PRICE, "real_price": EN_ULT_PS4_PRIMARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_EN_Ultimate")
-        
-        if EN_ULT_PS4_SECONDARY_ACTIVE == "yas":
-            discount = calculate_discount(EN_ULT_PS4_SECONDARY_FAKE_PRICE, EN_ULT_PS4_SECONDARY_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_EN_Ultimate", "platform": "PS4", "account": "Secondary",
-                    "fake_price": EN_ULT_PS4_SECONDARY_FAKE_PRICE, "real_price": EN_ULT_PS4_SECONDARY_REAL_PRICE, "discount": discount
-                })
-                if "FC26_EN_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_EN_Ultimate")
-        
-        # Xbox offers
-        if XBOX_STD_FULL_ACTIVE == "yas":
-            discount = calculate_discount(XBOX_STD_FULL_FAKE_PRICE, XBOX_STD_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_XBOX_Standard", "platform": "Xbox", "account": "Full",
-                    "fake_price": XBOX_STD_FULL_FAKE_PRICE, "real_price": XBOX_STD_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_XBOX_Standard" not in eligible_games:
-                    eligible_games.append("FC26_XBOX_Standard")
-        
-        if XBOX_ULT_FULL_ACTIVE == "yas":
-            discount = calculate_discount(XBOX_ULT_FULL_FAKE_PRICE, XBOX_ULT_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_XBOX_Ultimate", "platform": "Xbox", "account": "Full",
-                    "fake_price": XBOX_ULT_FULL_FAKE_PRICE, "real_price": XBOX_ULT_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_XBOX_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_XBOX_Ultimate")
-        
-        # PC offers
-        if PC_STD_FULL_ACTIVE == "yas" and PC_STD_FULL_REAL_PRICE >= 0:  # PC مجاني ممكن يكون له عرض وهمي
-            discount = calculate_discount(PC_STD_FULL_FAKE_PRICE, PC_STD_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_PC_Standard", "platform": "PC", "account": "Full",
-                    "fake_price": PC_STD_FULL_FAKE_PRICE, "real_price": PC_STD_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_PC_Standard" not in eligible_games:
-                    eligible_games.append("FC26_PC_Standard")
-        
-        if PC_ULT_FULL_ACTIVE == "yas":
-            discount = calculate_discount(PC_ULT_FULL_FAKE_PRICE, PC_ULT_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_PC_Ultimate", "platform": "PC", "account": "Full",
-                    "fake_price": PC_ULT_FULL_FAKE_PRICE, "real_price": PC_ULT_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_PC_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_PC_Ultimate")
-        
-        # Steam offers
-        if STEAM_STD_FULL_ACTIVE == "yas":
-            discount = calculate_discount(STEAM_STD_FULL_FAKE_PRICE, STEAM_STD_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_STEAM_Standard", "platform": "Steam", "account": "Full",
-                    "fake_price": STEAM_STD_FULL_FAKE_PRICE, "real_price": STEAM_STD_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_STEAM_Standard" not in eligible_games:
-                    eligible_games.append("FC26_STEAM_Standard")
-        
-        if STEAM_ULT_FULL_ACTIVE == "yas":
-            discount = calculate_discount(STEAM_ULT_FULL_FAKE_PRICE, STEAM_ULT_FULL_REAL_PRICE)
-            if discount > 0:
-                active_offers.append({
-                    "game": "FC26_STEAM_Ultimate", "platform": "Steam", "account": "Full",
-                    "fake_price": STEAM_ULT_FULL_FAKE_PRICE, "real_price": STEAM_ULT_FULL_REAL_PRICE, "discount": discount
-                })
-                if "FC26_STEAM_Ultimate" not in eligible_games:
-                    eligible_games.append("FC26_STEAM_Ultimate")
-    
-    return {
-        "active_offer": {
-            "id": f"smart_pricing_2025",
-            "title": POPUP_TITLE,
-            "description": POPUP_DESCRIPTION,
-            "offers_list": active_offers,
-            "show_popup": SHOW_POPUP == "yas" and ALL_OFFERS_ACTIVE == "yas" and len(active_offers) > 0,
-            "popup_frequency": "once_per_session"
-        } if active_offers else None,
-        "offer_cards": eligible_games if active_offers else []
-    }
+    def _writer(self, rows):
+        connection = None
+        while True:
+            batch = [rows.get()]
+            deadline = time.monotonic() + INQUIRY_FLUSH_INTERVAL
+            while len(batch) < INQUIRY_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(rows.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                connection = run_blocking(self._write_batch, connection, batch)
+            except Exception as e:
+                # أي خطأ (قاعدة البيانات أو سطر بايظ) بيضيع الدفعة دي بس - الـ thread لازم يفضل شغال
+                # وإلا كل الاستفسارات بعد كده هتستنى في الـ queue ومش هتتكتب أبداً
+                self.dropped += len(batch)
+                metrics.inc(('inquiries_dropped', 'write_failed'), len(batch))
+                log_event(logging.ERROR, "❌ فشل تسجيل دفعة استفسارات في قاعدة البيانات",
+                          items=len(batch), error=f"{type(e).__name__}: {e}")
+                if isinstance(e, sqlite3.Error):
+                    connection = None       # اتصال جديد في الدفعة الجاية
+            finally:
+                for _ in batch:
+                    rows.task_done()
 
+    def _write_batch(self, connection, batch):
+        if connection is None:
+            connection = open_inquiry_db(self.path)
+        if self._ip_hash_key is None:
+            self._ip_hash_key = inquiry_ip_hash_key(connection)
+        rows = [row[:-1] + (hash_ip(row[-1], self._ip_hash_key),) for row in batch]
+        with connection:
+            connection.executemany('INSERT OR IGNORE INTO inquiries VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return connection
 
-# 🔥 دالة تطبيق الأسعار الذكية - حط الدالة دي بعد get_offers مباشرة
-def apply_offer_discount(prices, offers):
-    """تطبيق الأسعار الذكية مع الخصومات الوهمية"""
-    if not offers.get("active_offer") or not offers["active_offer"].get("offers_list"):
-        return prices
-    
-    offers_list = offers["active_offer"]["offers_list"]
-    
-    for offer in offers_list:
-        game_id = offer["game"]
-        target_platform = offer["platform"]
-        target_account = offer["account"]
-        fake_price = offer["fake_price"]
-        real_price = offer["real_price"]
-        discount_percent = offer["discount"]
-        
-        if game_id in prices["games"]:
-            if target_platform in prices["games"][game_id]["platforms"]:
-                platform_data = prices["games"][game_id]["platforms"][target_platform]
-                if target_account in platform_data["accounts"]:
-                    account = platform_data["accounts"][target_account]
-                    
-                    # تطبيق الأسعار الذكية
-                    account["original_price"] = fake_price      # السعر الوهمي (اللي هيتشطب)
-                    account["price"] = real_price               # السعر الحقيقي (اللي العميل هيدفعه)
-                    account["discount_percentage"] = discount_percent  # نسبة الخصم المحسوبة
-    
-    return prices
-# الأسعار الثابتة - مدمجة في الكود مباشرة
-def get_prices():
+    def _reader(self):
+        """اتصال قراءة لكل thread (WAL: القراية مبتستناش الكتابة)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = open_inquiry_db(self.path)
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, reference_id):
+        row = self._reader().execute('SELECT * FROM inquiries WHERE id = ?', (reference_id_value(reference_id),)).fetchone()
+        return inquiry_to_dict(row) if row else None
+
+    def between(self, start=None, end=None, after=None, limit=1000):
+        """الاستفسارات من start لـ end (epoch) بالترتيب - after = آخر رقم مرجعي في الصفحة اللي فاتت"""
+        low = reference_value_at(start) if start is not None else 0
+        if after is not None:
+            low = min(max(low, reference_id_value(after) + 1), REFERENCE_VALUE_LIMIT - 1)
+        high = reference_value_at(end) if end is not None else REFERENCE_VALUE_LIMIT - 1
+        rows = self._reader().execute('SELECT * FROM inquiries WHERE id >= ? AND id < ? ORDER BY id LIMIT ?',
+                                      (low, high, limit)).fetchall()
+        return [inquiry_to_dict(row) for row in rows]
+
+
+def inquiry_to_dict(row):
+    _, reference_id, created_at, skus, price, currency, ip_hash = row
     return {
-        "games": {
-            "FC26_EN_Standard": {
-                "name": "Standard Edition (English) 🇺🇸",
-                "platforms": {
-                    "PS5": {
-                        "name": "PlayStation PS/5",
-                        "icon": '''<div style="text-align: center; margin: 8px auto;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 3500},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 1600},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 750}
-                        }
-                    },
-                    "PS4": {
-                        "name": "PlayStation PS/4",
-                        "icon": '''<div style="text-align: center; margin: 8px auto;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 3500},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 900},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 750}
-                        }
-                    }
-                }
-            },
-            "FC26_EN_Ultimate": {
-                "name": "Ultimate Edition (English) 🇺🇸",
-                "platforms": {
-                    "PS5": {
-                        "name": "PlayStation PS/5",
-                        "icon": '''<div style="text-align: center; margin: 8px auto; position: relative; display: inline-block;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                            <div style="position: absolute; top: -5px; right: -5px; background: #003087; color: white; font-size: 10px; padding: 2px 4px; border-radius: 10px; font-weight: bold; box-shadow: 0 0 8px rgba(0, 48, 135, 0.6);">ULT</div>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 4500},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 0000},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 1900}
-                        }
-                    },
-                    "PS4": {
-                        "name": "PlayStation PS/4", 
-                        "icon": '''<div style="text-align: center; margin: 8px auto; position: relative; display: inline-block;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                            <div style="position: absolute; top: -5px; right: -5px; background: #003087; color: white; font-size: 10px; padding: 2px 4px; border-radius: 10px; font-weight: bold; box-shadow: 0 0 8px rgba(0, 48, 135, 0.6);">ULT</div>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 4500},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 0000},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 1900}
-                        }
-                    }
-                }
-            },
-            "FC26_AR_Standard": {
-                "name": "Standard Edition (Arabic) 🇸🇦",
-                "platforms": {
-                    "PS5": {
-                        "name": "PlayStation PS/5",
-                        "icon": '''<div style="text-align: center; margin: 8px auto;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 3600},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 2000},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 1100}
-                        }
-                    },
-                    "PS4": {
-                        "name": "PlayStation PS/4",
-                        "icon": '''<div style="text-align: center; margin: 8px auto;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                        </div>''', 
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 3600},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 1300},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 1100}
-                        }
-                    }
-                }
-            },
-            "FC26_AR_Ultimate": {
-                "name": "Ultimate Edition (Arabic) 🇸🇦",
-                "platforms": {
-                    "PS5": {
-                        "name": "PlayStation PS/5",
-                        "icon": '''<div style="text-align: center; margin: 8px auto; position: relative; display: inline-block;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                            <div style="position: absolute; top: -5px; right: -5px; background: #7b1fa2; color: white; font-size: 10px; padding: 2px 4px; border-radius: 10px; font-weight: bold; box-shadow: 0 0 8px rgba(123, 31, 162, 0.6);">ULT</div>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 5200},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 0000},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 2000}
-                        }
-                    },
-                    "PS4": {
-                        "name": "PlayStation PS/4",
-                        "icon": '''<div style="text-align: center; margin: 8px auto; position: relative; display: inline-block;">
-                            <i class="fab fa-playstation" style="color: #003087; font-size: 40px; line-height: 1;"></i>
-                            <div style="position: absolute; top: -5px; right: -5px; background: #7b1fa2; color: white; font-size: 10px; padding: 2px 4px; border-radius: 10px; font-weight: bold; box-shadow: 0 0 8px rgba(123, 31, 162, 0.6);">ULT</div>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 5200},
-                            "Primary": {"name": "Primary - تفعيل أساسي", "price": 0000},
-                            "Secondary": {"name": "Secondary - تسجيل دخول مؤقت", "price": 2000}
-                        }
-                    }
-                }
-            },
-            "FC26_XBOX_Standard": {
-                "name": "Xbox Standard Edition 🎮",
-                "platforms": {
-                    "Xbox": {
-                        "name": "Xbox Series X/S & Xbox One",
-                        "icon": '''<div style="text-align: center; margin: 8px auto;">
-                            <i class="fab fa-xbox" style="color: #107C10; font-size: 40px; line-height: 1;"></i>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 3200},
-
-                        }
-                    }
-                }
-            },
-            "FC26_XBOX_Ultimate": {
-                "name": "Xbox Ultimate Edition 🎮",
-                "platforms": {
-                    "Xbox": {
-                        "name": "Xbox Series X/S & Xbox One",
-                        "icon": '''<div style="text-align: center; margin: 8px auto; position: relative; display: inline-block;">
-                            <i class="fab fa-xbox" style="color: #107C10; font-size: 40px; line-height: 1;"></i>
-                            <div style="position: absolute; top: -5px; right: -5px; background: #ff8f00; color: white; font-size: 10px; padding: 2px 4px; border-radius: 10px; font-weight: bold; box-shadow: 0 0 8px rgba(255, 143, 0, 0.6);">ULT</div>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل", "price": 4200},
-  
-                        }
-                    }
-                }
-            },
-            "FC26_PC_Standard": {
-                "name": "PC (شهر) (month)  🖥️",
-                "platforms": {
-                    "PC": {
-                        "name": "PC (EA PRO)",
-                        "icon": '''<svg width="40" height="40" viewBox="0 0 24 24" fill="#FF8C00" style="display: block; margin: 0 auto;">
-                            <rect x="2" y="4" width="20" height="12" rx="2" fill="#FF8C00"/>
-                            <rect x="4" y="6" width="16" height="8" fill="white"/>
-                            <rect x="8" y="18" width="8" height="2" fill="#FF8C00"/>
-                            <rect x="6" y="20" width="12" height="2" fill="#FF8C00"/>
-                        </svg>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل على حسابك الشخصي 🔐", "price": 825}
-                        }
-                    }
-                }
-            },
-            "FC26_PC_Ultimate": {
-                "name": "PC (سنة) (year)  🖥️",
-                "platforms": {
-                    "PC": {
-                        "name": "PC (EA PRO)",
-                        "icon": '''<div style="text-align: center; margin: 8px auto; position: relative; display: inline-block;">
-                            <svg width="40" height="40" viewBox="0 0 24 24" fill="#FF8C00" style="display: block; margin: 0 auto;">
-                                <rect x="2" y="4" width="20" height="12" rx="2" fill="#FF8C00"/>
-                                <rect x="4" y="6" width="16" height="8" fill="white"/>
-                                <rect x="8" y="18" width="8" height="2" fill="#FF8C00"/>
-                                <rect x="6" y="20" width="12" height="2" fill="#FF8C00"/>
-                            </svg>
-                            <div style="position: absolute; top: -5px; right: -5px; background: #25D366; color: white; font-size: 10px; padding: 2px 4px; border-radius: 10px; font-weight: bold; box-shadow: 0 0 8px rgba(37, 211, 102, 0.6);">PRO</div>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل على حسابك الشخصي 🔐", "price": 2850}
-                        }
-                    }
-                }
-            },
-            "FC26_STEAM_Standard": {
-                "name": "Steam Standard Edition 🖥️",
-                "platforms": {
-                    "Steam": {
-                        "name": "PC (STEAM)",
-                        "icon": '''<div style="text-align: center; margin: 8px auto;">
-                            <i class="fab fa-steam-symbol" style="font-size: 40px; color: #ff0000; background: rgba(0, 0, 0, 0.8); padding: 8px; border-radius: 50%; border: 3px solid #ff0000; box-shadow: 0 0 20px rgba(255, 0, 0, 0.6); transition: transform 0.3s ease, box-shadow 0.3s ease; line-height: 1;"></i>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل مع First Email", "price": 2150}
-                        }
-                    }
-                }
-            },
-            "FC26_STEAM_Ultimate": {
-                "name": "Steam Ultimate Edition 🖥️",
-                "platforms": {
-                    "Steam": {
-                        "name": "PC (STEAM)",
-                        "icon": '''<div style="text-align: center; margin: 8px auto; position: relative; display: inline-block;">
-                            <i class="fab fa-steam-symbol" style="font-size: 40px; color: #ff0000; background: rgba(0, 0, 0, 0.8); padding: 8px; border-radius: 50%; border: 3px solid #ff0000; box-shadow: 0 0 20px rgba(255, 0, 0, 0.6); transition: transform 0.3s ease, box-shadow 0.3s ease; line-height: 1;"></i>
-                            <div style="position: absolute; top: -5px; right: -5px; background: #ff0000; color: white; font-size: 10px; padding: 2px 4px; border-radius: 10px; font-weight: bold; box-shadow: 0 0 8px rgba(255, 0, 0, 0.6);">ULT</div>
-                        </div>''',
-                        "accounts": {
-                            "Full": {"name": "Full - حساب كامل مع First Email", "price": 3500}
-                        }
-                    }
-                }
-            }
-        },
-        "settings": {
-            "currency": "جنيه مصري",
-            "warranty": "1 سنة",
-            "delivery_time": "15 دقيقه كحد أقصى",
-            "whatsapp_number": "+201094591331"
-        }
+        'reference_id': reference_id,
+        'created_at': datetime.fromtimestamp(created_at, timezone.utc).isoformat(),
+        'items': [dict(zip(Sku._fields, sku)) for sku in json.loads(skus)],
+        'price': price,
+        'currency': currency,
+        'ip_hash': ip_hash,
     }
 
-                       
-# Headers أمنية قوية
-@app.after_request
-def security_headers(response):
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-    response.headers['Content-Security-Policy'] = "default-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://wa.me"
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-    response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
-    return response
 
-# تنظيف المدخلات
-def sanitize_input(text, max_length=100):
-    if not text:
-        return None
-    
-    text = str(text).strip()
-    
-    if len(text) > max_length:
+inquiry_log = InquiryLog()
+atexit.register(inquiry_log.flush, timeout=5)     # الـ worker بيقفل: نكتب اللي في الـ queue الأول
+
+
+def require_admin_token(f):
+    """APIs الإدارة: Authorization: Bearer <ADMIN_TOKEN> - ولو ADMIN_TOKEN مش متحدد الـ API مقفولة (404)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            abort(404)
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not secrets.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+            log_event(logging.WARNING, "🚨 محاولة دخول على API الإدارة من غير توكن صحيح", ip=request.remote_addr, status=401)
+            return jsonify({'error': 'غير مصرح'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _parse_time_arg(name):
+    """?from= / ?to= - epoch أو ISO 8601 (من غير منطقة زمنية = OFFERS_TIMEZONE)"""
+    value = request.args.get(name)
+    if not value:
         return None
-    
-    text = re.sub(r'[<>"\';\\&]', '', text)
-    text = re.sub(r'(script|javascript|vbscript|onload|onerror)', '', text, flags=re.IGNORECASE)
-    
-    return text
+    try:
+        timestamp = float(value)
+    except ValueError:
+        try:
+            timestamp = parse_offer_time(value).timestamp()
+        except ValueError:
+            abort(400)
+    # inf/nan أو وقت بعد آخر رقم مرجعي ممكن - مش هيتحول لقيمة تنفع في SQLite
+    if not math.isfinite(timestamp) or not 0 <= timestamp <= REFERENCE_MAX_TIMESTAMP:
+        abort(400)
+    return timestamp
 
-# 🔥 الصفحة الرئيسية المحدثة - هنا بتغير الدالة دي
-@app.route('/')
-@rate_limit(max_requests=25, window=60)
-def index():
+
+@app.route('/api/inquiries/<reference_id>')
+@require_admin_token
+def get_inquiry(reference_id):
     try:
-        prices = get_prices()
-        offers = get_offers()
-        
-        # تطبيق العروض على الأسعار
-        prices = apply_offer_discount(prices, offers)
-        
-        logger.info("✅ تم تحميل الصفحة الرئيسية بنجاح مع العروض")
-        return render_template('index.html', prices=prices, offers=offers)
-    except Exception as e:
-        logger.error(f"❌ خطأ في الصفحة الرئيسية: {e}")
-        abort(500)
+        inquiry = inquiry_log.get(reference_id)
+    except ValueError:
+        return jsonify({'error': 'الرقم المرجعي غير صحيح'}), 400
+    if inquiry is None:
+        return jsonify({'error': 'الاستفسار غير موجود'}), 404
+    return jsonify(inquiry)
+
+
+@app.route('/api/inquiries')
+@require_admin_token
+def list_inquiries():
+    """صفحات بالـ keyset: ?from=&to=&limit=&after=<آخر رقم مرجعي>"""
+    limit = request.args.get('limit', 1000, type=int)
+    limit = max(1, min(limit, INQUIRY_PAGE_MAX))
+    try:
+        inquiries = inquiry_log.between(_parse_time_arg('from'), _parse_time_arg('to'),
+                                        request.args.get('after') or None, limit)
+    except ValueError:
+        return jsonify({'error': 'الرقم المرجعي غير صحيح'}), 400
+    return jsonify({
+        'inquiries': inquiries,
+        'next_after': inquiries[-1]['reference_id'] if len(inquiries) == limit else None,
+    })
+
 
 # إنشاء رابط واتساب مباشر
 @app.route('/whatsapp', methods=['POST'])
@@ -937,104 +2437,180 @@ def create_whatsapp_link():
         if not anti_spam_check(client_ip, user_agent):
             return jsonify({'error': 'تم تجاوز الحد المسموح - يرجى المحاولة لاحقاً'}), 429
         
-        # تنظيف البيانات
-        game_type = sanitize_input(request.form.get('game_type'))
-        platform = sanitize_input(request.form.get('platform'))
-        account_type = sanitize_input(request.form.get('account_type'))
+        # 🔥 الأسعار والعروض من لقطة الكتالوج الجاهزة
+        catalog = get_catalog()
         
-        if not all([game_type, platform, account_type]):
+        # التحقق من المنتج قبل أي شغل تاني
+        sku, problem = parse_sku(catalog, request.form.get('game_type'),
+                                 request.form.get('platform'), request.form.get('account_type'))
+        if problem == MISSING_SKU:
             return jsonify({'error': 'يرجى اختيار جميع الخيارات أولاً'}), 400
-        
-        # 🔥 تحميل الأسعار والعروض هنا
-        prices = get_prices()
-        offers = get_offers()
-        
-        # تطبيق العروض على الأسعار
-        prices = apply_offer_discount(prices, offers)
-        
-        if (game_type not in prices.get('games', {}) or
-            platform not in prices['games'][game_type].get('platforms', {}) or
-            account_type not in prices['games'][game_type]['platforms'][platform].get('accounts', {})):
-            logger.warning(f"🚨 اختيار منتج غير صحيح من IP: {client_ip}")
+        if problem == INVALID_SKU:
+            log_event(logging.WARNING, "🚨 اختيار منتج غير صحيح", ip=client_ip, status=400)
             return jsonify({'error': 'اختيار المنتج غير صحيح'}), 400
         
-        # بيانات المنتج
-        game_name = prices['games'][game_type]['name']
-        platform_name = prices['games'][game_type]['platforms'][platform]['name']
-        account_name = prices['games'][game_type]['platforms'][platform]['accounts'][account_type]['name']
-        price = prices['games'][game_type]['platforms'][platform]['accounts'][account_type]['price']
-        currency = prices.get('settings', {}).get('currency', 'جنيه')
+        # الرسالة الجاهزة + رقم مرجعي جديد (حروف وأرقام بس - مش محتاج encoding)
+        template = get_prepared(catalog, 'whatsapp_templates', build_whatsapp_templates)[sku]
+        reference_id = reference_ids.next_id()
+        whatsapp_url = template.url_prefix + reference_id + template.url_suffix
+        price_text = format_number(template.price)
+        inquiry_log.record(reference_id, [sku], template.price, template.currency, client_ip)
         
-        # إنشاء ID مرجعي
-        timestamp = str(int(time.time()))
-        reference_id = hashlib.md5(f"{timestamp}{client_ip}{game_type}{platform}".encode()).hexdigest()[:8].upper()
+        log_event(logging.INFO, "✅ فتح واتساب", sample=True, status=200, sku=f"{sku.game_type}/{sku.platform}/{sku.account_type}",
+                  reference_id=reference_id, price=template.price, currency=template.currency, ip=client_ip)
         
-        # إنشاء رسالة الواتساب - بدون وقت الاستفسار
-        message = f"""🎮 *استفسار من {BUSINESS_NAME}*
-
-🆔 *المرجع:* {reference_id}
-
-🎯 *المطلوب:*
-• اللعبة: {game_name}
-
-• المنصة: {platform_name}
-
-• نوع الحساب: {account_name}
+        return jsonify({
+            'success': True,
+            'reference_id': reference_id,
+            'whatsapp_url': whatsapp_url,
+            'price': price_text,
+            'currency': template.currency,
+            'message': 'سيتم فتح الواتساب الآن...'
+        })
+        
+    except Exception as e:
+        log_event(logging.ERROR, "❌ خطأ في إنشاء رابط الواتساب", error=str(e), ip=client_ip, status=500)
+        return jsonify({'error': 'حدث خطأ في النظام - يرجى المحاولة مرة أخرى'}), 500
 
-• السعر: {format_number(price)} {currency}
+# 🛒 استفسار واحد لأكتر من منتج
+# ============================
+# السلة كلها = طلب واحد: فحص anti-spam واحد، خانة واحدة من الـ rate limit، ورقم مرجعي واحد.
+BATCH_MAX_ITEMS = 10
+BATCH_ITEMS_PLACEHOLDER = "\x00ITEMS\x00"
 
-👋 *السلام عليكم، أريد الاستفسار عن هذا المنتج*
 
-شكراً 🌟"""
+@app.route('/whatsapp/batch', methods=['POST'])
+@rate_limit(max_requests=8, window=60)
+def create_whatsapp_batch_link():
+    """{"items": [{"game_type": ..., "platform": ..., "account_type": ...}, ...]}"""
+    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+    user_agent = request.headers.get('User-Agent', '')
+    
+    try:
+        # فحص Anti-spam
+        if not anti_spam_check(client_ip, user_agent):
+            return jsonify({'error': 'تم تجاوز الحد المسموح - يرجى المحاولة لاحقاً'}), 429
+        
+        payload = request.get_json(silent=True) or {}
+        items = payload.get('items') if isinstance(payload, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'يرجى اختيار منتج واحد على الأقل'}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({'error': f'أقصى عدد منتجات في الطلب الواحد {BATCH_MAX_ITEMS}'}), 400
         
-        # ترميز الرسالة للـ URL
-        encoded_message = urllib.parse.quote(message)
+        # التحقق من كل المنتجات مرة واحدة قبل أي شغل تاني
+        catalog = get_catalog()
+        skus = []
+        invalid_items = []
+        duplicate_items = []
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                invalid_items.append(position)
+                continue
+            sku, problem = parse_sku(catalog, item.get('game_type'), item.get('platform'), item.get('account_type'))
+            if problem:
+                invalid_items.append(position)
+            elif sku in skus:
+                duplicate_items.append(position)
+            else:
+                skus.append(sku)
+        if invalid_items:
+            log_event(logging.WARNING, "🚨 اختيار منتج غير صحيح في السلة", ip=client_ip, status=400)
+            return jsonify({'error': 'اختيار المنتج غير صحيح', 'invalid_items': invalid_items}), 400
+        if duplicate_items:
+            # السلة اللي اتبعتت لازم تطابق الرسالة والإجمالي - مش هندمج المكرر من غير ما نقول
+            return jsonify({'error': 'نفس المنتج متكرر في الطلب', 'duplicate_items': duplicate_items}), 400
         
-        # رقم الواتساب
-        whatsapp_number = prices.get('settings', {}).get('whatsapp_number', WHATSAPP_NUMBER)
-        clean_number = whatsapp_number.replace('+', '').replace('-', '').replace(' ', '')
+        # الرسالة من الأسطر الجاهزة لكل منتج + رقم مرجعي واحد
+        templates = get_prepared(catalog, 'whatsapp_templates', build_whatsapp_templates)
+        selected = [templates[sku] for sku in skus]
+        total = sum(template.price for template in selected)
+        currency = selected[0].currency
+        reference_id = reference_ids.next_id()
+        inquiry_log.record(reference_id, skus, total, currency, client_ip)
         
-        # إنشاء رابط الواتساب
-        whatsapp_url = f"https://wa.me/{clean_number}?text={encoded_message}"
+        message = whatsapp_batch_message(REFERENCE_PLACEHOLDER, BATCH_ITEMS_PLACEHOLDER, total, currency)
+        head, rest = message.split(REFERENCE_PLACEHOLDER)
+        middle, tail = rest.split(BATCH_ITEMS_PLACEHOLDER)
+        whatsapp_url = (whatsapp_base_url(catalog.prices) + urllib.parse.quote(head) + reference_id
+                        + urllib.parse.quote(middle)
+                        + ''.join(template.encoded_item for template in selected)
+                        + urllib.parse.quote(tail))
         
-        logger.info(f"✅ فتح واتساب: {reference_id} - {platform} {account_type} - {format_number(price)} {currency} - IP: {client_ip}")
+        log_event(logging.INFO, "✅ فتح واتساب (سلة)", sample=True, status=200, items=len(skus),
+                  reference_id=reference_id, price=total, currency=currency, ip=client_ip)
         
         return jsonify({
             'success': True,
             'reference_id': reference_id,
             'whatsapp_url': whatsapp_url,
-            'price': format_number(price),
+            'items': [
+                {'game_type': sku.game_type, 'platform': sku.platform, 'account_type': sku.account_type,
+                 'price': format_number(template.price)}
+                for sku, template in zip(skus, selected)
+            ],
+            'total': format_number(total),
             'currency': currency,
             'message': 'سيتم فتح الواتساب الآن...'
         })
         
     except Exception as e:
-        logger.error(f"❌ خطأ في إنشاء رابط الواتساب: {e}")
+        log_event(logging.ERROR, "❌ خطأ في إنشاء رابط واتساب للسلة", error=str(e), ip=client_ip, status=500)
         return jsonify({'error': 'حدث خطأ في النظام - يرجى المحاولة مرة أخرى'}), 500
 
+
 # 🔥 API جديد للعروض - تضيف دي بعد get_prices_api
 @app.route('/api/offers')
 @rate_limit(max_requests=15, window=60)
 def get_offers_api():
     try:
-        offers = get_offers()
-        return jsonify(offers)
+        return send_prepared(get_prepared(get_catalog(), 'api_offers', lambda catalog: prepare_json(catalog.offers)))
     except Exception as e:
-        logger.error(f"❌ خطأ في API العروض: {e}")
+        log_event(logging.ERROR, "❌ خطأ في API العروض", error=str(e), status=500)
         return jsonify({'error': 'خطأ في النظام'}), 500
 
 # API للحصول على الأسعار
+def build_prices_delta(catalog, since):
+    """الفرق من إصدار since للإصدار الحالي - None لو since مش معروف أو فيه منتجات جديدة (محتاج الشجرة كاملة)"""
+    previous = catalog_history(since)
+    if previous is None:
+        return None
+    current = price_points(catalog.prices)
+    if not current.keys() <= previous.keys():
+        return None                     # منتج جديد محتاج اسمه وأيقونته - الشجرة كاملة أحسن
+    changed = [
+        {"sku": list(sku), "price": price, "original_price": original_price, "discount_percentage": discount}
+        for sku, (price, original_price, discount) in current.items()
+        if previous[sku] != (price, original_price, discount)
+    ]
+    removed = [list(sku) for sku in previous.keys() - current.keys()]
+    return prepare_json({"version": catalog.version, "since": since, "changed": changed, "removed": sorted(removed)})
+
+
 @app.route('/api/prices')
 @rate_limit(max_requests=15, window=60)
 def get_prices_api():
+    """الأسعار كاملة - أو مع ?since=<version> الفرق بس من الإصدار ده (304 لو مفيش تغيير)"""
     try:
-        prices = get_prices()
-        offers = get_offers()
-        # تطبيق العروض على الأسعار
-        prices = apply_offer_discount(prices, offers)
-        return jsonify(prices)
+        catalog = get_catalog()
+        since = request.args.get('since')
+        if since == catalog.version:
+            response = app.response_class(status=304)
+        else:
+            delta = None
+            if since and catalog_history(since) is not None:   # مفتاح الكاش من إصدار معروف بس - مش أي نص من برة
+                delta = get_prepared(catalog, ('prices_delta', since), lambda catalog: build_prices_delta(catalog, since))
+            if delta is not None:
+                response = send_prepared(delta)
+                response.headers['X-Catalog-Delta'] = 'patch'
+            else:
+                response = send_prepared(get_prepared(catalog, 'api_prices', lambda catalog: prepare_json(catalog.prices)))
+                if since:
+                    response.headers['X-Catalog-Delta'] = 'full'
+        response.headers['X-Catalog-Version'] = catalog.version
+        return response
     except Exception as e:
-        logger.error(f"❌ خطأ في API الأسعار: {e}")
+        log_event(logging.ERROR, "❌ خطأ في API الأسعار", error=str(e), status=500)
         return jsonify({'error': 'خطأ في النظام'}), 500
 
 # Health check
@@ -1043,6 +2619,37 @@ def get_prices_api():
 def health_check():
     return {'status': 'healthy', 'timestamp': datetime.now().isoformat()}, 200
 
+# 📊 المقاييس
+def collect_worker_gauges():
+    """الـ gauges اللي قيمتها خاصة بالـ worker ده (الجداول المحلية) - الجداول المشتركة مش هنا"""
+    values = {'offer_streams_open': offer_streams.open, 'inquiry_queue_depth': inquiry_log.depth()}
+    if isinstance(anti_spam_tracker, AntiSpamTracker):
+        values['anti_spam_tracked_keys'] = len(anti_spam_tracker)
+    if isinstance(rate_limit_store, InProcessRateLimitStore):
+        values['rate_limit_tracked_keys'], values['rate_limit_blocked_ips'] = rate_limit_store.sizes()
+    return values
+
+
+metrics.publish_gauges_from(collect_worker_gauges)
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    local = collect_worker_gauges()
+    metrics.publish_gauges(local)               # الـ worker اللي بيرد بأحدث قيمه
+    # الجداول المشتركة (shared memory) قيمتها واحدة من أي worker - من غير جمع
+    gauges = []
+    if not isinstance(anti_spam_tracker, AntiSpamTracker):
+        gauges.append(('senioraaa_anti_spam_tracked_keys', 'Tracked (IP, User-Agent) keys in the shared anti-spam table.',
+                       len(anti_spam_tracker)))
+    if not isinstance(rate_limit_store, InProcessRateLimitStore) and hasattr(rate_limit_store, 'sizes'):
+        counters, blocked = rate_limit_store.sizes()
+        gauges.append(('senioraaa_rate_limit_tracked_keys', 'Tracked rate-limit counters in the shared table.', counters))
+        gauges.append(('senioraaa_rate_limit_blocked_ips', 'Currently blocked IPs in the shared table.', blocked))
+    gauges.append(('senioraaa_metrics_scope_shared', '1 if counters are aggregated across workers via METRICS_DIR.', 1 if METRICS_DIR else 0))
+    return render_metrics(gauges, local.keys()), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+                                          'Cache-Control': 'no-store'}
+
 # Robots.txt
 @app.route('/robots.txt')
 def robots():
@@ -1051,79 +2658,182 @@ Disallow: /admin/
 Disallow: /api/
 Crawl-delay: 10''', 200, {'Content-Type': 'text/plain'}
 
-# 🔥 العروض المنبثقة - إضافة route مفقود
+def offer_valid_until(offer):
+    """نص الصلاحية في الـ popup: ميعاد النهاية لو العرض مجدول"""
+    if not offer.get("ends_at"):
+        return "نفاذ الكمية"
+    return f"حتى {datetime.fromisoformat(offer['ends_at']):%d/%m %H:%M}"
+
+
+# العروض المنبثقة - نفس تصنيف الصفحة (GAME_EDITIONS)
+def build_popup_offers(catalog):
+    """تحويل العروض لصيغة مناسبة للـ popup"""
+    popup_offers = []
+    for offer in catalog.offer_index.offers_list:
+        edition = game_edition(offer["game"])
+        account_display_name = ACCOUNT_DISPLAY_NAMES.get(offer["account"], "")
+        popup_offers.append({
+            "id": f"{offer['game']}_{offer['platform']}_{offer['account']}",
+            "title": edition.display_name if edition else "",
+            "description": f"{offer['platform']} • {account_display_name} - خصم حصري لفترة محدودة!",
+            "fake_price": offer["fake_price"],
+            "real_price": offer["real_price"],
+            "discount_percentage": offer["discount"],
+            "valid_until": offer_valid_until(offer),
+            # بيانات إضافية للتعامل مع الطلب
+            "game_type": offer["game"],
+            "platform": offer["platform"],
+            "account_type": offer["account"]
+        })
+
+    return {
+        "success": True,
+        "offers": popup_offers,
+        "total_offers": len(popup_offers)
+    }
+
+
+# 🔥 العروض المنبثقة
 @app.route('/get_offers')
 @rate_limit(max_requests=10, window=60)
 def get_offers_popup():
     """API للعروض المنبثقة في الصفحة الرئيسية"""
     try:
-        offers_data = get_offers()
-        
-        # تحويل العروض لصيغة مناسبة للـ popup
-        popup_offers = []
-        
-        if offers_data.get("active_offer") and offers_data["active_offer"].get("offers_list"):
-            for offer in offers_data["active_offer"]["offers_list"]:
-                # تحديد اسم اللعبة بالعربية
-                game_display_name = ""
-                if "AR_Standard" in offer["game"]:
-                    game_display_name = "🇸🇦 Standard Edition (Arabic)"
-                elif "AR_Ultimate" in offer["game"]:
-                    game_display_name = "🇸🇦 Ultimate Edition (Arabic)"
-                elif "EN_Standard" in offer["game"]:
-                    game_display_name = "🇺🇸 Standard Edition (English)"
-                elif "EN_Ultimate" in offer["game"]:
-                    game_display_name = "🇺🇸 Ultimate Edition (English)"
-                elif "XBOX_Standard" in offer["game"]:
-                    game_display_name = "🎮 Xbox Standard Edition"
-                elif "XBOX_Ultimate" in offer["game"]:
-                    game_display_name = "🎮 Xbox Ultimate Edition"
-                elif "PC_Standard" in offer["game"]:
-                    game_display_name = "🖥️ PC Standard (شهر)"
-                elif "PC_Ultimate" in offer["game"]:
-                    game_display_name = "🖥️ PC Ultimate (سنة)"
-                elif "STEAM_Standard" in offer["game"]:
-                    game_display_name = "🖥️ Steam Standard"
-                elif "STEAM_Ultimate" in offer["game"]:
-                    game_display_name = "🖥️ Steam Ultimate"
-                
-                # تحديد نوع الحساب بالعربية
-                account_display_name = ""
-                if offer["account"] == "Full":
-                    account_display_name = "حساب كامل"
-                elif offer["account"] == "Primary":
-                    account_display_name = "تفعيل أساسي"
-                elif offer["account"] == "Secondary":
-                    account_display_name = "تسجيل دخول مؤقت"
-                
-                popup_offers.append({
-                    "id": f"{offer['game']}_{offer['platform']}_{offer['account']}",
-                    "title": game_display_name,
-                    "description": f"{offer['platform']} • {account_display_name} - خصم حصري لفترة محدودة!",
-                    "fake_price": offer["fake_price"],
-                    "real_price": offer["real_price"], 
-                    "discount_percentage": offer["discount"],
-                    "valid_until": "نفاذ الكمية",
-                    # بيانات إضافية للتعامل مع الطلب
-                    "game_type": offer["game"],
-                    "platform": offer["platform"],
-                    "account_type": offer["account"]
-                })
-        
-        return jsonify({
-            "success": True,
-            "offers": popup_offers,
-            "total_offers": len(popup_offers)
-        })
+        return send_prepared(get_prepared(get_catalog(), 'popup_offers',
+                                          lambda catalog: prepare_json(build_popup_offers(catalog))))
         
     except Exception as e:
-        logger.error(f"❌ خطأ في get_offers_popup: {e}")
+        log_event(logging.ERROR, "❌ خطأ في get_offers_popup", error=str(e), status=500)
         return jsonify({
             "success": False, 
             "offers": [],
             "error": "خطأ في تحميل العروض"
         }), 500
 
+# 📡 بث تغييرات العروض (SSE)
+# ==========================
+# بدل ما كل تاب مفتوح يطلب /get_offers، الصفحة بتفتح اتصال واحد على /events/offers:
+# معاه إصدار الكتالوج اللي اترسمت بيه (?since=) - لو قديم بتاخد العروض الحالية على طول،
+# وبعد كده event واحد بس لما الإصدار يتغير (عرض أو سعر)،
+# وبينهم سطر تعليق (heartbeat) كل SSE_HEARTBEAT_SECONDS عشان الـ proxies متقفلش الاتصال.
+# الاتصالات الخاملة دي محتاجة worker بيشيل آلاف الاتصالات برخص (gevent - شوف gunicorn.conf.py).
+# مع gthread كل اتصال بياخد thread كامل، فعددهم في الـ worker محدود. الاتصال الزيادة بياخد رد SSE فاضي
+# فيه retry: بس (مش 503 - الـ EventSource بيبطل يحاول خالص بعد 503)، فالمتصفح بيرجع يحاول بعد شوية
+# والصفحة بتكمل بالعروض اللي اترسمت معاها لحد كده.
+# الـ rate limit هنا عداد لوحده لكل IP (مش عداد الصفحة /)، ومن غير حظر: الاتصالات الكتير بترجع retry بس،
+# عشان إعادة الاتصال متحظرش الـ IP من الصفحة نفسها.
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '25'))
+SSE_STREAM_LIFETIME = float(os.environ.get('SSE_STREAM_LIFETIME', '600'))   # بعدها المتصفح بيعيد الاتصال لوحده
+SSE_RETRY_MS = 5000
+SSE_REFUSED_RETRY_MS = 30000        # اتصال مرفوض: المتصفح يرجع بعد كده (+ لحد نفس المدة عشوائي)
+SSE_CONNECTS_PER_MINUTE = 20        # فتح اتصالات /events/offers لكل IP في الدقيقة
+
+
+def max_offer_streams():
+    """أقصى عدد اتصالات /events/offers في الـ worker ده"""
+    if os.environ.get('SSE_MAX_STREAMS'):
+        return int(os.environ['SSE_MAX_STREAMS'])
+    if green_worker():
+        # 90% من اتصالات الـ worker - الباقي للطلبات العادية
+        return int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '5000')) * 9 // 10
+    # thread لكل اتصال: ربع الـ threads بالكتير عشان الطلبات العادية متستناش
+    return max(1, int(os.environ.get('GUNICORN_THREADS', '8')) // 4)
+
+
+class OfferStreams:
+    """اتصالات /events/offers المفتوحة في الـ worker ده + thread واحد بيراجع الكتالوج طول ما فيه اتصالات"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+        self.open = 0
+
+    def acquire(self, limit):
+        """حجز مكان لاتصال جديد - False لو الـ worker مليان"""
+        with self._lock:
+            if self.open >= limit:
+                return False
+            self.open += 1
+            if self._watcher_pid != os.getpid():
+                threading.Thread(target=self._watch, daemon=True, name='offer-streams-watcher').start()
+                self._watcher_pid = os.getpid()
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+    def _watch(self):
+        # لو مفيش طلبات عادية محدش هيعمل فحص ملف الكتالوج وحدود العروض - الـ thread ده بيعمله
+        while True:
+            with self._lock:
+                if self.open <= 0:
+                    self._watcher_pid = None
+                    return
+            snapshot = get_catalog()        # لقطة جديدة = _install_catalog بيصحي كل الاتصالات
+            delay = CATALOG_CHECK_INTERVAL
+            if snapshot.expires_at is not None:
+                delay = min(delay, max(0.05, snapshot.expires_at - time.time()))
+            time.sleep(delay)
+
+
+offer_streams = OfferStreams()
+
+
+def build_offer_event(catalog):
+    """event واحد جاهز لإصدار الكتالوج ده - نفس بيانات /get_offers + الإصدار"""
+    data = app.json.dumps(dict(build_popup_offers(catalog), version=catalog.version), separators=(",", ":"))
+    return f"id: {catalog.version}\nevent: offers\ndata: {data}\n\n".encode('utf-8')
+
+
+def offer_events(last_version):
+    """الـ stream: العروض لو الإصدار مختلف عن last_version، وبعد كده تغيير أو heartbeat"""
+    deadline = time.monotonic() + SSE_STREAM_LIFETIME
+    yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+    while True:
+        catalog = get_catalog()
+        if catalog.version != last_version:
+            last_version = catalog.version
+            yield get_prepared(catalog, 'offer_event', build_offer_event)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        # المقارنة جوه الـ lock - لو اللقطة اتبدلت قبل الـ wait مش هنفوت الـ notify
+        with _catalog_changed:
+            changed = (_catalog_snapshot.version != last_version
+                       or _catalog_changed.wait(min(SSE_HEARTBEAT_SECONDS, remaining)))
+        if not changed:
+            yield b": ping\n\n"
+
+
+def refused_offer_stream(reason, retry_ms):
+    """رد SSE من غير events - المتصفح بيقفل ويعيد الاتصال بعد retry (reason في X-Stream-Refused)"""
+    retry_ms += random.randrange(retry_ms)     # المتصفحات المرفوضة مترجعش كلها في نفس اللحظة
+    response = app.response_class(f"retry: {retry_ms}\n\n", mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Stream-Refused'] = reason
+    return response
+
+
+@app.route('/events/offers')
+def offer_events_stream():
+    """SSE للعروض - الاتصال بيتعد في الـ rate limit مرة واحدة لما يتفتح فعلاً، مش كل event"""
+    if not offer_streams.acquire(max_offer_streams()):
+        return refused_offer_stream('busy', SSE_REFUSED_RETRY_MS)
+    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+    if rate_limit_store.hit(f"{client_ip}|events", SSE_CONNECTS_PER_MINUTE, 60, 0) != HIT_ALLOWED:
+        offer_streams.release()
+        log_event(logging.WARNING, "🚨 اتصالات /events/offers كتير من نفس الـ IP", ip=client_ip)
+        return refused_offer_stream('rate_limit', 60 * 1000)
+    # الإصدار اللي عند الصفحة: ?since= من بيانات الصفحة، وبعد إعادة الاتصال Last-Event-ID (آخر event وصل)
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    response = app.response_class(offer_events(since), mimetype='text/event-stream')
+    response.call_on_close(offer_streams.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'      # nginx ميخزنش الـ events
+    return response
+
+
 # معالجات الأخطاء
 @app.errorhandler(400)
 def bad_request(error):
@@ -1139,7 +2849,7 @@ def too_many_requests(error):
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"❌ خطأ داخلي: {error}")
+    log_event(logging.ERROR, "❌ خطأ داخلي", error=str(error), status=500)
     return f"خطأ داخلي: {error}", 500
 
 # إضافة filter للـ Jinja2 لتنسيق الأرقام
@@ -1149,7 +2859,7 @@ def format_number_filter(number):
 
 # تشغيل التطبيق
 if __name__ == '__main__':
-    logger.info("🚀 تم تشغيل التطبيق بنجاح - الأسعار مدمجة في الكود مع فاصلة عشرية والعروض")
+    log_event(logging.INFO, "🚀 تم تشغيل التطبيق بنجاح - الأسعار والعروض من ملف الكتالوج")
     app.run(debug=False, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
 else:
-    logger.info("🚀 تم تشغيل التطبيق عبر gunicorn - الأسعار مدمجة في الكود مع فاصلة عشرية والعروض")
+    log_event(logging.INFO, "🚀 تم تشغيل التطبيق عبر gunicorn - الأسعار والعروض من ملف الكتالوج")
@@ -0,0 +1,427 @@
+// 🎮 سكريبت الصفحة الرئيسية - ملف واحد لكل حاجة
+// =============================================
+// كل البيانات اللي الصفحة محتاجاها جاية في #pageData (JSON جوه الصفحة من نفس إصدار الكتالوج)،
+// فمفيش أي طلب بعد تحميل الصفحة غير اتصال /events/offers (تغيير العروض) وطلبات الواتساب نفسها.
+// الاتصال ده ليه عداد rate limit لوحده في السيرفر - فتحه مبياكلش من حد تحميل الصفحة.
+
+const pageData = JSON.parse(document.getElementById('pageData').textContent);
+const offersData = { active_offer: pageData.active_offer };
+let popupOffers = pageData.popup;
+
+// متغيرات الاختيار
+let selectedGame = '';
+let selectedPlatform = '';
+let selectedAccount = '';
+let selectedPrice = 0;
+let selectedCurrency = '';
+
+// متغيرات إضافية
+let selectedProductData = {};
+let isRequestInProgress = false;
+
+// عناصر النموذج
+const alertContainer = document.getElementById('alertContainer');
+const accountOptions = document.querySelectorAll('.account-option');
+const productBtns = document.querySelectorAll('.product-btn');
+
+// دالة لتنسيق الأرقام مع فاصلة الآلاف
+function formatNumberWithCommas(number) {
+    const num = Number(number);
+    if (isNaN(num)) {
+        return number; // لو مش رقم، رجعه زي ما هو
+    }
+    return num.toLocaleString('en-US');
+}
+
+// دالة إظهار الرسائل
+function showAlert(message, type = 'success') {
+    if (!alertContainer) {
+        console.error('❌ alertContainer مش موجود');
+        alert(message.replace(/<br>/g, '\n').replace(/<[^>]*>/g, ''));
+        return;
+    }
+
+    const alertClass = type === 'success' ? 'alert-success' : 'alert-danger';
+    const icon = type === 'success' ? '✅' : '❌';
+
+    alertContainer.innerHTML = `
+        <div class="alert ${alertClass} alert-dismissible fade show alert-custom" role="alert">
+            <strong>${icon} ${message}</strong>
+            <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+        </div>
+    `;
+
+    // إزالة الرسالة بعد 5 ثوان
+    setTimeout(() => {
+        const alert = alertContainer.querySelector('.alert');
+        if (alert) alert.remove();
+    }, 5000);
+}
+
+// 📲 طلب الواتساب - نفس الدالة لزر الكارت ولاختيار عرض من الـ popup
+// بترجع رد السيرفر (success + whatsapp_url أو error)، وبترمي error بس لو الشبكة نفسها فشلت
+function requestWhatsapp(gameType, platform, accountType) {
+    const formData = new FormData();
+    formData.append('game_type', gameType);
+    formData.append('platform', platform);
+    formData.append('account_type', accountType);
+
+    return fetch('/whatsapp', {
+        method: 'POST',
+        body: formData,
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    }).then(response => response.json().catch(() => ({ success: false })));
+}
+
+// 🔥 العرض المنبثق الذكي (#offerOverlay)
+function checkOfferDisplay() {
+    const hasSeenOffer = localStorage.getItem('hasSeenOffer_' + (offersData?.active_offer?.id || 'default'));
+
+    if (offersData?.active_offer?.show_popup && !hasSeenOffer) {
+        document.getElementById('offerOverlay').style.display = 'flex';
+    }
+}
+
+function closeOfferModal() {
+    const overlay = document.getElementById('offerOverlay');
+    if (overlay) {
+        overlay.style.display = 'none';
+        // حفظ إن المستخدم شاف العرض
+        localStorage.setItem('hasSeenOffer_' + (offersData?.active_offer?.id || 'default'), 'true');
+    }
+}
+
+function scrollToProducts() {
+    const productsSection = document.querySelector('.products-section');
+    if (productsSection) {
+        productsSection.scrollIntoView({ behavior: 'smooth' });
+    }
+}
+
+function acceptOffers() {
+    console.log('🔥 قبول العروض');
+    closeOfferModal();
+    scrollToProducts();
+    localStorage.setItem('acceptedOffers', 'true');
+}
+
+function declineOffers() {
+    console.log('👀 رفض العروض');
+    closeOfferModal();
+    scrollToProducts();
+    localStorage.setItem('declinedOffers', 'true');
+}
+
+// الضغط على عرض في العرض المنبثق: نروح للكارت بتاعه ونختار نوع الحساب
+function navigateToProduct(game, platform, account) {
+    closeOfferModal();
+    const option = document.querySelector(
+        `.account-option[data-game="${game}"][data-platform="${platform}"][data-account="${account}"]`);
+    if (!option) {
+        scrollToProducts();
+        return;
+    }
+    option.closest('.product-card').scrollIntoView({ behavior: 'smooth', block: 'center' });
+    option.click();
+}
+
+// 🎁 قائمة العروض (#offersPopup) - من بيانات الصفحة، و/events/offers بيحدثها لو اتغيرت
+function showOffers() {
+    const popup = document.getElementById('offersPopup');
+    const offersContainer = document.getElementById('offersContainer');
+
+    if (popupOffers.offers && popupOffers.offers.length > 0) {
+        offersContainer.innerHTML = '';
+
+        popupOffers.offers.forEach((offer, index) => {
+            const offerElement = document.createElement('div');
+            offerElement.className = 'offer-item';
+            offerElement.setAttribute('data-offer-id', offer.id || index);
+            offerElement.addEventListener('click', function() {
+                selectOffer(offer);
+            });
+
+            offerElement.innerHTML = `
+                <div class="offer-title">${offer.title || 'عرض خاص'}</div>
+                <div class="offer-description">${offer.description || 'احصل على خصم رائع'}</div>
+                <div class="offer-price">
+                    <span class="fake-price">${formatNumberWithCommas(offer.fake_price || '0')}</span>
+                    <span class="real-price">${formatNumberWithCommas(offer.real_price || '0')}</span>
+                    <span class="discount-badge">${offer.discount_percentage || '0'}% خصم</span>
+                </div>
+                <div class="offer-validity">صالح حتى: ${offer.valid_until || 'غير محدود'}</div>
+                <div class="text-center mt-2">
+                    <small style="color: #888;">👆 اضغط للاختيار</small>
+                </div>
+            `;
+
+            offersContainer.appendChild(offerElement);
+        });
+    } else {
+        offersContainer.innerHTML = `
+            <div class="no-offers">
+                <h4>😔 لا توجد عروض متاحة حالياً</h4>
+                <p>تابعنا للحصول على أحدث العروض</p>
+                <button onclick="closePopup()" class="btn btn-primary mt-2">حسناً</button>
+            </div>
+        `;
+    }
+
+    popup.style.display = 'block';
+}
+
+function closePopup() {
+    document.getElementById('offersPopup').style.display = 'none';
+}
+
+function selectOffer(offer) {
+    console.log('🎯 تم اختيار عرض:', offer);
+
+    // التأكد من وجود البيانات المطلوبة
+    if (!offer.game_type || !offer.platform || !offer.account_type) {
+        alert('❌ بيانات العرض غير مكتملة، لا يمكن إرسال الطلب.');
+        return;
+    }
+
+    requestWhatsapp(offer.game_type, offer.platform, offer.account_type)
+        .then(data => {
+            if (data.success) {
+                console.log(`طلب ناجح! جاري فتح الواتساب... المرجع: ${data.reference_id}`);
+                window.open(data.whatsapp_url, '_blank');
+            } else {
+                alert('❌ ' + (data.error || 'حدث خطأ في إرسال الطلب'));
+            }
+        })
+        .catch(error => {
+            console.error('خطأ في الشبكة:', error);
+            alert('❌ حدث خطأ في الاتصال بالشبكة.');
+        });
+
+    // قفل الـ popup بعد الضغط مباشرة
+    closePopup();
+}
+
+// 📡 تغيير في العروض أو الأسعار وهي الصفحة مفتوحة - event واحد بدل ما نسأل السيرفر
+// since = آخر إصدار كتالوج عندنا (الأول إصدار الصفحة)، فالسيرفر مش هيبعت حاجة لحد ما يتغير.
+// التاب اللي فضل مخفي دقيقة بيقفل الاتصال (مبيشيلش مكان في الـ worker على الفاضي)
+// ولما يظهر تاني بيفتحه من آخر إصدار وصله - لو العروض اتغيرت في النص بتوصل على طول.
+const OFFERS_STREAM_IDLE_MS = 60000;
+let offersVersion = pageData.version;
+let offersStream = null;
+let offersStreamCloseTimer = null;
+
+function openOffersStream() {
+    if (offersStream || document.hidden) {
+        return;
+    }
+    offersStream = new EventSource(`/events/offers?since=${encodeURIComponent(offersVersion)}`);
+    offersStream.addEventListener('offers', event => {
+        popupOffers = JSON.parse(event.data);
+        offersVersion = popupOffers.version;
+        // العروض اتغيرت والـ popup مفتوح - نعرض الجديدة
+        if (document.getElementById('offersPopup').style.display === 'block') {
+            showOffers();
+        }
+    });
+}
+
+function closeOffersStream() {
+    if (offersStream) {
+        offersStream.close();
+        offersStream = null;
+    }
+}
+
+if (window.EventSource) {
+    document.addEventListener('visibilitychange', () => {
+        clearTimeout(offersStreamCloseTimer);
+        if (document.hidden) {
+            offersStreamCloseTimer = setTimeout(closeOffersStream, OFFERS_STREAM_IDLE_MS);
+        } else {
+            openOffersStream();
+        }
+    });
+    openOffersStream();
+}
+
+// 🛒 كروت المنتجات
+// تحديث الألوان حسب نوع اللعبة
+function updateCardColors() {
+    document.querySelectorAll('.product-card').forEach(card => {
+        const gameType = card.getAttribute('data-game-type');
+        if (gameType) {
+            card.classList.add(gameType);
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    updateCardColors();
+
+    // فحص عرض العروض المنبثقة
+    setTimeout(() => {
+        checkOfferDisplay();
+    }, 1000);
+
+    // إضافة أحداث النقر على خيارات الحساب
+    accountOptions.forEach(option => {
+        option.addEventListener('click', function() {
+            // إزالة التحديد من جميع الخيارات في نفس البطاقة
+            const card = this.closest('.product-card');
+            card.querySelectorAll('.account-option').forEach(opt => {
+                opt.classList.remove('selected');
+            });
+
+            // تحديد الخيار الحالي
+            this.classList.add('selected');
+
+            // حفظ بيانات الاختيار
+            selectedGame = this.dataset.game;
+            selectedPlatform = this.dataset.platform;
+            selectedAccount = this.dataset.account;
+            selectedPrice = this.dataset.price;
+            selectedCurrency = this.dataset.currency;
+
+            // تحديث بيانات المنتج المختار
+            selectedProductData = {
+                game: this.getAttribute('data-game'),
+                platform: this.getAttribute('data-platform'),
+                account: this.getAttribute('data-account'),
+                price: this.getAttribute('data-price'),
+                currency: this.getAttribute('data-currency')
+            };
+
+            // إضافة تأثير على الكارت المختار
+            document.querySelectorAll('.product-card').forEach(card => {
+                card.classList.remove('active-card');
+            });
+            card.classList.add('active-card');
+            document.getElementById('productsGrid').classList.add('has-active-card');
+
+            // تحديث زر الواتساب
+            const btn = card.querySelector('.product-btn');
+            const priceText = this.querySelector('.discounted-price') ?
+                this.querySelector('.discounted-price').textContent :
+                selectedPrice + ' ' + selectedCurrency.substring(0, 4);
+
+            btn.innerHTML = `
+                <svg class="whatsapp-logo-svg" viewBox="0 0 24 24" fill="currentColor">
+                    <path d="M17.472 14.382c-.297-.149-1.758-.867-2.03-.967-.273-.099-.471-.148-.67.15-.197.297-.767.966-.94 1.164-.173.199-.347.223-.644.075-.297-.15-1.255-.463-2.39-1.475-.883-.788-1.48-1.761-1.653-2.059-.173-.297-.018-.458.13-.606.134-.133.298-.347.446-.52.149-.174.198-.298.298-.497.099-.198.05-.371-.025-.52-.075-.149-.669-1.612-.916-2.207-.242-.579-.487-.5-.669-.51-.173-.008-.371-.01-.57-.01-.198 0-.52.074-.792.372-.272.297-1.04 1.016-1.04 2.479 0 1.462 1.065 2.875 1.213 3.074.149.198 2.096 3.2 5.077 4.487.709.306 1.262.489 1.694.625.712.227 1.36.195 1.871.118.571-.085 1.758-.719 2.006-1.413.248-.694.248-1.289.173-1.413-.074-.124-.272-.198-.57-.347m-5.421 7.403h-.004a9.87 9.87 0 01-5.031-1.378l-.361-.214-3.741.982.998-3.648-.235-.374a9.86 9.86 0 01-1.51-5.26c.001-5.45 4.436-9.884 9.888-9.884 2.64 0 5.122 1.03 6.988 2.898a9.825 9.825 0 012.893 6.994c-.003 5.45-4.437 9.884-9.885 9.884m8.413-18.297A11.815 11.815 0 0012.05 0C5.495 0 .16 5.335.157 11.892c0 2.096.547 4.142 1.588 5.945L.057 24l6.305-1.654a11.882 11.882 0 005.683 1.448h.005c6.554 0 11.890-5.335 11.893-11.893A11.821 11.821 0 0020.465 3.488"/>
+                </svg>
+                اطلب الآن - ${priceText}
+            `;
+            btn.disabled = false;
+        });
+    });
+
+    // تأثير الاهتزاز للموبايل عند الضغط
+    if ('vibrate' in navigator) {
+        document.querySelectorAll('.account-option, .btn-whatsapp').forEach(element => {
+            element.addEventListener('touchstart', function() {
+                navigator.vibrate(50);
+            });
+        });
+    }
+});
+
+// إضافة مستمعي الأحداث لأزرار الواتساب
+productBtns.forEach(btn => {
+    btn.addEventListener('click', async function(e) {
+        e.preventDefault();
+
+        if (isRequestInProgress) {
+            return;
+        }
+
+        const card = this.closest('.product-card');
+        const selectedOption = card.querySelector('.account-option.selected');
+
+        // إذا مافيش account مختار، نختار الأول تلقائياً
+        if (!selectedOption) {
+            const firstOption = card.querySelector('.account-option');
+            if (firstOption) {
+                firstOption.click(); // تفعيل الاختيار التلقائي
+
+                // إنتظار قليل ثم المتابعة
+                setTimeout(() => {
+                    this.click();
+                }, 100);
+            } else {
+                showAlert('يرجى اختيار نوع الحساب أولاً', 'error');
+            }
+            return;
+        }
+
+        const originalText = this.innerHTML;
+        this.disabled = true;
+        this.innerHTML = '<span class="loading-spinner"></span> جاري التحضير...';
+        isRequestInProgress = true;
+
+        try {
+            const data = await requestWhatsapp(selectedOption.dataset.game, selectedOption.dataset.platform,
+                                               selectedOption.dataset.account);
+
+            if (data.success) {
+                // إضافة رسالة للعروض الخاصة
+                let extraMessage = '';
+                if (card.classList.contains('offer-card')) {
+                    extraMessage = '<br><strong>🔥 تهانينا! لقد اخترت منتج من العرض الخاص!</strong>';
+                }
+
+                showAlert(`
+                    ✅ تم تحضير الاستفسار بنجاح!<br>
+                    <strong>رقم المرجع:</strong> ${data.reference_id}<br>
+                    <strong>السعر:</strong> ${data.price} ${data.currency}${extraMessage}<br>
+                    <strong>سيتم فتح الواتساب الآن...</strong>
+                `, 'success');
+
+                // فتح الواتساب فوراً
+                setTimeout(() => {
+                    window.open(data.whatsapp_url, '_blank');
+                }, 500);
+            } else {
+                showAlert(data.error || 'حدث خطأ غير متوقع', 'error');
+            }
+        } catch (error) {
+            console.error('Network Error:', error);
+            showAlert('خطأ في الشبكة. يرجى المحاولة مرة أخرى.', 'error');
+        } finally {
+            // إعادة تعيين الزر
+            setTimeout(() => {
+                isRequestInProgress = false;
+                this.disabled = false;
+                this.innerHTML = originalText;
+            }, 2000);
+        }
+    });
+});
+
+// الضغط خارج العناصر
+document.addEventListener('click', function(event) {
+    // إزالة تأثير البلور عند النقر خارج الكروت
+    if (!event.target.closest('.product-card')) {
+        document.querySelectorAll('.product-card').forEach(card => {
+            card.classList.remove('active-card');
+        });
+        const productsGrid = document.getElementById('productsGrid');
+        if (productsGrid) {
+            productsGrid.classList.remove('has-active-card');
+        }
+    }
+
+    // إغلاق العرض المنبثق عند الضغط خارجه
+    if (event.target === document.getElementById('offerOverlay')) {
+        closeOfferModal();
+    }
+    if (event.target === document.getElementById('offersPopup')) {
+        closePopup();
+    }
+});
+
+document.addEventListener('keydown', function(event) {
+    if (event.key === 'Escape') {
+        closePopup();
+    }
+});
+
+console.log('🚀 تم تحميل نظام العروض بنجاح');
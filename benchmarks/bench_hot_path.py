@@ -0,0 +1,215 @@
+"""قياس المسار الساخن للطلبات ومقارنته بخط الأساس المحفوظ (benchmarks/baseline.json)
+
+كله offline بالـ Flask test client - مفيش سيرفر ولا شبكة.
+
+التشغيل:
+    python benchmarks/bench_hot_path.py                  # قياس + مقارنة - exit 1 لو فيه تراجع
+    python benchmarks/bench_hot_path.py --update         # حفظ النتايج الحالية كخط أساس جديد
+    python benchmarks/bench_hot_path.py --threshold 0.5  # نسبة التراجع المسموحة (الافتراضي 0.3 = 30%)
+    python benchmarks/bench_hot_path.py get_prices whatsapp_handler   # حالات معينة بس
+
+الأرقام = أقل وقت لكل عملية (µs) من كذا تكرار، فالضوضاء بتأثر أقل.
+قبل وبعد كل حالة بنقيس loop ثابتة (calibration) ونظبط بيها خط الأساس، فسرعة الجهاز وقت القياس بالظبط متفرقش
+(الجهاز بيتغير في نص التشغيل - قياس calibration واحد في الأول مكانش كفاية).
+الحالات الصغيرة جداً (كام µs) ليها حد أدنى ثابت للفرق (NOISE_FLOOR_US) - نسبة 30% منها أقل من ضوضاء القياس.
+حدّث خط الأساس بـ --update لما تعمل تحسين مقصود (أو أي تغيير بيغير شغل حالة زي شكل الصفحة) -
+بيقيس كل حالة 1 + RETRIES مرة ويحفظ الوسيط، والمقارنة بعد كده بأحسن محاولة.
+"""
+import argparse
+import atexit
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+import logging
+
+# الاستفسارات اللي بيعملها القياس بتتكتب في قاعدة مؤقتة - مش inquiries.db اللي جنب app.py
+TEMP_DIR = tempfile.mkdtemp(prefix='senioraaa-bench-')
+os.environ['INQUIRY_DB_PATH'] = os.path.join(TEMP_DIR, 'inquiries.db')
+atexit.register(shutil.rmtree, TEMP_DIR, True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+logging.disable(logging.CRITICAL)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+RATE_LIMIT_TABLE_SIZES = (100, 10_000, 100_000)
+RETRIES = 5
+NOISE_FLOOR_US = 1.0                # أي فرق أقل من كده (على سرعة خط الأساس) مش تراجع
+WHATSAPP_FORM = {'game_type': 'FC26_EN_Standard', 'platform': 'PS5', 'account_type': 'Primary'}
+
+
+def _filled_store(size):
+    """store فيه size IP متسجلين قبل القياس"""
+    store = app.InProcessRateLimitStore()
+    for i in range(size):
+        store.hit(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 25, 60, app.RATE_LIMIT_BLOCK_SECONDS)
+    return store
+
+
+def bench_rate_limit(size):
+    """الـ decorator كامل (request context + hit) على جدول فيه size IP"""
+    app.rate_limit_store = _filled_store(size)
+    view = app.rate_limit(max_requests=10 ** 9, window=60)(lambda: None)
+    context = app.app.test_request_context('/', environ_base={'REMOTE_ADDR': '192.168.1.1'})
+    context.push()
+    return view, context.pop
+
+
+def bench_anti_spam():
+    """anti_spam_check لـ IPs متغيرة (كل IP بيعدي الفحص)"""
+    app.anti_spam_tracker = app.AntiSpamTracker()
+    ips = (f"172.16.{i >> 8 & 255}.{i & 255}" for i in itertools.count())
+    return lambda: app.anti_spam_check(next(ips), 'Mozilla/5.0'), None
+
+
+def bench_index_render():
+    """render لـ index.html + الضغط (اللي بيحصل مع كل إصدار كتالوج جديد)"""
+    catalog = app.get_catalog()
+    context = app.app.test_request_context('/')
+    context.push()
+    return lambda: app.render_index_page(catalog, 'ar'), context.pop
+
+
+def bench_whatsapp_handler():
+    """POST /whatsapp كامل - كل طلب من IP و User-Agent مختلفين عشان الحماية متوقفهوش"""
+    app.rate_limit_store = app.InProcessRateLimitStore()
+    app.anti_spam_tracker = app.AntiSpamTracker()
+    client = app.app.test_client()
+    counter = itertools.count()
+
+    def post():
+        i = next(counter)
+        response = client.post('/whatsapp', data=WHATSAPP_FORM, headers={'User-Agent': f"Mozilla/5.0 ({i})"},
+                               environ_base={'REMOTE_ADDR': f"10.200.{i >> 8 & 255}.{i & 255}"})
+        assert response.status_code == 200, response.status_code
+    return post, None
+
+
+def cases():
+    """اسم الحالة -> دالة تجهيز بترجع (الدالة اللي بتتقاس, تنظيف أو None)"""
+    catalog = app.get_catalog()
+    offers = app.get_offers()
+    return {
+        'get_prices': lambda: (app.get_prices, None),
+        'get_offers': lambda: (app.get_offers, None),
+        'apply_offer_discount': lambda: (lambda: app.apply_offer_discount(app.get_prices(catalog.source), offers), None),
+        'sanitize_input': lambda: (lambda: app.sanitize_input('FC26_EN_Standard <script>'), None),
+        **{f"rate_limit_{size}": (lambda size=size: bench_rate_limit(size)) for size in RATE_LIMIT_TABLE_SIZES},
+        'anti_spam_check': bench_anti_spam,
+        'index_render': bench_index_render,
+        'whatsapp_handler': bench_whatsapp_handler,
+    }
+
+
+def calibration():
+    """loop بايثون ثابتة - بتقيس سرعة الجهاز دلوقتي"""
+    def work():
+        total = 0
+        for i in range(1000):
+            total += i * i % 7
+        return {str(total): total}
+    return work, None
+
+
+def measure(setup, budget=0.2, repeat=7):
+    """أقل وقت لكل عملية بالـ µs - عدد المرات بيتحدد لوحده عشان كل تكرار ياخد حوالي budget ثانية"""
+    func, cleanup = setup()
+    try:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        number = max(1, int(number * budget / 0.2))
+        return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+    finally:
+        if cleanup:
+            cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*', help='حالات معينة (الافتراضي: كلها)')
+    parser.add_argument('--update', action='store_true', help='حفظ النتايج كخط أساس')
+    parser.add_argument('--threshold', type=float, default=0.3, help='نسبة التراجع المسموحة')
+    args = parser.parse_args()
+
+    all_cases = cases()
+    names = args.names or list(all_cases)
+    unknown = [name for name in names if name not in all_cases]
+    if unknown:
+        parser.error(f"حالات مش معروفة: {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    base_speed = baseline.get('calibration')
+    original_store, original_tracker = app.rate_limit_store, app.anti_spam_tracker
+    regressions = []
+    print(f"{'case':<22} {'µs/op':>10} {'baseline':>10} {'change':>8}")
+    results = {}
+    speeds = []
+    for name in names:
+        value = ratio = float('inf')
+        ratios = []
+        # لو الرقم باين أبطأ بنقيس تاني (لحد RETRIES مرات) قبل ما نعتبره تراجع - ضوضاء الجهاز بتعمل قفزات
+        for _ in range(1 + RETRIES):
+            before = measure(calibration, budget=0.05)
+            try:
+                measured = measure(all_cases[name])
+            finally:
+                app.rate_limit_store, app.anti_spam_tracker = original_store, original_tracker
+            # calibration قبل الحالة وبعدها - المتوسط أقرب لسرعة الجهاز وقت قياس الحالة نفسها
+            speed = (before + measure(calibration, budget=0.05)) / 2
+            speeds.append(speed)
+            ratios.append(measured / speed)
+            if measured / speed < ratio:
+                value, ratio = measured, measured / speed
+            if args.update:
+                continue                # خط الأساس من كل المحاولات (تحت)
+            if not baseline.get(name) or not base_speed:
+                break
+            # نفس المقارنة على سرعة خط الأساس: الوقت ÷ calibration اللي اتقاست حواليه
+            normalized = ratio * base_speed
+            if normalized - baseline[name] <= max(args.threshold * baseline[name], NOISE_FLOOR_US):
+                break
+        # --update: الوسيط مش الأحسن - خط أساس من قياس محظوظ بيخلي المقارنة تفشل على الضوضاء بعد كده
+        results[name] = (value, statistics.median(ratios) if args.update else ratio)
+        if baseline.get(name) and base_speed:
+            normalized = ratio * base_speed
+            change = normalized / baseline[name] - 1
+            failed = normalized - baseline[name] > max(args.threshold * baseline[name], NOISE_FLOOR_US)
+            flag = '  ❌' if failed else ''
+            print(f"{name:<22} {value:>10.2f} {baseline[name] * value / normalized:>10.2f} {change:>+7.0%}{flag}")
+            if failed:
+                regressions.append(name)
+        else:
+            print(f"{name:<22} {value:>10.2f} {'-':>10} {'':>8}")
+
+    if args.update:
+        speed = min(speeds)
+        if base_speed:
+            # الحالات اللي مش هتتقاس دلوقتي بتتحول لنفس السرعة
+            baseline = {name: round(value * speed / base_speed, 3) for name, value in baseline.items()}
+        baseline.update({name: round(ratio * speed, 3) for name, (_, ratio) in results.items()})
+        baseline['calibration'] = round(speed, 3)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write('\n')
+        print(f"✅ اتحفظ خط الأساس في {BASELINE_FILE}")
+        return 0
+
+    if regressions:
+        print(f"❌ تراجع أكتر من {args.threshold:.0%} في: {', '.join(regressions)}")
+        return 1
+    print("✅ مفيش تراجع عن خط الأساس")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
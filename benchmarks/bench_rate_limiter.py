@@ -0,0 +1,45 @@
+"""قياس الـ rate limiter المحلي: الوقت لكل طلب + الذاكرة مع مليون IP مختلف
+
+التشغيل:
+    python benchmarks/bench_rate_limiter.py [عدد الـ IPs]
+
+المتوقع: الذاكرة تثبت عند حد RATE_LIMIT_MAX_TRACKED_IPS مهما زاد عدد الـ IPs،
+والوقت لكل طلب ثابت تقريباً.
+"""
+import os
+import sys
+import time
+import tracemalloc
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+logging.disable(logging.CRITICAL)
+
+
+def run(total_ips=1_000_000, checkpoints=10):
+    store = app.InProcessRateLimitStore()
+    step = total_ips // checkpoints
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    print(f"{'IPs':>10} {'tracked':>9} {'memory MB':>10} {'µs/hit':>8}")
+
+    started = time.perf_counter()
+    for chunk in range(checkpoints):
+        chunk_started = time.perf_counter()
+        for n in range(chunk * step, (chunk + 1) * step):
+            ip = f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}.{n >> 24}"
+            store.hit(ip, 25, 60, app.RATE_LIMIT_BLOCK_SECONDS)
+        per_hit = (time.perf_counter() - chunk_started) / step * 1e6
+        memory = (tracemalloc.get_traced_memory()[0] - baseline) / 1e6
+        print(f"{(chunk + 1) * step:>10,} {store.sizes()[0]:>9,} {memory:>10.1f} {per_hit:>8.2f}")
+
+    tracemalloc.stop()
+    print(f"total: {time.perf_counter() - started:.1f}s - cap = {store.max_keys:,} IPs")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,49 @@
+"""مقارنة التحقق من المنتج في /whatsapp: الطريقة القديمة (sanitize_input + البحث في الأسعار)
+مقابل parse_sku (lookup واحد في frozenset)
+
+التشغيل:
+    python benchmarks/bench_validation.py
+"""
+import os
+import sys
+import timeit
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+logging.disable(logging.CRITICAL)
+
+CASES = {
+    'valid': ('FC26_EN_Standard', 'PS5', 'Primary'),
+    'unknown sku': ('FC26_EN_Standard', 'PS3', 'Primary'),
+    'junk': ('<script>alert(1)</script>' * 3, 'javascript:void(0)', '"; DROP TABLE x; --'),
+}
+
+
+def legacy_validate(catalog, game_type, platform, account_type):
+    game_type = app.sanitize_input(game_type)
+    platform = app.sanitize_input(platform)
+    account_type = app.sanitize_input(account_type)
+    if not all([game_type, platform, account_type]):
+        return None
+    prices = catalog.prices
+    if (game_type not in prices.get('games', {}) or
+            platform not in prices['games'][game_type].get('platforms', {}) or
+            account_type not in prices['games'][game_type]['platforms'][platform].get('accounts', {})):
+        return None
+    return game_type, platform, account_type
+
+
+def run(number=200_000):
+    catalog = app.get_catalog()
+    print(f"{'case':<14} {'legacy µs':>10} {'parse_sku µs':>13} {'speedup':>8}")
+    for name, values in CASES.items():
+        legacy = timeit.timeit(lambda: legacy_validate(catalog, *values), number=number) / number * 1e6
+        fast = timeit.timeit(lambda: app.parse_sku(catalog, *values), number=number) / number * 1e6
+        print(f"{name:<14} {legacy:>10.3f} {fast:>13.3f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,138 @@
+"""اختبار إعادة تحميل الكتالوج تحت الضغط: threads بتطلب /api/prices وفي نفس الوقت الملف بيتكتب من جديد
+
+التشغيل:
+    python benchmarks/check_catalog_reload.py [عدد مرات الكتابة] [عدد الـ threads]
+
+بيشتغل على نسخة مؤقتة من catalog.json (CATALOG_FILE) - الملف الأصلي مبيتلمسش.
+كل كتابة (save_catalog_source) بتزود كل الأسعار بنفس الرقم، فأي رد فيه أسعار من نسختين باين فوراً.
+في النص بنكتب ملف بايظ مرة - المفروض الطلبات تكمل بآخر نسخة سليمة. المطلوب:
+- كل رد 200 = body مطابق بالظبط لنسخة واحدة من اللي اتكتبت، ونفس الإصدار اللي في X-Catalog-Version
+- مفيش أي 500 أو exception
+- آخر نسخة اتكتبت هي اللي بتترد في الآخر
+الخروج بكود 1 لو أي حاجة مش مظبوطة.
+"""
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import logging
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMP_DIR = tempfile.mkdtemp(prefix='senioraaa-reload-')
+os.environ['CATALOG_FILE'] = os.path.join(TEMP_DIR, 'catalog.json')
+os.environ['CATALOG_CHECK_INTERVAL'] = '0'
+os.environ['INQUIRY_DB_PATH'] = os.path.join(TEMP_DIR, 'inquiries.db')
+shutil.copy(os.path.join(ROOT, 'catalog.json'), os.environ['CATALOG_FILE'])
+sys.path.insert(0, ROOT)
+
+import app
+
+logging.disable(logging.CRITICAL)
+
+
+def with_price_step(source, step):
+    """نفس الكتالوج مع كل الأسعار + step"""
+    source = app._thaw(source)
+    for game in source["prices"]["games"].values():
+        for platform in game["platforms"].values():
+            for account in platform["accounts"].values():
+                account["price"] += step
+    return source
+
+
+def run(rewrites=40, threads=8):
+    original = app.get_catalog().source
+    # الإصدار -> الأسعار المتوقعة بالظبط (من نفس الكود اللي بيبني اللقطة)
+    expected = {}
+    sources = []
+    for step in range(rewrites):
+        source = with_price_step(original, step)
+        snapshot = app.build_catalog_snapshot(source)
+        expected[snapshot.version] = json.loads(app.app.json.dumps(app._thaw(snapshot.prices)))
+        sources.append(source)
+    original_snapshot = app.get_catalog()
+    expected[original_snapshot.version] = json.loads(app.app.json.dumps(app._thaw(original_snapshot.prices)))
+
+    statuses = Counter()
+    problems = []
+    seen_versions = set()
+    lock = threading.Lock()
+    done = threading.Event()
+    addresses = itertools.count()      # IP مختلف لكل طلب عشان الـ rate limit ميوقفش الاختبار
+
+    def poll():
+        client = app.app.test_client()
+        while not done.is_set():
+            number = next(addresses)
+            response = client.get('/api/prices', headers={
+                'X-Forwarded-For': f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"})
+            with lock:
+                statuses[response.status_code] += 1
+            if response.status_code != 200:
+                continue
+            version = response.headers.get('X-Catalog-Version')
+            body = response.get_json()
+            with lock:
+                seen_versions.add(version)
+                if expected.get(version) != body:
+                    matches = [known for known, prices in expected.items() if prices == body]
+                    problems.append(f"version={version} body matches {matches or 'no version'}")
+
+    pollers = [threading.Thread(target=poll) for _ in range(threads)]
+    for thread in pollers:
+        thread.start()
+    started = time.perf_counter()
+    for step, source in enumerate(sources):
+        if step == rewrites // 2:
+            # ملف بايظ في النص: لازم يتسجل كخطأ والطلبات تكمل بالنسخة اللي قبله
+            with open(os.environ['CATALOG_FILE'], 'w', encoding='utf-8') as f:
+                f.write('{"prices": ')
+            time.sleep(0.02)
+        app.save_catalog_source(source)
+        time.sleep(0.02)
+    time.sleep(0.1)
+    done.set()
+    for thread in pollers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    final = app.get_catalog()
+    last_version = app.build_catalog_snapshot(sources[-1]).version
+    total = sum(statuses.values())
+    print(f"{total:,} requests in {elapsed:.2f}s while the file was rewritten {rewrites} times "
+          f"({len(seen_versions)} versions served) - statuses: {dict(statuses)}")
+
+    ok = True
+    if problems:
+        ok = False
+        print(f"  ❌ {len(problems)} responses did not match exactly one version, e.g. {problems[:3]}")
+    unexpected = sum(n for status, n in statuses.items() if status != 200)
+    if unexpected:
+        ok = False
+        print(f"  ❌ {unexpected} non-200 responses")
+    if final.version != last_version:
+        ok = False
+        print(f"  ❌ final version {final.version} != last written {last_version}")
+    if len(seen_versions) < 2:
+        ok = False
+        print("  ❌ the pollers never saw a reload")
+    print(f"  {'✅' if ok else '❌'} every response matched exactly one catalog version")
+    return ok
+
+
+def main():
+    rewrites = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    try:
+        return 0 if run(rewrites, threads) else 1
+    finally:
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""فحص الـ rate limiter على Redis من غير Redis حقيقي (fakeredis)
+
+التشغيل:
+    python benchmarks/check_redis_limiter.py
+
+محتاج fakeredis و lupa (الـ Lua script) - مش في requirements.txt لأنهم للفحص بس:
+    pip install fakeredis lupa
+
+بيعمل اتنين RedisRateLimitStore على نفس السيرفر (زي 2 workers) والمطلوب:
+- الحد مشترك: الطلبات المسموحة من الاتنين مع بعض = الحد بالظبط
+- الحظر اللي اتعمل في worker (rate limit أو anti-spam) باين عند التاني بنفس السبب
+- Redis وقع: الطلبات بتكمل بالعدادات المحلية، Redis مبيتسألش تاني لحد retry_seconds، وتحذير واحد بس
+- Redis رجع: بعد retry_seconds الطلبات بترجع للعداد المشترك
+- الـ decorator نفسه (/api/prices) بيرد 429 من العداد المشترك بين الاتنين
+الخروج بكود 1 لو أي حاجة مش مظبوطة.
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMP_DIR = tempfile.mkdtemp(prefix='senioraaa-redis-')
+os.environ['INQUIRY_DB_PATH'] = os.path.join(TEMP_DIR, 'inquiries.db')
+sys.path.insert(0, ROOT)
+
+try:
+    import fakeredis
+except ImportError:
+    sys.exit("محتاج fakeredis: pip install fakeredis lupa")
+
+import app
+
+logging.disable(logging.INFO)       # التحذيرات بس - بنعدها تحت
+RETRY_SECONDS = 0.5
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class CountingScript:
+    """نفس الـ Lua script بس بيعد كام مرة اتبعت لـ Redis"""
+
+    def __init__(self, script):
+        self.script = script
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.script(*args, **kwargs)
+
+
+def new_store(server):
+    client = fakeredis.FakeRedis(server=server)
+    return app.RedisRateLimitStore(client, app.InProcessRateLimitStore(), retry_seconds=RETRY_SECONDS)
+
+
+def run():
+    server = fakeredis.FakeServer()
+    first, second = new_store(server), new_store(server)
+    problems = []
+
+    def expect(condition, message):
+        print(f"  {'✅' if condition else '❌'} {message}")
+        if not condition:
+            problems.append(message)
+
+    # الحد مشترك بين الـ workers
+    results = [(first, second)[i % 2].hit('10.0.0.1', 10, 60, 300) for i in range(12)]
+    expect(results.count(app.HIT_ALLOWED) == 10 and results[10] == app.HIT_EXCEEDED,
+           f"10 allowed out of 12 hits split across 2 stores: {results.count(app.HIT_ALLOWED)}")
+    expect(first.hit('10.0.0.1', 10, 60, 300) == app.HIT_BLOCKED,
+           "a rate-limit block set by one store is seen by the other")
+
+    # حظر الـ anti-spam بسببه
+    first.block('10.0.0.2', 900, app.HIT_SPAM_BLOCKED)
+    expect(second.hit('10.0.0.2', 10, 60, 300) == app.HIT_SPAM_BLOCKED,
+           "an anti-spam block set by one store is seen by the other as spam_blocked")
+
+    # حد من غير حظر (زي /events/offers)
+    results = [(first, second)[i % 2].hit('10.0.0.3|events', 2, 60, 0) for i in range(3)]
+    expect(results == [app.HIT_ALLOWED, app.HIT_ALLOWED, app.HIT_EXCEEDED]
+           and second.hit('10.0.0.3', 10, 60, 300) == app.HIT_ALLOWED,
+           "block_seconds=0 rejects over the limit without blocking the IP")
+
+    # Redis وقع
+    handler = CountingHandler()
+    app.logger.addHandler(handler)
+    script = first._script = CountingScript(first._script)
+    server.connected = False
+    started = time.perf_counter()
+    results = [first.hit('10.0.0.4', 3, 60, 300) for _ in range(50)]
+    elapsed = time.perf_counter() - started
+    expect(script.calls == 1, f"only the first hit during the outage goes to Redis: {script.calls} calls")
+    expect(len(handler.records) == 1, f"one warning for the outage, not one per request: {len(handler.records)}")
+    expect(results[:3] == [app.HIT_ALLOWED] * 3 and results[3] == app.HIT_EXCEEDED,
+           "the local fallback keeps enforcing the limit during the outage")
+    print(f"     50 hits during the outage took {elapsed * 1000:.1f} ms")
+
+    # لسه واقع بعد retry_seconds: محاولة واحدة وتحذير واحد كمان
+    time.sleep(RETRY_SECONDS)
+    for _ in range(20):
+        first.hit('10.0.0.5', 100, 60, 300)
+    expect(script.calls == 2 and len(handler.records) == 2,
+           f"one retry per retry_seconds while still down: {script.calls} calls, {len(handler.records)} warnings")
+
+    # Redis رجع
+    server.connected = True
+    time.sleep(RETRY_SECONDS)
+    first.hit('10.0.0.6', 100, 60, 300)
+    calls = script.calls
+    for _ in range(5):
+        first.hit('10.0.0.6', 100, 60, 300)
+    expect(script.calls == calls + 5, "after Redis is back every hit goes to Redis again")
+    expect(second.hit('10.0.0.1', 10, 60, 300) == app.HIT_BLOCKED, "blocks made before the outage are still shared")
+    app.logger.removeHandler(handler)
+
+    # الـ decorator: نفس العداد من الـ workers الاتنين (/api/prices = 15 في الدقيقة)
+    client = app.app.test_client()
+    headers = {'X-Forwarded-For': '10.0.0.7'}
+    statuses = []
+    for i in range(17):
+        app.rate_limit_store = (first, second)[i % 2]
+        statuses.append(client.get('/api/prices', headers=headers).status_code)
+    expect(statuses.count(200) == 15 and statuses[15:] == [429, 429],
+           f"/api/prices allows 15 per minute across both workers: {statuses.count(200)} x 200")
+    return not problems
+
+
+def main():
+    try:
+        return 0 if run() else 1
+    finally:
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""اختبار حمل من أول لآخر: بيشغل التطبيق بـ gunicorn (نفس gunicorn.conf.py) ويبعت زيارات شبه الحقيقية
+
+كل مستخدم وهمي ليه IP و User-Agent خاصين بيه ومعاه keep-alive، وبيعمل جلسة عادية زي المتصفح:
+يفتح الصفحة الرئيسية ويحمل ملفات /assets/ مرة واحدة (الجلسة بتبدأ من غير كاش)، ويفتح اتصال
+/events/offers ويفضل ماسكه طول الجلسة (على اتصال تاني)، وبعدين يرجع يفتح الصفحة أو يدوس واتساب
+مع وقت تفكير بين كل طلب. (العروض جوه الصفحة نفسها، فالمتصفح مبيطلبش /get_offers.)
+لو اتصال الـ stream اترفض (X-Stream-Refused) بيرجع يحاول بعد الـ retry: اللي في الرد زي EventSource.
+في الآخر: الـ throughput و p50/p95/p99 لكل route، وكام طلب طبيعي اترفض بـ 429،
+وجدول لوحده لاتصالات /events/offers (اتفتح / اترفض busy أو rate_limit) - مع gthread عدد الاتصالات
+المفتوحة في كل worker محدود، فالجدول ده بيبين محتاج كام worker.
+
+التشغيل:
+    python benchmarks/load_test.py                              # worker واحد × 30 ثانية
+    python benchmarks/load_test.py --workers 1,2,4 --users 300  # مقارنة عدد الـ workers
+    python benchmarks/load_test.py --url http://127.0.0.1:5000  # على سيرفر شغال بالفعل
+
+الـ 429 هنا معناها إن مستخدم طبيعي اتمنع - لو كتيرة يبقى الحدود في rate_limit ضيقة على الاستخدام ده.
+"""
+import argparse
+import gzip
+import http.client
+import os
+import random
+import re
+import socket
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+
+try:
+    import brotli
+except ImportError:  # من غيره بنطلب gzip بس
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKUS = [
+    ('FC26_EN_Standard', 'PS5', 'Primary'),
+    ('FC26_AR_Standard', 'PS4', 'Secondary'),
+    ('FC26_STEAM_Ultimate', 'Steam', 'Full'),
+]
+USER_AGENTS = [
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; SM-A546E) AppleWebKit/537.36 Chrome/124.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36',
+]
+TEMP_DIR = tempfile.mkdtemp(prefix='senioraaa-load-')
+# نسبة كل نوع طلب بعد فتح الصفحة الرئيسية
+ACTIONS = (('/', 0.6), ('/whatsapp', 0.4))
+ASSET_URL = re.compile(r'/assets/[\w.-]+')
+PAGE_VERSION = re.compile(r'"version":\s*"([^"]+)"')
+STREAM_RETRY = re.compile(rb'retry:\s*(\d+)')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, threads, worker_class):
+    """gunicorn بنفس الإعدادات بتاعة الإنتاج - بيرجع (process, url)"""
+    port = free_port()
+    # الاستفسارات بتتكتب في قاعدة مؤقتة - مش inquiries.db اللي جنب app.py
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+               LOG_LEVEL='WARNING', INQUIRY_DB_PATH=os.path.join(TEMP_DIR, f"inquiries-{port}.db"))
+    if worker_class:
+        env['GUNICORN_WORKER_CLASS'] = worker_class
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn وقف بكود {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn مردش على /health في 30 ثانية")
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)      # route -> [seconds] للردود الناجحة والمرفوضة
+        self.statuses = defaultdict(Counter)    # route -> status -> count
+        self.streams = Counter()                # نتيجة فتح /events/offers: open, busy, rate_limit, أو الـ status
+        self.stream_latencies = []
+
+    def add(self, route, status, seconds):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][status] += 1
+
+    def add_stream(self, outcome, seconds):
+        with self.lock:
+            self.streams[outcome] += 1
+            self.stream_latencies.append(seconds)
+
+
+class OfferStream:
+    """اتصال /events/offers بتاع مستخدم واحد - مفتوح طول الجلسة، ولو اترفض بيرجع بعد الـ retry"""
+
+    def __init__(self, host, headers, results):
+        self.host = host
+        self.headers = headers
+        self.results = results
+        self.connection = None
+        self.retry_at = None            # وقت المحاولة الجاية لو اترفض
+
+    def open(self, version):
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection(self.host.hostname, self.host.port, timeout=30)
+        try:
+            connection.request('GET', f"/events/offers?since={urllib.parse.quote(version or '')}",
+                               headers=dict(self.headers, Accept='text/event-stream'))
+            response = connection.getresponse()
+            refused = response.getheader('X-Stream-Refused')
+            if response.status == 200 and not refused:
+                outcome, self.connection = 'open', connection
+                return
+            outcome = refused or response.status
+            retry = STREAM_RETRY.search(response.read())
+            self.retry_at = time.monotonic() + (int(retry.group(1)) / 1000 if retry else 30)
+            connection.close()
+        except (OSError, http.client.HTTPException):
+            outcome = 'error'
+            self.retry_at = time.monotonic() + 30
+            connection.close()
+        finally:
+            self.results.add_stream(outcome, time.perf_counter() - started)
+
+    def retry_due(self):
+        return self.connection is None and self.retry_at is not None and time.monotonic() >= self.retry_at
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def decode_body(content, encoding):
+    """الـ body زي ما المتصفح بيفكه (الصفحة جاية br أو gzip)"""
+    if encoding == 'gzip':
+        return gzip.decompress(content)
+    if encoding == 'br':
+        return brotli.decompress(content)
+    return content
+
+
+def simulated_user(number, url, deadline, think_time, results):
+    """جلسة مستخدم واحد لحد الـ deadline"""
+    rng = random.Random(number)
+    host = urllib.parse.urlsplit(url)
+    headers = {
+        'X-Forwarded-For': f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}",
+        'User-Agent': rng.choice(USER_AGENTS) + f" u{number}",
+        'Accept-Encoding': 'br, gzip' if brotli else 'gzip',
+    }
+    connection = http.client.HTTPConnection(host.hostname, host.port, timeout=30)
+
+    def send(route, method='GET', body=None, label=None):
+        request_headers = dict(headers)
+        if body is not None:
+            request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        started = time.perf_counter()
+        status = 'error'
+        content, encoding = b'', None
+        # السيرفر بيقفل الاتصال الخامل بعد keepalive ثواني - زي المتصفح بنعيد مرة على اتصال جديد
+        for _ in range(2):
+            try:
+                connection.request(method, route, body=body, headers=request_headers)
+                response = connection.getresponse()
+                content = response.read()
+                encoding = response.getheader('Content-Encoding')
+                status = response.status
+                break
+            except (OSError, http.client.HTTPException):
+                connection.close()
+        results.add(label or route, status, time.perf_counter() - started)
+        return content, encoding
+
+    # بداية الجلسات متوزعة على وقت التفكير عشان مايبدأوش كلهم في نفس اللحظة
+    time.sleep(rng.uniform(0, think_time))
+    stream = OfferStream(host, headers, results)
+    try:
+        page = decode_body(*send('/')).decode('utf-8', 'replace')
+        # جلسة من غير كاش: كل ملفات الصفحة مرة واحدة
+        for asset in sorted(set(ASSET_URL.findall(page))):
+            send(asset, label='/assets/*')
+        version = PAGE_VERSION.search(page)
+        stream.open(version.group(1) if version else None)
+        routes, weights = zip(*ACTIONS)
+        while time.monotonic() < deadline:
+            time.sleep(rng.expovariate(1 / think_time))
+            if stream.retry_due():
+                stream.open(version.group(1) if version else None)
+            route = rng.choices(routes, weights)[0]
+            if route == '/whatsapp':
+                game_type, platform, account_type = rng.choice(SKUS)
+                send(route, 'POST', urllib.parse.urlencode(
+                    {'game_type': game_type, 'platform': platform, 'account_type': account_type}))
+            else:
+                send(route)
+    finally:
+        stream.close()
+        connection.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_load(url, users, duration, think_time):
+    results = Results()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=simulated_user, args=(i, url, deadline, think_time, results), daemon=True)
+               for i in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def report(results, elapsed):
+    print(f"{'route':<12} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'429':>6} {'5xx/err':>8}")
+    total = rejected = failed = 0
+    for route in sorted(results.latencies):
+        latencies = sorted(results.latencies[route])
+        statuses = results.statuses[route]
+        count = len(latencies)
+        route_429 = statuses[429]
+        route_failed = sum(n for status, n in statuses.items() if status == 'error' or status >= 500)
+        total, rejected, failed = total + count, rejected + route_429, failed + route_failed
+        print(f"{route:<12} {count:>7} {count / elapsed:>8.1f} {percentile(latencies, 0.50) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.95) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} "
+              f"{route_429:>6} {route_failed:>8}")
+    print(f"{'total':<12} {total:>7} {total / elapsed:>8.1f} {'':>8} {'':>8} {'':>8} {rejected:>6} {failed:>8}")
+    if total:
+        print(f"   طلبات طبيعية اترفضت بـ 429: {rejected} ({rejected / total:.1%})")
+
+    # اتصالات /events/offers لوحدها: المرفوض هنا مش 429 - المتصفح بيرجع بعد الـ retry والصفحة شغالة
+    attempts = sum(results.streams.values())
+    if attempts:
+        latencies = sorted(results.stream_latencies)
+        outcomes = ', '.join(f"{outcome}={count}" for outcome, count in results.streams.most_common())
+        print(f"{'/events/offers':<12} {attempts:>7} محاولة فتح: {outcomes} - "
+              f"p50 {percentile(latencies, 0.50) * 1000:.1f} ms / p95 {percentile(latencies, 0.95) * 1000:.1f} ms")
+        refused = attempts - results.streams['open']
+        print(f"   اتصالات stream اترفضت: {refused} ({refused / attempts:.1%})")
+        failed += results.streams['error'] + sum(n for outcome, n in results.streams.items()
+                                                  if isinstance(outcome, int) and outcome >= 500)
+    return failed
+
+
+def report_rejections(url):
+    """سبب الـ 429 من /metrics (rate_limit ولا anti_spam)"""
+    host = urllib.parse.urlsplit(url)
+    try:
+        connection = http.client.HTTPConnection(host.hostname, host.port, timeout=5)
+        connection.request('GET', '/metrics')
+        body = connection.getresponse().read().decode()
+    except (OSError, http.client.HTTPException):
+        return
+    for line in body.splitlines():
+        if line.startswith('senioraaa_rejected_requests_total{'):
+            print(f"   {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='سيرفر شغال بالفعل (من غير ما نشغل gunicorn)')
+    parser.add_argument('--workers', default='1', help='عدد الـ workers - أكتر من قيمة مفصولة بفاصلة للمقارنة')
+    parser.add_argument('--threads', type=int, default=8, help='GUNICORN_THREADS')
+    parser.add_argument('--worker-class', help='GUNICORN_WORKER_CLASS (الافتراضي من gunicorn.conf.py)')
+    parser.add_argument('--users', type=int, default=100, help='عدد المستخدمين الوهميين في نفس الوقت')
+    parser.add_argument('--duration', type=float, default=30, help='مدة كل تشغيل بالثواني')
+    parser.add_argument('--think', type=float, default=2.0, help='متوسط وقت التفكير بين طلبات المستخدم (ثواني)')
+    args = parser.parse_args()
+
+    if args.url:
+        results, elapsed = run_load(args.url, args.users, args.duration, args.think)
+        failed = report(results, elapsed)
+        report_rejections(args.url)
+        return 1 if failed else 0
+
+    failures = 0
+    for workers in [int(w) for w in args.workers.split(',')]:
+        print(f"\n▶ workers={workers} threads={args.threads} users={args.users} duration={args.duration:g}s")
+        process, url = start_server(workers, args.threads, args.worker_class)
+        try:
+            results, elapsed = run_load(url, args.users, args.duration, args.think)
+            failures += report(results, elapsed)
+            report_rejections(url)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=40)
+            except subprocess.TimeoutExpired:
+                # اتصالات stream لسه مفتوحة عند السيرفر بتأخر الـ graceful shutdown
+                process.kill()
+                process.wait()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    finally:
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
@@ -0,0 +1,108 @@
+"""اختبار ضغط: threads كتير بتضرب / و /whatsapp في نفس الوقت والتأكد إن عدادات الـ rate limiter مظبوطة
+
+التشغيل:
+    python benchmarks/stress_concurrency.py [عدد الـ threads] [عدد الـ IPs]
+
+لكل IP بنبعت طلبات أكتر من الحد من threads مختلفة في نفس اللحظة. المطلوب:
+- عدد الردود 200 = الحد بالظبط (25 للصفحة الرئيسية / 8 للواتساب)
+- العداد المحفوظ في الـ store = نفس الرقم
+- مفيش أي 500 أو exception
+الخروج بكود 1 لو أي حاجة مش مظبوطة.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# الاستفسارات اللي بيعملها الاختبار بتتكتب في قاعدة مؤقتة - مش inquiries.db اللي جنب app.py
+TEMP_DIR = tempfile.mkdtemp(prefix='senioraaa-bench-')
+os.environ['INQUIRY_DB_PATH'] = os.path.join(TEMP_DIR, 'inquiries.db')
+atexit.register(shutil.rmtree, TEMP_DIR, True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+logging.disable(logging.CRITICAL)
+
+WINDOW = 60
+SKUS = [
+    {'game_type': 'FC26_EN_Standard', 'platform': 'PS5', 'account_type': 'Primary'},
+    {'game_type': 'FC26_AR_Standard', 'platform': 'PS4', 'account_type': 'Secondary'},
+    {'game_type': 'FC26_STEAM_Ultimate', 'platform': 'Steam', 'account_type': 'Full'},
+]
+
+
+def wait_for_fresh_window(margin=10):
+    """الـ sliding window بيدي وزن للنافذة اللي فاتت - نبدأ بعيد عن حدود الدقيقة عشان العد يبقى دقيق"""
+    remaining = WINDOW - time.time() % WINDOW
+    if remaining < margin:
+        time.sleep(remaining + 0.5)
+
+
+def hammer(name, requests, threads):
+    results = Counter()
+    lock = threading.Lock()
+    client_local = threading.local()
+
+    def send(job):
+        client = getattr(client_local, 'client', None)
+        if client is None:
+            client = client_local.client = app.app.test_client()
+        ip, method, path, data, user_agent = job
+        headers = {'X-Forwarded-For': ip, 'User-Agent': user_agent}
+        response = client.post(path, data=data, headers=headers) if method == 'POST' else client.get(path, headers=headers)
+        with lock:
+            results[(ip, response.status_code)] += 1
+
+    wait_for_fresh_window()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(send, requests))
+    elapsed = time.perf_counter() - started
+    print(f"{name}: {len(requests):,} requests in {elapsed:.2f}s ({len(requests) / elapsed:,.0f} req/s)")
+    return results
+
+
+def check(name, results, ips, limit, window):
+    ok = True
+    for ip in ips:
+        allowed = results[(ip, 200)]
+        stored = app.rate_limit_store.count(ip, window)
+        unexpected = sum(n for (key_ip, status), n in results.items() if key_ip == ip and status not in (200, 429))
+        if allowed != limit or stored != limit or unexpected:
+            print(f"  ❌ {name} {ip}: 200s={allowed} stored={stored} unexpected={unexpected} (expected {limit})")
+            ok = False
+    print(f"  {'✅' if ok else '❌'} {name}: {len(ips)} IPs × limit {limit}")
+    return ok
+
+
+def run(threads=64, ip_count=50):
+    app.rate_limit_store = app.InProcessRateLimitStore()
+    app.anti_spam_tracker = app.AntiSpamTracker()
+
+    # الصفحة الرئيسية: 60 طلب لكل IP والحد 25
+    home_ips = [f"198.51.{n // 250}.{n % 250}" for n in range(ip_count)]
+    home_requests = [(ip, 'GET', '/', None, 'Mozilla/5.0') for ip in home_ips for _ in range(60)]
+    random.shuffle(home_requests)
+    ok = check('/', hammer('GET /', home_requests, threads), home_ips, 25, WINDOW)
+
+    # الواتساب: 30 طلب لكل IP والحد 8 - User-Agent مختلف لكل طلب عشان الـ anti-spam ميحظرش قبل الـ rate limit
+    wa_ips = [f"203.0.{n // 250}.{n % 250}" for n in range(ip_count)]
+    wa_requests = [(ip, 'POST', '/whatsapp', random.choice(SKUS), f'Mozilla/5.0 (stress {i})')
+                   for ip in wa_ips for i in range(30)]
+    random.shuffle(wa_requests)
+    ok = check('/whatsapp', hammer('POST /whatsapp', wa_requests, threads), wa_ips, 8, WINDOW) and ok
+
+    return ok
+
+
+if __name__ == '__main__':
+    arguments = [int(value) for value in sys.argv[1:3]]
+    sys.exit(0 if run(*arguments) else 1)
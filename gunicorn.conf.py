@@ -0,0 +1,50 @@
+# إعدادات gunicorn - وضع التزامن العالي
+# =====================================
+# الافتراضي gthread: كل worker فيه GUNICORN_THREADS thread بيخدموا طلبات في نفس الوقت.
+# كل الحالة المشتركة في app.py (الـ rate limiter, الـ anti-spam, الكتالوج, الكاش, الأرقام المرجعية)
+# محمية بـ locks، فالوضع ده آمن. اتصالات /events/offers هنا محدودة (thread لكل اتصال -
+# شوف max_offer_streams في app.py) والصفحات الزيادة بتكمل بالعروض اللي جوه الصفحة.
+#
+# لآلاف اتصالات /events/offers الخاملة: GUNICORN_WORKER_CLASS=gevent (gevent في requirements.txt).
+# الكتابة في SQLite بتروح thread حقيقي تحت gevent، بس أقفال fcntl بتاعة الـ rate limiter المشترك
+# (لحظية) وأي blocking تاني بيوقف كل الـ worker - فمتفعلوش غير لو فعلاً محتاج الاتصالات دي.
+#
+# التشغيل:
+#     gunicorn app:app          (الملف ده بيتقري لوحده من نفس المجلد)
+#     GUNICORN_WORKER_CLASS=gevent gunicorn app:app
+import glob
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))                            # gthread بس
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '5000'))   # gevent بس
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+
+# إعادة تشغيل الـ worker بعد عدد طلبات (مع فرق عشوائي) عشان مايقعوش كلهم مع بعض
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')     # مثلاً "-" للـ stdout
+errorlog = '-'
+
+
+# عدادات /metrics: كل worker بيكتب ملف في المجلد ده و/metrics بيجمعهم
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"senioraaa-metrics-{os.environ.get('PORT', '5000')}"))
+
+
+def on_starting(server):
+    # تشغيل جديد = عدادات من الصفر (ملفات workers التشغيل اللي فات مبتتجمعش)
+    # بنمسح ملفات العدادات بس - المجلد ممكن يكون مجلد تاني حدده الـ operator
+    directory = os.environ['METRICS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, 'worker-*.bin')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass